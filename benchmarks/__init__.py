@@ -0,0 +1,6 @@
+from .ddl_generator import SchemaShape, generate_schema
+
+__all__ = [
+    "SchemaShape",
+    "generate_schema",
+]
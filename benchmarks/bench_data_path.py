@@ -0,0 +1,181 @@
+"""
+Benchmark of the data path (export -> conversion -> load) against stand-in connections, no database needed.
+
+    python -m benchmarks.bench_data_path --rows 200000 --batch-sizes 1000,10000 --pg-latency-ms 0.5
+    python -m benchmarks.bench_data_path --real-postgres   # Load into the Postgres from config.json instead
+"""
+import argparse
+import contextlib
+import io
+import json
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+import psycopg2
+
+from config.config import MIGRATION, MYSQL, POSTGRES
+from data.pipeline import migrate_table
+from schema.creator import create_pg_tables
+from schema.post_load import plan_post_load
+from schema.translator import translate_schema
+from .fake_dbapi import FakeMySQLConnection, FakePostgresConnection, RoundTrips, patched_connections
+
+TABLE = "_topostgres_bench"
+MYSQL_DDL = f"""CREATE TABLE {TABLE} (
+  id int NOT NULL AUTO_INCREMENT,
+  customer varchar(60) NOT NULL,
+  amount decimal(12,2) NOT NULL,
+  created datetime NOT NULL,
+  paid tinyint(1) NOT NULL DEFAULT '0',
+  note text,
+  payload json DEFAULT NULL,
+  PRIMARY KEY (id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4"""
+# What pg_attribute reports for the translated table, used by binary COPY
+COLUMN_TYPES = ["integer", "character varying", "numeric", "timestamp without time zone", "smallint", "text", "jsonb"]
+
+# Load method, COPY format and whether rows are passed through raw
+STRATEGIES = {
+    "copy-raw": ("copy", "text", True),
+    "copy-text": ("copy", "text", False),
+    "copy-csv": ("copy", "csv", False),
+    "copy-binary": ("copy", "binary", False),
+    "insert": ("insert", "text", False),
+}
+
+
+def make_row_factory(raw: bool = False):
+    """
+    Builds rows from small pools of values, so generating the source costs little next to the path being measured.
+    Raw rows are what a raw cursor returns: the values as MySQL sends them, in bytes.
+    """
+    customers = [f"customer {i}" for i in range(50)]
+    amounts = [Decimal(i * 7919 % 100000) / 100 for i in range(100)]
+    notes = [None, "", "plain note", "tab\tand newline\n", "quote \" and backslash \\", "ünïcödé", "x" * 200]
+    payloads = [None, '{"a": 1}', '{"items": [1, 2, 3], "ok": true}', "[]", '{"nested": {"k": "v"}}']
+    base = datetime(2024, 1, 1)
+    if raw:
+        customers = [value.encode() for value in customers]
+        amounts = [str(value).encode() for value in amounts]
+        notes = [value.encode() if value is not None else None for value in notes]
+        payloads = [value.encode() if value is not None else None for value in payloads]
+
+        def raw_row(i: int) -> tuple:
+            return (str(i).encode(), customers[i % 50], amounts[i % 100], (base + timedelta(seconds=i)).isoformat(sep=" ").encode(),
+                    b"1" if i & 1 else b"0", notes[i % 7], payloads[i % 5])
+        return raw_row
+
+    def row(i: int) -> tuple:
+        return (i, customers[i % 50], amounts[i % 100], base + timedelta(seconds=i), i & 1, notes[i % 7], payloads[i % 5])
+    return row
+
+
+@contextmanager
+def migration_settings(**overrides):
+    """
+    Temporarily overrides fields of the shared migration config, which the pipeline reads its defaults from.
+    """
+    saved = {key: getattr(MIGRATION, key) for key in overrides}
+    for key, value in overrides.items():
+        setattr(MIGRATION, key, value)
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            setattr(MIGRATION, key, value)
+
+
+def run_once(pg_sql: str, rows: int, strategy: str, batch_size: int, queue_depth: int, chunk_rows: int, args, trace_memory: bool = False) -> dict:
+    mysql_trips = RoundTrips(args.mysql_latency_ms)
+    pg_trips = RoundTrips(args.pg_latency_ms, args.pg_mb_per_sec * 2 ** 20)
+    row_factory = make_row_factory()
+    method, copy_format, raw = STRATEGIES[strategy]
+
+    if args.real_postgres:
+        _reset_real_table(pg_sql)
+    with patched_connections(
+        mysql_factory=lambda: FakeMySQLConnection(rows, row_factory, mysql_trips, make_row_factory(raw=True)),
+        postgres_factory=None if args.real_postgres else (lambda: FakePostgresConnection(COLUMN_TYPES, pg_trips)),
+    ), migration_settings(load_method=method, copy_format=copy_format, raw_passthrough=raw, batch_size=batch_size, queue_depth=queue_depth,
+                          chunk_rows=chunk_rows, chunk_workers=args.chunk_workers), \
+            contextlib.redirect_stdout(io.StringIO()):
+        if trace_memory:
+            tracemalloc.start()
+        start = time.perf_counter()
+        imported = migrate_table(TABLE, pg_sql, rows, MYSQL, POSTGRES)
+        seconds = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if trace_memory else 0
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "strategy": strategy,
+        "batch_size": batch_size,
+        "queue_depth": queue_depth,
+        "rows": imported,
+        "seconds": round(seconds, 3),
+        "rows_per_sec": round(imported / seconds) if seconds else 0,
+        "mysql_round_trips": mysql_trips.total,
+        "pg_round_trips": pg_trips.total,
+        "pg_mb_sent": round(pg_trips.bytes / 2 ** 20, 2),
+        "peak_memory_mb": round(peak / 2 ** 20, 2),
+    }
+
+
+def _reset_real_table(pg_sql: str):
+    conn = psycopg2.connect(**POSTGRES.unpack_postgres())
+    cur = conn.cursor()
+    cur.execute(f"DROP TABLE IF EXISTS {TABLE}")
+    conn.commit()
+    cur.close()
+    conn.close()
+    bare_tables, _ = plan_post_load({TABLE: pg_sql}, {TABLE: MYSQL_DDL})
+    create_pg_tables(bare_tables, POSTGRES)
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark the export / load path against stand-in database connections.")
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--strategies", default="copy-raw,copy-text,copy-csv,copy-binary,insert", help=f"Comma separated, from {list(STRATEGIES)}.")
+    parser.add_argument("--batch-sizes", default="1000,10000", help="Comma separated batch sizes to try.")
+    parser.add_argument("--queue-depths", default="4", help="Comma separated queue depths to try.")
+    parser.add_argument("--chunk-rows", type=int, default=0, help="Split the table into chunks of this many rows, 0 for one chunk.")
+    parser.add_argument("--chunk-workers", type=int, default=MIGRATION.chunk_workers)
+    parser.add_argument("--insert-rows", type=int, default=10000, help="Row cap for the insert strategy, which is one round trip per row.")
+    parser.add_argument("--mysql-latency-ms", type=float, default=0.0, help="Simulated latency per MySQL round trip.")
+    parser.add_argument("--pg-latency-ms", type=float, default=0.0, help="Simulated latency per Postgres round trip.")
+    parser.add_argument("--pg-mb-per-sec", type=float, default=0.0, help="Simulated Postgres bandwidth, 0 for unlimited.")
+    parser.add_argument("--real-postgres", action="store_true", help="Load into the Postgres from config.json (drops and recreates the bench table).")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the separate tracemalloc run per configuration.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    pg_sql = translate_schema({TABLE: MYSQL_DDL})[TABLE]
+    results = []
+    for strategy in args.strategies.split(","):
+        rows = min(args.rows, args.insert_rows) if strategy == "insert" else args.rows
+        for batch_size in map(int, args.batch_sizes.split(",")):
+            for queue_depth in map(int, args.queue_depths.split(",")):
+                result = run_once(pg_sql, rows, strategy, batch_size, queue_depth, args.chunk_rows, args)
+                if not args.no_memory:
+                    traced = run_once(pg_sql, rows, strategy, batch_size, queue_depth, args.chunk_rows, args, trace_memory=True)
+                    result["peak_memory_mb"] = traced["peak_memory_mb"]
+                results.append(result)
+                if not args.json:
+                    print(
+                        f"{strategy:>12} batch={batch_size:<6} depth={queue_depth:<3} {result['rows']:>8} rows "
+                        f"{result['seconds']:>7.2f}s {result['rows_per_sec']:>9} rows/s  trips mysql={result['mysql_round_trips']} "
+                        f"pg={result['pg_round_trips']}  sent {result['pg_mb_sent']} MB  peak {result['peak_memory_mb']} MB"
+                    )
+    if args.json:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,108 @@
+"""
+Offline benchmark of the schema translator, no database needed.
+
+    python -m benchmarks.bench_translator --tables 2000 --columns 30
+    python -m benchmarks.bench_translator --min-tables-per-sec 500   # Exit 1 below the threshold, for CI
+"""
+import argparse
+import contextlib
+import io
+import json
+import sys
+import time
+import tracemalloc
+
+from schema.translator import _translate_table, translate_schema
+from .ddl_generator import SchemaShape, generate_schema
+
+
+def measure(func, *args, repeat: int = 3) -> tuple[float, int]:
+    """
+    Runs func(*args) repeat times.
+
+    Returns:
+        tuple[float, int]: The best wall time in seconds, and the peak traced memory in bytes of a separate traced run.
+    """
+    best = float("inf")
+    # Keep the translator's log lines out of the timings
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            start = time.perf_counter()
+            func(*args)
+            best = min(best, time.perf_counter() - start)
+        # Measured separately, tracemalloc slows allocation down a lot
+        tracemalloc.start()
+        func(*args)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return best, peak
+
+
+def run(shape: SchemaShape, repeat: int = 3) -> dict:
+    """
+    Benchmarks translate_schema (whole schema, including the foreign key pass) and _translate_table (per table) on a
+    generated schema.
+
+    Returns:
+        dict: Results per benchmark: seconds, tables_per_sec, mb_per_sec of DDL and peak_memory_mb.
+    """
+    tables = generate_schema(shape)
+    ddl_mb = sum(len(sql) for sql in tables.values()) / 2 ** 20
+
+    def translate_each(tables: dict[str, str]):
+        for sql in tables.values():
+            _translate_table(sql)
+
+    results = {"shape": vars(shape), "ddl_mb": round(ddl_mb, 3)}
+    for name, func in (("translate_schema", translate_schema), ("_translate_table", translate_each)):
+        seconds, peak = measure(func, tables, repeat=repeat)
+        results[name] = {
+            "seconds": round(seconds, 4),
+            "tables_per_sec": round(len(tables) / seconds, 1),
+            "mb_per_sec": round(ddl_mb / seconds, 2),
+            "peak_memory_mb": round(peak / 2 ** 20, 2),
+        }
+    return results
+
+
+def parse_args():
+    defaults = SchemaShape()
+    parser = argparse.ArgumentParser(description="Benchmark the MySQL to PostgreSQL schema translator on a synthetic schema.")
+    parser.add_argument("--tables", type=int, default=defaults.tables)
+    parser.add_argument("--columns", type=int, default=defaults.columns, help="Average columns per table.")
+    parser.add_argument("--enum-size", type=int, default=defaults.enum_size)
+    parser.add_argument("--set-size", type=int, default=defaults.set_size)
+    parser.add_argument("--fk-density", type=float, default=defaults.fk_density, help="Average foreign keys per table.")
+    parser.add_argument("--generated-ratio", type=float, default=defaults.generated_ratio, help="Share of generated columns.")
+    parser.add_argument("--backticks", action="store_true", help="Keep backticks, like mysqldump output.")
+    parser.add_argument("--seed", type=int, default=defaults.seed)
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs, the best one is reported.")
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON.")
+    parser.add_argument("--min-tables-per-sec", type=float, default=0, help="Exit with status 1 if translate_schema is slower than this.")
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    shape = SchemaShape(
+        tables=args.tables, columns=args.columns, enum_size=args.enum_size, set_size=args.set_size,
+        fk_density=args.fk_density, generated_ratio=args.generated_ratio, backticks=args.backticks, seed=args.seed,
+    )
+    results = run(shape, repeat=args.repeat)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"Schema: {shape.tables} tables, ~{shape.columns} columns each, {results['ddl_mb']} MB of DDL")
+        for name in ("translate_schema", "_translate_table"):
+            result = results[name]
+            print(
+                f"{name:>18}: {result['seconds']:.3f}s, {result['tables_per_sec']:.0f} tables/s, "
+                f"{result['mb_per_sec']:.2f} MB/s, peak {result['peak_memory_mb']:.1f} MB"
+            )
+    if results["translate_schema"]["tables_per_sec"] < args.min_tables_per_sec:
+        print(f"translate_schema is below {args.min_tables_per_sec} tables/s", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
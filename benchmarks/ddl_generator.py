@@ -0,0 +1,109 @@
+import math
+import random
+from dataclasses import dataclass
+
+
+@dataclass
+class SchemaShape:
+    tables: int = 200
+    columns: int = 20               # Columns per table, on average (besides id)
+    enum_size: int = 8              # Values per ENUM column
+    set_size: int = 6               # Values per SET column
+    fk_density: float = 0.3         # Foreign keys per table, on average
+    generated_ratio: float = 0.05   # Share of columns that are generated
+    backticks: bool = False         # get_mysql_tables strips them, mysqldump output keeps them
+    seed: int = 42
+
+
+# (weight, template) pairs for plain columns, roughly the mix found in application schemas
+_COLUMN_TYPES = [
+    (10, "int NOT NULL DEFAULT '0'"),
+    (4, "bigint unsigned DEFAULT NULL"),
+    (14, "varchar({length}) COLLATE utf8mb4_0900_ai_ci DEFAULT NULL"),
+    (6, "varchar({length}) NOT NULL DEFAULT ''"),
+    (5, "text"),
+    (5, "datetime NOT NULL DEFAULT CURRENT_TIMESTAMP"),
+    (3, "timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP"),
+    (4, "decimal(12,2) NOT NULL DEFAULT '0.00'"),
+    (6, "tinyint(1) NOT NULL DEFAULT '0'"),
+    (2, "json DEFAULT NULL"),
+    (3, "date DEFAULT NULL"),
+    (1, "time DEFAULT NULL"),
+    (1, "blob"),
+    (1, "bit(1) NOT NULL DEFAULT b'0'"),
+    (2, "double DEFAULT NULL"),
+    (3, "{enum} NOT NULL DEFAULT '{first}'"),
+    (1, "{set} DEFAULT NULL"),
+]
+
+
+def generate_schema(shape: SchemaShape) -> dict[str, str]:
+    """
+    Generates a synthetic MySQL 8 schema in the shape SHOW CREATE TABLE writes it, for benchmarking the translator.
+    Every table has an integer primary key; foreign keys only point at earlier tables' primary keys, with a KEY on
+    the referencing column like InnoDB adds. The same shape and seed always give the same schema.
+
+    Args:
+        shape (SchemaShape): Size and mix of the schema.
+
+    Returns:
+        dict[str, str]: Mapping of table names to their CREATE TABLE statements.
+    """
+    rng = random.Random(shape.seed)
+    weights = [weight for weight, _ in _COLUMN_TYPES]
+    templates = [template for _, template in _COLUMN_TYPES]
+    q = (lambda name: f"`{name}`") if shape.backticks else (lambda name: name)
+
+    tables = {}
+    names = [f"table_{i:05d}" for i in range(shape.tables)]
+    for number, table in enumerate(names):
+        lines = [f"{q('id')} int unsigned NOT NULL AUTO_INCREMENT"]
+        keys = [f"PRIMARY KEY ({q('id')})"]
+        constraints = []
+        plain_columns = []
+
+        column_count = max(1, int(rng.gauss(shape.columns, shape.columns / 4)))
+        for i in range(column_count):
+            column = f"col_{i:03d}"
+            if plain_columns and rng.random() < shape.generated_ratio:
+                a, b = rng.sample(plain_columns, 2) if len(plain_columns) > 1 else (plain_columns[0], plain_columns[0])
+                lines.append(f"{q(column)} varchar(255) GENERATED ALWAYS AS (concat({q(a)},_utf8mb4' ',{q(b)})) VIRTUAL")
+                continue
+            template = rng.choices(templates, weights)[0]
+            values = [f"value_{v}" for v in range(shape.enum_size if "{enum}" in template else shape.set_size)]
+            lines.append(f"{q(column)} " + template.format(
+                length=rng.choice((32, 60, 100, 255)),
+                enum="enum(" + ",".join(f"'{v}'" for v in values) + ")",
+                set="set(" + ",".join(f"'{v}'" for v in values) + ")",
+                first=values[0] if values else "",
+            ))
+            plain_columns.append(column)
+
+        if plain_columns and rng.random() < 0.3:
+            column = rng.choice(plain_columns)
+            keys.append(f"UNIQUE KEY {q(column + '_UNIQUE')} ({q(column)}(100))")
+
+        fk_count = _poisson(rng, shape.fk_density) if number else 0
+        for i in range(fk_count):
+            column = f"ref_{i}_id"
+            parent = names[rng.randrange(number)]
+            lines.append(f"{q(column)} int unsigned DEFAULT NULL")
+            keys.append(f"KEY {q(f'{column}_idx')} ({q(column)})")
+            action = rng.choice(("", " ON DELETE CASCADE", " ON DELETE SET NULL ON UPDATE CASCADE"))
+            constraints.append(f"CONSTRAINT {q(f'{table}_ibfk_{i + 1}')} FOREIGN KEY ({q(column)}) REFERENCES {q(parent)} ({q('id')}){action}")
+
+        body = ",\n  ".join(lines + keys + constraints)
+        tables[table] = (
+            f"CREATE TABLE {q(table)} (\n  {body}\n) ENGINE=InnoDB AUTO_INCREMENT={rng.randint(1, 10 ** 6)} "
+            "DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci"
+        )
+    return tables
+
+
+def _poisson(rng: random.Random, mean: float) -> int:
+    # Knuth's method, fine for the small means used here
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
@@ -0,0 +1,192 @@
+import re
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+
+class RoundTrips:
+    """
+    Thread-safe counters for the round trips (and bytes sent) the stand-in connections see, plus the simulated
+    latency of each round trip.
+    """
+
+    def __init__(self, latency_ms: float = 0.0, bytes_per_sec: float = 0.0):
+        self.latency = latency_ms / 1000
+        self.bytes_per_sec = bytes_per_sec
+        self.counts = {}
+        self.bytes = 0
+        self._lock = threading.Lock()
+
+    def hit(self, kind: str, size: int = 0):
+        with self._lock:
+            self.counts[kind] = self.counts.get(kind, 0) + 1
+            self.bytes += size
+        delay = self.latency + (size / self.bytes_per_sec if self.bytes_per_sec else 0)
+        if delay:
+            time.sleep(delay)
+
+    @property
+    def total(self) -> int:
+        return sum(self.counts.values())
+
+
+class FakeMySQLConnection:
+    """
+    Stands in for a mysql.connector connection serving one synthetic table.
+    Rows are made on demand by row_factory(id) for ids 1..row_count, so the source costs no memory. Handles the
+    queries the exporter and chunker send: SELECT * with an optional key range, and SELECT MIN / MAX of the key.
+    Raw cursors get raw_row_factory(id) if given, otherwise the rows rendered the way MySQL sends them.
+    """
+
+    def __init__(self, row_count: int, row_factory, trips: RoundTrips, raw_row_factory=None):
+        self.row_count = row_count
+        self.row_factory = row_factory
+        self.raw_row_factory = raw_row_factory
+        self.trips = trips
+
+    def cursor(self, buffered: bool = True, raw: bool = False, **kwargs):
+        return FakeMySQLCursor(self, raw)
+
+    def is_connected(self) -> bool:
+        return True
+
+    def shutdown(self):
+        pass
+
+    def close(self):
+        pass
+
+
+def _raw_value(value):
+    """
+    Renders a value the way MySQL sends it in the text protocol, which is what a raw cursor returns.
+    """
+    if value is None or isinstance(value, bytes):
+        return value
+    if isinstance(value, timedelta):
+        seconds = int(value.total_seconds())
+        sign, seconds = ("-" if seconds < 0 else ""), abs(seconds)
+        return f"{sign}{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}".encode()
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ").encode()
+    if isinstance(value, date):
+        return value.isoformat().encode()
+    if isinstance(value, (set, frozenset)):
+        return ",".join(sorted(value)).encode()
+    return str(int(value) if isinstance(value, bool) else value).encode()
+
+
+class FakeMySQLCursor:
+    def __init__(self, conn: FakeMySQLConnection, raw: bool = False):
+        self.conn = conn
+        self.raw = raw
+        self._ids = iter(())
+        self._result = []
+
+    def execute(self, query: str, params=()):
+        self.conn.trips.hit("mysql_query")
+        params = list(params or ())
+        if "MIN(" in query:
+            self._result = [(1, self.conn.row_count)] if self.conn.row_count else [(None, None)]
+            return
+        lo, hi = 1, self.conn.row_count
+        if "BETWEEN" in query:
+            lo, hi = max(lo, params.pop(0)), min(hi, params.pop(0))
+        if re.search(r"` > %s", query):
+            lo = max(lo, params.pop(0) + 1)
+        self._ids = iter(range(lo, hi + 1))
+
+    def fetchone(self):
+        return self._result.pop(0) if self._result else None
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+    def fetchmany(self, size: int):
+        factory = self.conn.row_factory
+        if self.raw:
+            factory = self.conn.raw_row_factory or (lambda i: tuple(map(_raw_value, self.conn.row_factory(i))))
+        rows = [factory(i) for _, i in zip(range(size), self._ids)]
+        if rows:
+            self.conn.trips.hit("mysql_fetch")
+        return rows
+
+    def close(self):
+        pass
+
+
+class FakePostgresConnection:
+    """
+    Stands in for a psycopg2 connection. COPY data is read and counted but not kept, INSERTs and other statements
+    are counted, and the column type lookup for binary COPY is answered from column_types.
+    """
+
+    def __init__(self, column_types: list[str], trips: RoundTrips):
+        self.column_types = column_types
+        self.trips = trips
+        self.notices = []
+        self.encoding = "UTF8"
+        self.closed = 0
+
+    def set_client_encoding(self, encoding: str):
+        self.encoding = encoding
+
+    def cursor(self):
+        return FakePostgresCursor(self)
+
+    def commit(self):
+        self.trips.hit("pg_commit")
+
+    def rollback(self):
+        self.trips.hit("pg_rollback")
+
+    def close(self):
+        pass
+
+
+class FakePostgresCursor:
+    def __init__(self, conn: FakePostgresConnection):
+        self.conn = conn
+        self._result = []
+
+    def execute(self, query, params=None):
+        text = query if isinstance(query, str) else repr(query)
+        self.conn.trips.hit("pg_insert" if "INSERT INTO" in text else "pg_execute", len(text) + len(repr(params or ())))
+        self._result = [(column_type,) for column_type in self.conn.column_types] if "pg_attribute" in text else []
+
+    def copy_expert(self, query, file, size: int = 8192):
+        sent = 0
+        while True:
+            data = file.read(size * 8)
+            if not data:
+                break
+            sent += len(data)
+        self.conn.trips.hit("pg_copy", sent)
+
+    def fetchall(self):
+        result, self._result = self._result, []
+        return result
+
+    def fetchone(self):
+        return self._result.pop(0) if self._result else None
+
+    def close(self):
+        pass
+
+
+@contextmanager
+def patched_connections(mysql_factory=None, postgres_factory=None):
+    """
+    Swaps mysql.connector.connect and psycopg2.connect for the given factories while the block runs. The data and
+    schema modules look these up at call time, so data.exporter, data.importer, data.chunker and schema.creator all
+    get the stand-ins. A factory left as None keeps the real driver.
+    """
+    with ExitStack() as stack:
+        if mysql_factory is not None:
+            stack.enter_context(mock.patch("mysql.connector.connect", lambda **kwargs: mysql_factory()))
+        if postgres_factory is not None:
+            stack.enter_context(mock.patch("psycopg2.connect", lambda **kwargs: postgres_factory()))
+        yield
@@ -0,0 +1,131 @@
+import argparse
+import os
+import re
+import sys
+
+from utils.logger import log
+
+# Only the subcommand that runs imports the modules it needs: translate works offline, without the database drivers
+# or a config file.
+
+
+def add_migrate_arguments(parser: argparse.ArgumentParser):
+    """
+    Adds the options of a migration run (see main.main) to a parser.
+    """
+    parser.add_argument("--resume", action="store_true", help="Continue an interrupted run, skipping work its journal recorded as committed.")
+    parser.add_argument("--dump", metavar="PATH", help="Load a mysqldump file (optionally gzipped) instead of reading from the MySQL server.")
+    parser.add_argument("--stage-export", metavar="DIR", help="Export the schema and data into COPY files in DIR instead of loading them.")
+    parser.add_argument("--stage-import", metavar="DIR", help="Load a directory written by --stage-export, without reading from MySQL.")
+    parser.add_argument("--sync", action="store_true", help="Copy only the rows changed since the last sync (or full load) into the existing tables.")
+    parser.add_argument("--verify", action="store_true", help="Compare the migrated data with MySQL using per-chunk checksums computed on both servers.")
+    parser.add_argument("--coordinator", action="store_true", help="Queue the data in the target database for workers on any host to load, instead of loading it here.")
+    parser.add_argument("--worker", action="store_true", help="Load units from the queue of a --coordinator run until it is drained.")
+
+
+def run_translate(args) -> int:
+    from schema.sql_files import translate_sql_files
+
+    results = translate_sql_files(args.paths, args.output, workers=args.workers)
+    if not results:
+        log(f"No .sql files found in {args.paths}.", level="warn")
+    return 1 if None in results.values() else 0
+
+
+def run_extract(args) -> int:
+    from config.config import MIGRATION, MYSQL
+    from schema.cache import SchemaCache, get_mysql_tables_cached
+    from schema.extractor import get_mysql_tables
+
+    cache = SchemaCache(MIGRATION.schema_cache) if MIGRATION.schema_cache else None
+    tables = get_mysql_tables_cached(MYSQL, cache) if cache else get_mysql_tables(MYSQL)
+    if cache:
+        cache.save()
+    os.makedirs(args.output, exist_ok=True)
+    for table, mysql_sql in tables.items():
+        with open(os.path.join(args.output, re.sub(r"[^\w.-]", "_", table) + ".sql"), "w", encoding="utf-8", newline="\n") as f:
+            f.write(mysql_sql.strip().rstrip(";") + ";\n")
+    log(f"✅ Wrote the CREATE TABLE statements of {len(tables)} tables to {args.output}.", level="success")
+    return 0
+
+
+def run_migrate(args) -> int:
+    import main
+
+    main.main(resume=args.resume, dump=args.dump, stage_export=args.stage_export, stage_import=args.stage_import, sync=args.sync, verify=args.verify, coordinator=args.coordinator, worker=args.worker)
+    return 0
+
+
+def run_workers(args) -> int:
+    from concurrent.futures import ProcessPoolExecutor
+
+    from config.config import CONFIG_PATH, MYSQL, POSTGRES, set_config_path
+    from data.work_queue import run_worker
+
+    if args.processes == 1:
+        run_worker(MYSQL, POSTGRES, slots=args.slots)
+        return 0
+    # Processes on one host are independent workers of the queue, like workers on other hosts
+    # Spawned processes would read the default config, not the one given by --config
+    with ProcessPoolExecutor(max_workers=args.processes, initializer=set_config_path, initargs=(CONFIG_PATH,)) as pool:
+        futures = [pool.submit(run_worker, MYSQL, POSTGRES, args.slots) for _ in range(args.processes)]
+        for future in futures:
+            future.result()
+    return 0
+
+
+def run_verify(args) -> int:
+    import main
+
+    main.main(verify=True)
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Translate and migrate MySQL 8 schemas and data to PostgreSQL.")
+    parser.add_argument("--config", metavar="PATH", help="Config file to use instead of config/config.json (or $TOPOSTGRES_CONFIG).")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    translate = commands.add_parser("translate", help="Translate .sql files of MySQL DDL to PostgreSQL, offline.")
+    translate.add_argument("paths", nargs="+", metavar="PATH", help=".sql files, or directories searched for .sql files.")
+    translate.add_argument("-o", "--output", required=True, metavar="DIR", help="Directory to write the PostgreSQL DDL to, mirroring the input layout.")
+    translate.add_argument("-j", "--workers", type=int, metavar="N", help="Processes to translate with (default: one per CPU).")
+    translate.set_defaults(run=run_translate)
+
+    extract = commands.add_parser("extract", help="Write the CREATE TABLE statement of every MySQL table to a .sql file.")
+    extract.add_argument("-o", "--output", required=True, metavar="DIR", help="Directory to write one .sql file per table to.")
+    extract.set_defaults(run=run_extract)
+
+    migrate = commands.add_parser("migrate", help="Migrate the schema and data (same options as main.py).")
+    add_migrate_arguments(migrate)
+    migrate.set_defaults(run=run_migrate)
+
+    verify = commands.add_parser("verify", help="Compare the migrated data with MySQL using per-chunk checksums.")
+    verify.set_defaults(run=run_verify)
+
+    worker = commands.add_parser("worker", help="Load units from the work queue of a migrate --coordinator run, on any host.")
+    worker.add_argument("-p", "--processes", type=int, default=1, metavar="N", help="Worker processes to start on this host (default: 1).")
+    worker.add_argument("-s", "--slots", type=int, metavar="N", help="Units each process runs at once (default: the migration config's workers).")
+    worker.set_defaults(run=run_workers)
+    return parser
+
+
+def run(argv: list[str] = None) -> int:
+    """
+    Runs the command line.
+
+    Args:
+        argv (list[str]): The arguments, defaults to sys.argv.
+
+    Returns:
+        int: The exit status.
+    """
+    args = build_parser().parse_args(argv)
+    if args.config:
+        from config.config import set_config_path
+        set_config_path(args.config)
+    return args.run(args)
+
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -1,6 +1,7 @@
 import json
 import os
-from dataclasses import dataclass
+import threading
+from dataclasses import dataclass, field
 from typing import Optional
 
 # ----- Common Config Class -----
@@ -32,13 +33,84 @@ class DatabaseConfig:
             "dbname": self.dbname,
         }
 
+@dataclass
+class MigrationConfig:
+    load_method: str = "copy"       # "copy" or "insert"
+    copy_format: str = "text"       # "text", "csv" or "binary"
+    raw_passthrough: bool = True    # Text COPY: rows go from MySQL to COPY as raw bytes, only columns whose text differs are converted
+    batch_size: int = 10000         # Rows per COPY batch / commit, and per fetchmany() on export
+    queue_depth: int = 4            # Batches buffered between a table's export and import
+    workers: int = 4                # Tables migrated concurrently
+    worker_mode: str = "thread"     # "thread" or "process"
+    engine: str = "pool"            # "pool" (workers above) or "asyncio" (streams below)
+    mysql_streams: int = 4          # asyncio engine: concurrent MySQL reads, across all tables and chunks
+    pg_streams: int = 4             # asyncio engine: concurrent PostgreSQL loads, across all tables and chunks
+    chunk_rows: int = 1000000       # Tables estimated above this many rows are split into chunks, 0 disables
+    chunk_workers: int = 4          # Chunks of one table copied concurrently
+    index_workers: int = 4          # Concurrent index builds / foreign key validations after the load
+    extract_method: str = "catalog" # "catalog" (information_schema) or "show_create"
+    extract_workers: int = 4        # Connections used for SHOW CREATE TABLE
+    create_workers: int = 4         # Connections creating the tables of one dependency level
+    ddl_batch_size: int = 100       # CREATE TABLE statements sent per round trip
+    progress_interval: float = 5.0  # Seconds between progress lines / metrics file refreshes
+    metrics_json: str = ""          # Path of a JSON metrics file to write, "" for none
+    metrics_prometheus: str = ""    # Path of a Prometheus textfile to write, "" for none
+    schema_cache: str = ".topostgres_cache/schema.json"  # Extracted / translated schema snapshot, "" disables
+    stage_compression: str = "gzip" # Staged COPY files: "gzip" or "none" (memory-mapped on import)
+    sync_overlap: float = 300.0     # Delta sync: seconds before a timestamp watermark re-read, to catch late commits
+    sync_columns: dict = field(default_factory=dict)  # Delta sync: watermark column per table, overriding detection
+    fast_load: bool = False         # UNLOGGED tables and synchronous_commit off while loading, SET LOGGED and ANALYZE after
+    maintenance_work_mem: str = ""  # Per session for index builds and ANALYZE, e.g. "1GB", "" keeps the server's
+    reject_dir: str = "rejects"     # Rows Postgres rejects are written to <table>.rejects.jsonl here, "" only logs them
+    max_rejects: int = 1000         # Rejected rows after which a table (or chunk) load is given up
+    lease_seconds: float = 60.0     # Distributed: lease on a claimed unit, renewed every third of it; expired units are claimed again
+    max_attempts: int = 3           # Distributed: claims of a unit before it is marked failed
+    verify_chunk_rows: int = 100000 # Verification: rows per checksummed key range
+    verify_row_threshold: int = 1000  # Verification: mismatching ranges are halved down to this many keys, then compared row by row
+
 # ----- Load and Parse Config -----
 
-CONFIG_PATH = os.path.join(os.path.dirname(__file__), "config.json")
+CONFIG_PATH = os.environ.get("TOPOSTGRES_CONFIG") or os.path.join(os.path.dirname(__file__), "config.json")
+
+# Nothing is read at import: MYSQL, POSTGRES, MIGRATION and raw_config are loaded on first use (see __getattr__),
+# so commands that never connect to a database, like translating .sql files, don't need a config file
+_LOAD_LOCK = threading.Lock()
+
+
+def set_config_path(path: str):
+    """
+    Points the config at another file. Only takes effect if none of the settings has been used yet.
+    """
+    global CONFIG_PATH
+    CONFIG_PATH = path
+
+
+def _load(name: str):
+    with _LOAD_LOCK:
+        if name in globals():
+            return globals()[name]
+        if "raw_config" not in globals():
+            if os.path.exists(CONFIG_PATH):
+                with open(CONFIG_PATH) as f:
+                    globals()["raw_config"] = json.load(f)  # ✅ No [0] here — it's a plain dict
+            else:
+                globals()["raw_config"] = {}
+        raw_config = globals()["raw_config"]
+        if name == "MIGRATION":
+            # Every migration setting has a default, so offline commands run without a config file
+            value = MigrationConfig(**raw_config.get("migration", {}))
+        elif name in ("MYSQL", "POSTGRES"):
+            if name.lower() not in raw_config:
+                raise FileNotFoundError(f"No {name.lower()} connection details in {CONFIG_PATH}")
+            # Map to shared class
+            value = DatabaseConfig(**raw_config[name.lower()])
+        else:
+            value = raw_config
+        globals()[name] = value
+        return value
 
-with open(CONFIG_PATH) as f:
-    raw_config = json.load(f)  # ✅ No [0] here — it's a plain dict
 
-# Map to shared class
-MYSQL = DatabaseConfig(**raw_config["mysql"])
-POSTGRES = DatabaseConfig(**raw_config["postgres"])
+def __getattr__(name: str):
+    if name in ("MYSQL", "POSTGRES", "MIGRATION", "raw_config"):
+        return _load(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,7 +1,55 @@
-from .exporter import export_table_data
-from .importer import import_table_data
+import importlib
 
-__all__ = [
-    "export_table_data",
-    "import_table_data",
-]
+# Submodule of every export. They are imported on first use, so importing one module of the package (e.g. the
+# translator) doesn't load the database drivers the others need.
+_EXPORTS = {
+    "export_table_data": "exporter",
+    "iter_table_batches": "exporter",
+    "import_table_data": "importer",
+    "import_table_batches": "importer",
+    "TableChunk": "chunker",
+    "plan_table_chunks": "chunker",
+    "compile_converters": "converters",
+    "convert_batch": "converters",
+    "MigrationJournal": "journal",
+    "migrate_chunk": "pipeline",
+    "migrate_table": "pipeline",
+    "migrate_table_data": "pipeline",
+    "pending_chunks": "pipeline",
+    "migrate_tables_async": "async_engine",
+    "run_async_migrations": "async_engine",
+    "DumpRows": "dump",
+    "DumpTable": "dump",
+    "iter_dump_events": "dump",
+    "iter_dump_statements": "dump",
+    "load_dump": "dump",
+    "parse_insert_values": "dump",
+    "detect_watermark": "delta",
+    "sync_table": "delta",
+    "sync_tables": "delta",
+    "TableVerification": "verify",
+    "row_hash_expressions": "verify",
+    "verify_chunk": "verify",
+    "verify_tables": "verify",
+    "LeaseLost": "work_queue",
+    "WorkQueue": "work_queue",
+    "enqueue_tables": "work_queue",
+    "run_unit": "work_queue",
+    "run_worker": "work_queue",
+    "wait_for_queue": "work_queue",
+    "StageManifest": "staging",
+    "export_to_stage": "staging",
+    "import_from_stage": "staging",
+    "build_dependency_graph": "scheduler",
+    "run_table_migrations": "scheduler",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
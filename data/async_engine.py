@@ -0,0 +1,185 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from config.config import DatabaseConfig, MIGRATION
+from utils.logger import log
+from utils.metrics import METRICS
+from .chunker import TableChunk
+from .converters import Converter, compile_converters, convert_batch
+from .exporter import iter_table_batches, use_raw_rows
+from .importer import import_table_batches
+from .journal import MigrationJournal
+from .pipeline import pending_chunks
+
+_DONE = object()
+
+
+class _ReadFailed:
+    """
+    Passed down a stream's queue in place of a batch when the export failed, so the load aborts instead of committing.
+    """
+
+    def __init__(self, error: Exception):
+        self.error = error
+
+
+def _next_batch(batches, table: str, converters: list[Converter]):
+    """
+    Fetches (and converts) the next batch of an export, in a MySQL worker thread. None once the export is done.
+    """
+    batch = next(batches, None)
+    if batch is not None and converters:
+        start = time.perf_counter()
+        batch = convert_batch(batch, converters)
+        METRICS.record(table, "convert", rows=len(batch), seconds=time.perf_counter() - start)
+    return batch
+
+
+async def migrate_tables_async(tables: list[str], translated: dict[str, str], mysql_config: DatabaseConfig, pg_config: DatabaseConfig, sizes: dict[str, tuple[int, int]] = None, journal: MigrationJournal = None, mysql_streams: int = None, pg_streams: int = None, queue_depth: int = None, batch_size: int = None) -> dict:
+    """
+    Migrates the data of many tables at once on an asyncio event loop.
+    Every chunk of every table is a stream: a reader task exporting batches from MySQL and a writer task loading them
+    into PostgreSQL, joined by a bounded queue so the faster side waits for the slower one. The drivers are blocking,
+    so their calls run on one thread pool per database. Each side has a global cap on open streams, so a production
+    replica never sees more than mysql_streams queries at a time whatever the table and chunk counts.
+    A stream takes its Postgres slot before its MySQL slot: a MySQL result set is only opened once something is
+    ready to read it, and since every stream holding a MySQL slot already holds a Postgres slot the two caps can't
+    deadlock. Tables start largest first. Foreign keys are only added after the load (see plan_post_load), so
+    tables don't wait on the tables they reference.
+
+    Args:
+        tables (list[str]): Tables to migrate.
+        translated (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        sizes (dict[str, tuple[int, int]]): Estimated (rows, data length) per table, e.g. from get_mysql_table_sizes.
+        journal (MigrationJournal): Optional progress journal to record into and resume from.
+        mysql_streams (int): Concurrent MySQL reads. Defaults to the migration config.
+        pg_streams (int): Concurrent PostgreSQL loads. Defaults to the migration config.
+        queue_depth (int): Batches buffered per stream. Defaults to the migration config.
+        batch_size (int): Rows per batch. Defaults to the migration config.
+
+    Returns:
+        dict: Mapping of table names to the number of rows imported, or None if the table failed.
+    """
+    sizes = sizes or {}
+    mysql_streams = mysql_streams or MIGRATION.mysql_streams
+    pg_streams = pg_streams or MIGRATION.pg_streams
+    queue_depth = queue_depth or MIGRATION.queue_depth
+    batch_size = batch_size or MIGRATION.batch_size
+    raw = use_raw_rows()
+    loop = asyncio.get_running_loop()
+    mysql_slots = asyncio.Semaphore(mysql_streams)
+    pg_slots = asyncio.Semaphore(pg_streams)
+
+    async def stream(chunk: TableChunk, converters: list[Converter]) -> int:
+        batches = asyncio.Queue(maxsize=queue_depth)
+        writing = asyncio.Event()
+        stop = asyncio.Event()
+
+        async def put(item) -> bool:
+            # Waits while the queue is full (backpressure), but gives up once the writer has stopped reading
+            while not stop.is_set():
+                try:
+                    await asyncio.wait_for(batches.put(item), 0.5)
+                    return True
+                except asyncio.TimeoutError:
+                    continue
+            return False
+
+        async def read():
+            await writing.wait()
+            async with mysql_slots:
+                if stop.is_set():
+                    return
+                where, params = chunk.where()
+                rows = iter_table_batches(chunk.table, mysql_config, batch_size, where=where, params=params, order_by=chunk.column, raw=raw)
+                try:
+                    while True:
+                        batch = await loop.run_in_executor(mysql_pool, _next_batch, rows, chunk.table, converters)
+                        if batch is None or not await put(batch):
+                            break
+                except Exception as e:
+                    await put(_ReadFailed(e))
+                    return
+                finally:
+                    await loop.run_in_executor(mysql_pool, rows.close)
+            await put(_DONE)
+
+        def consume():
+            # Runs in the Postgres worker thread, handing the event loop's batches to import_table_batches
+            while True:
+                item = asyncio.run_coroutine_threadsafe(batches.get(), loop).result()
+                if item is _DONE:
+                    return
+                if isinstance(item, _ReadFailed):
+                    raise item.error
+                yield item
+
+        async def write() -> int:
+            async with pg_slots:
+                writing.set()
+                try:
+                    return await loop.run_in_executor(pg_pool, partial(
+                        import_table_batches, chunk.table, consume(), pg_config,
+                        label=chunk.label,
+                        checkpoint=partial(journal.checkpoint, chunk=chunk) if journal else None,
+                        atomic=not chunk.resumable,
+                        raw=raw,
+                    ))
+                finally:
+                    stop.set()
+
+        reader = asyncio.ensure_future(read())
+        try:
+            return await write()
+        finally:
+            await reader
+
+    async def migrate(table: str):
+        pg_sql = translated[table]
+        async with mysql_slots:
+            chunks = await loop.run_in_executor(
+                mysql_pool, pending_chunks, table, pg_sql, sizes.get(table, (0, 0))[0], mysql_config, journal
+            )
+        if not chunks:
+            return 0
+        converters = compile_converters(pg_sql, raw)
+        if len(chunks) > 1:
+            log(f"[{table}] Copying {len(chunks)} chunks as separate streams...", "info")
+        # Let every chunk finish before reporting a failure, so no stream is left running unawaited
+        outcomes = await asyncio.gather(*(stream(chunk, converters) for chunk in chunks), return_exceptions=True)
+        errors = [outcome for outcome in outcomes if isinstance(outcome, BaseException)]
+        if errors:
+            raise errors[0]
+        imported = sum(outcomes)
+        log(f"[{table}] ✅ Copied {imported} rows.", "success")
+        return imported
+
+    def priority(table: str) -> tuple:
+        rows, data_length = sizes.get(table, (0, 0))
+        return (-data_length, -rows, table)
+
+    # Semaphores hand out slots first come first served, so starting the tasks in size order starts the largest tables first
+    ordered = sorted(tables, key=priority)
+    with ThreadPoolExecutor(max_workers=mysql_streams, thread_name_prefix="mysql") as mysql_pool, \
+            ThreadPoolExecutor(max_workers=pg_streams, thread_name_prefix="postgres") as pg_pool:
+        outcomes = await asyncio.gather(*(migrate(table) for table in ordered), return_exceptions=True)
+
+    results = {}
+    for table, outcome in zip(ordered, outcomes):
+        if isinstance(outcome, BaseException):
+            log(f"[{table}] Migration failed: {outcome}", level="error")
+            results[table] = None
+        else:
+            results[table] = outcome
+    return {table: results[table] for table in tables}
+
+
+def run_async_migrations(tables: list[str], translated: dict[str, str], mysql_config: DatabaseConfig, pg_config: DatabaseConfig, **kwargs) -> dict:
+    """
+    Runs migrate_tables_async to completion on a new event loop, for synchronous callers.
+    """
+    return asyncio.run(migrate_tables_async(tables, translated, mysql_config, pg_config, **kwargs))
@@ -0,0 +1,102 @@
+import math
+from dataclasses import dataclass, field
+from typing import Optional
+
+import mysql.connector
+
+from config.config import DatabaseConfig, MIGRATION
+from schema.translator import extract_column_types, extract_primary_key_columns, get_integer_primary_key
+from utils.logger import log
+
+
+@dataclass
+class TableChunk:
+    table: str
+    index: int
+    column: Optional[str] = None            # Range chunks: integer primary key column
+    key_index: Optional[int] = None         # Position of that column in the exported rows
+    lo: Optional[int] = None                # Inclusive lower bound, None for a whole-table chunk
+    hi: Optional[int] = None                # Inclusive upper bound, None for a whole-table chunk
+    hash_columns: list[str] = field(default_factory=list)  # Hash chunks: columns hashed into buckets
+    buckets: int = 1
+    high_water: Optional[int] = None        # Last key committed by an earlier run, export resumes after it
+    completed: bool = False
+
+    @property
+    def label(self) -> str:
+        return f"{self.table}#{self.index}"
+
+    @property
+    def resumable(self) -> bool:
+        """
+        Whether the chunk can be committed batch by batch and resumed from its high-water mark.
+        Other chunks have no stable row order, so they are loaded in a single transaction.
+        """
+        return self.column is not None
+
+    def where(self) -> tuple[Optional[str], tuple]:
+        """
+        Builds the MySQL WHERE clause selecting this chunk's (remaining) rows.
+
+        Returns:
+            tuple[Optional[str], tuple]: The clause (without the WHERE keyword, None for all rows) and its parameters.
+        """
+        clauses, params = [], []
+        if self.column:
+            if self.lo is not None:
+                clauses.append(f"`{self.column}` BETWEEN %s AND %s")
+                params += [self.lo, self.hi]
+            if self.high_water is not None:
+                clauses.append(f"`{self.column}` > %s")
+                params.append(self.high_water)
+        elif self.buckets > 1:
+            columns = ", ".join(f"`{col}`" for col in self.hash_columns)
+            clauses.append(f"MOD(CRC32(CONCAT_WS('|', {columns})), %s) = %s")
+            params += [self.buckets, self.index]
+        return " AND ".join(clauses) or None, tuple(params)
+
+
+def plan_table_chunks(table: str, pg_sql: str, config: DatabaseConfig, estimated_rows: int, chunk_rows: int = None) -> list[TableChunk]:
+    """
+    Splits a table into chunks that can be exported and loaded independently.
+    Tables with a single-column integer primary key are split into key ranges. Anything else falls back to hashing
+    the primary key columns (or every column if there is no primary key) into buckets, which still gives disjoint
+    chunks but costs each chunk a full scan on the MySQL side.
+
+    Args:
+        table (str): The name of the table.
+        pg_sql (str): The translated PostgreSQL CREATE TABLE statement, used to find the key.
+        config (DatabaseConfig): Config object for the MySQL connection.
+        estimated_rows (int): Estimated row count, e.g. from get_mysql_table_sizes.
+        chunk_rows (int): Target rows per chunk, 0 disables chunking. Defaults to the migration config.
+
+    Returns:
+        list[TableChunk]: The chunks. A table small enough to copy in one go gets a single whole-table chunk.
+    """
+    chunk_rows = MIGRATION.chunk_rows if chunk_rows is None else chunk_rows
+    key = get_integer_primary_key(pg_sql)
+    key_index = list(extract_column_types(pg_sql)).index(key) if key else None
+    whole_table = [TableChunk(table, 0, column=key, key_index=key_index)]
+    if not chunk_rows or estimated_rows <= chunk_rows:
+        return whole_table
+    chunk_count = math.ceil(estimated_rows / chunk_rows)
+
+    if key:
+        conn = mysql.connector.connect(**config.unpack_mysql())
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT MIN(`{key}`), MAX(`{key}`) FROM `{table}`")
+        lo, hi = cursor.fetchone()
+        cursor.close()
+        conn.close()
+        if lo is None:
+            return whole_table
+        width = max(math.ceil((hi - lo + 1) / chunk_count), 1)
+        return [
+            TableChunk(table, index, column=key, key_index=key_index, lo=start, hi=min(start + width - 1, hi))
+            for index, start in enumerate(range(lo, hi + 1, width))
+        ]
+
+    # Hash fallback, there is no key we can range over
+    hash_columns = extract_primary_key_columns(pg_sql) or list(extract_column_types(pg_sql))
+    log(f"[{table}] No single-column integer primary key, splitting into {chunk_count} hash chunks on {hash_columns}.", level="warn")
+    return [TableChunk(table, index, hash_columns=hash_columns, buckets=chunk_count) for index in range(chunk_count)]
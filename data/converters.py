@@ -0,0 +1,171 @@
+import binascii
+import re
+from datetime import date, datetime, timedelta
+from functools import partial
+from typing import Callable
+
+from schema.translator import extract_column_definitions
+
+# Position of a column in the exported rows, and the function fixing up its values
+Converter = tuple[int, Callable]
+
+_DAY = timedelta(days=1)
+# The members of a SET column, from the CHECK the translator puts on its TEXT[] column
+_SET_MEMBERS_RE = re.compile(r"<@\s*ARRAY\[(.*?)\]\)")
+_MEMBER_RE = re.compile(r"'((?:[^']|'')*)'")
+
+
+def compile_converters(pg_sql: str, raw: bool = False) -> list[Converter]:
+    """
+    Works out, once per table, which columns need their MySQL values reshaped before Postgres will accept them.
+    Columns whose values load as they are get no converter at all, so they cost nothing per row.
+    Raw rows hold each value as the bytes MySQL sent, which for numbers, strings, JSON, dates and times already are
+    the text Postgres reads; only binary strings (sent as is, Postgres wants hex), SET, BIT and zero dates differ.
+
+    Args:
+        pg_sql (str): The translated PostgreSQL CREATE TABLE statement.
+        raw (bool): Convert raw rows (see iter_table_batches) into Postgres text, as bytes, instead of typed rows.
+
+    Returns:
+        list[Converter]: (column index, converter) pairs, empty if the table needs no conversion.
+    """
+    converters = []
+    for index, definition in enumerate(extract_column_definitions(pg_sql).values()):
+        upper = definition.upper()
+        not_null = "NOT NULL" in upper or "PRIMARY KEY" in upper
+        if upper.startswith("TEXT[]"):
+            converter = partial(_set_to_array, members=_set_members(definition))
+            converters.append((index, _encoded(converter) if raw else converter))
+        elif upper.startswith("BIT"):
+            width = re.match(r"BIT\s*\((\d+)\)", upper)
+            converter = partial(_bit_to_text, width=int(width.group(1)) if width else 1)
+            converters.append((index, _encoded(converter) if raw else converter))
+        elif upper.startswith("BYTEA"):
+            if raw:
+                converters.append((index, _bytes_to_hex))
+        elif upper.startswith("TIMESTAMP"):
+            if raw:
+                converters.append((index, partial(_raw_zero_date, fallback=b"0001-01-01 00:00:00" if not_null else None)))
+            else:
+                converters.append((index, partial(_zero_date, fallback=datetime.min if not_null else None)))
+        elif upper.startswith("DATE"):
+            if raw:
+                converters.append((index, partial(_raw_zero_date, fallback=b"0001-01-01" if not_null else None)))
+            else:
+                converters.append((index, partial(_zero_date, fallback=date.min if not_null else None)))
+        elif upper.startswith("TIME") and not raw:
+            # Raw TIME values are already "hh:mm:ss", and out of range either way when they aren't a time of day
+            converters.append((index, _timedelta_to_time))
+    return converters
+
+
+def convert_batch(rows: list[tuple], converters: list[Converter]) -> list[tuple]:
+    """
+    Applies a table's converters to a batch. The batch is turned into columns so each converter runs over a
+    whole column in one map() call, and is left untouched when there is nothing to convert.
+
+    Args:
+        rows (list[tuple]): The exported rows.
+        converters (list[Converter]): From compile_converters.
+
+    Returns:
+        list[tuple]: The converted rows.
+    """
+    if not converters or not rows:
+        return rows
+    columns = list(zip(*rows))
+    for index, converter in converters:
+        columns[index] = map(converter, columns[index])
+    return list(zip(*columns))
+
+
+def _set_members(definition: str) -> dict[str, int]:
+    """
+    Positions of a SET column's members in its definition, from the CHECK on its translated TEXT[] column.
+    """
+    match = _SET_MEMBERS_RE.search(definition)
+    if not match:
+        return {}
+    return {member.replace("''", "'"): position for position, member in enumerate(_MEMBER_RE.findall(match.group(1)))}
+
+
+def _set_to_array(value, members: dict[str, int] = None):
+    """
+    SET values (a Python set from the connector, or the raw 'a,b' string) become a Postgres array literal for TEXT[].
+    Members keep MySQL's definition order, which is how MySQL prints a SET, so the array reads back the same.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("utf-8")
+    if isinstance(value, str):
+        # Already in definition order
+        elements = value.split(",") if value else []
+    else:
+        # A Python set has no order: use the definition's, or sort if the members aren't known
+        members = members or {}
+        elements = sorted((str(element) for element in value), key=lambda element: (members.get(element, len(members)), element))
+    return "{" + ",".join('"' + element.replace("\\", "\\\\").replace('"', '\\"') + '"' for element in elements) + "}"
+
+
+def _bit_to_text(value, width: int):
+    """
+    BIT values come back as an int (or raw bytes), Postgres BIT(n) wants the bit string.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (bytes, bytearray)):
+        value = int.from_bytes(value, "big")
+    return format(value, f"0{width}b")
+
+
+def _zero_date(value, fallback):
+    """
+    MySQL zero dates ('0000-00-00', or a zero month / day) have no Postgres equivalent. The connector already
+    turns them into None, so only raw strings need catching. NOT NULL columns get the earliest date instead.
+    """
+    if value is None:
+        return fallback
+    if isinstance(value, (bytes, bytearray)):
+        value = value.decode("ascii")
+    if isinstance(value, str) and (value.startswith("0000") or value[5:7] == "00" or value[8:10] == "00"):
+        return fallback
+    return value
+
+
+def _timedelta_to_time(value):
+    """
+    TIME values come back as a timedelta, since MySQL allows -838:59:59 to 838:59:59. Those within a day become a
+    time of day; anything else is left for Postgres to reject.
+    """
+    if isinstance(value, timedelta) and timedelta(0) <= value < _DAY:
+        return (datetime.min + value).time()
+    return value
+
+
+def _encoded(converter: Callable) -> Callable:
+    """
+    Wraps a converter for raw rows, whose values have to stay bytes.
+    """
+    def convert(value):
+        value = converter(value)
+        return value.encode("utf-8") if isinstance(value, str) else value
+    return convert
+
+
+def _bytes_to_hex(value):
+    """
+    Raw binary strings are the bytes themselves, Postgres BYTEA text input wants them in hex.
+    """
+    if value is None:
+        return None
+    return b"\\x" + binascii.hexlify(value)
+
+
+def _raw_zero_date(value, fallback):
+    """
+    _zero_date for raw values: MySQL sends zero dates as they are, e.g. b'0000-00-00 00:00:00'.
+    """
+    if value is not None and (value.startswith(b"0000") or value[5:7] == b"00" or value[8:10] == b"00"):
+        return fallback
+    return value
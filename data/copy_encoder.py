@@ -0,0 +1,255 @@
+import io
+import re
+import struct
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+COPY_FORMATS = ("text", "csv", "binary")
+
+_TEXT_ESCAPES = str.maketrans({
+    "\\": "\\\\",
+    "\t": "\\t",
+    "\n": "\\n",
+    "\r": "\\r",
+})
+
+# COPY text escapes for raw bytes, which have no str.translate: found with one search, replaced only if present
+_RAW_SPECIALS = re.compile(rb"[\\\t\n\r]")
+_RAW_ESCAPES = {b"\\": b"\\\\", b"\t": b"\\t", b"\n": b"\\n", b"\r": b"\\r"}
+
+_PG_EPOCH_DATE = date(2000, 1, 1)
+_PG_EPOCH = datetime(2000, 1, 1)
+_BINARY_HEADER = b"PGCOPY\n\xff\r\n\x00" + struct.pack("!ii", 0, 0)
+_BINARY_TRAILER = struct.pack("!h", -1)
+
+
+class UnsupportedCopyType(ValueError):
+    """Raised when a column type has no binary COPY encoder."""
+
+
+# ----- Text / CSV -----
+
+def _timedelta_to_text(value: timedelta) -> str:
+    # MySQL TIME comes back as a timedelta, str() would give "1 day, 2:00:00"
+    total = int(value.total_seconds())
+    sign = "-" if total < 0 else ""
+    total = abs(total)
+    text = f"{sign}{total // 3600:02d}:{total % 3600 // 60:02d}:{total % 60:02d}"
+    if value.microseconds:
+        text += f".{value.microseconds:06d}"
+    return text
+
+
+def _to_text(value) -> str:
+    """
+    Renders a single Python value in the form Postgres expects on input, without COPY escaping.
+    """
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, (date, time)):
+        return value.isoformat()
+    if isinstance(value, timedelta):
+        return _timedelta_to_text(value)
+    return str(value)
+
+
+def encode_text_rows(rows: list[tuple], buffer: io.StringIO):
+    """
+    Writes rows to a buffer in PostgreSQL COPY text format.
+
+    Args:
+        rows (list[tuple]): Rows to encode.
+        buffer (io.StringIO): Buffer to write the encoded rows into.
+    """
+    write = buffer.write
+    for row in rows:
+        write("\t".join(
+            "\\N" if value is None else _to_text(value).translate(_TEXT_ESCAPES)
+            for value in row
+        ))
+        write("\n")
+
+
+def _escape_raw(match) -> bytes:
+    return _RAW_ESCAPES[match.group()]
+
+
+def encode_raw_text_rows(rows: list[tuple], buffer: io.BytesIO):
+    """
+    Writes raw rows (see iter_table_batches) to a buffer in PostgreSQL COPY text format. Every value is already
+    Postgres text as bytes (see compile_converters), so it is only escaped, and most values are written as they are.
+
+    Args:
+        rows (list[tuple]): Rows of bytes (or None) to encode.
+        buffer (io.BytesIO): Buffer to write the encoded rows into.
+    """
+    write = buffer.write
+    search = _RAW_SPECIALS.search
+    sub = _RAW_SPECIALS.sub
+    for row in rows:
+        write(b"\t".join([
+            b"\\N" if value is None else sub(_escape_raw, value) if search(value) else value
+            for value in row
+        ]))
+        write(b"\n")
+
+
+def _to_csv(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, (int, float, Decimal)) and not isinstance(value, bool):
+        return str(value)
+    return '"' + _to_text(value).replace('"', '""') + '"'
+
+
+def encode_csv_rows(rows: list[tuple], buffer: io.StringIO):
+    """
+    Writes rows to a buffer in PostgreSQL COPY CSV format.
+    Every non-numeric value is quoted so that NULL (unquoted empty) and '' (quoted empty) stay distinct.
+
+    Args:
+        rows (list[tuple]): Rows to encode.
+        buffer (io.StringIO): Buffer to write the encoded rows into.
+    """
+    write = buffer.write
+    for row in rows:
+        write(",".join(_to_csv(value) for value in row))
+        write("\n")
+
+
+# ----- Binary -----
+
+def _encode_numeric(value) -> bytes:
+    value = Decimal(value)
+    if value.is_nan():
+        return struct.pack("!hhHh", 0, 0, 0xC000, 0)
+    sign, digits, exponent = value.as_tuple()
+    dscale = max(-exponent, 0)
+    # Pad the integer and fractional parts out to whole base-10000 digits
+    digits_str = "".join(map(str, digits)) or "0"
+    if exponent > 0:
+        digits_str += "0" * exponent
+        exponent = 0
+    int_len = len(digits_str) + exponent
+    int_part = digits_str[:int_len] if int_len > 0 else ""
+    frac_part = digits_str[int_len:] if int_len > 0 else "0" * -int_len + digits_str
+    int_part = int_part.zfill((len(int_part) + 3) // 4 * 4)
+    frac_part = frac_part.ljust((len(frac_part) + 3) // 4 * 4, "0")
+    groups = [int(int_part[i:i + 4]) for i in range(0, len(int_part), 4)]
+    weight = len(groups) - 1
+    groups += [int(frac_part[i:i + 4]) for i in range(0, len(frac_part), 4)]
+    # Strip leading / trailing zero groups, Postgres never stores them
+    while groups and groups[0] == 0:
+        groups.pop(0)
+        weight -= 1
+    while groups and groups[-1] == 0:
+        groups.pop()
+    if not groups:
+        weight = 0
+    return struct.pack(f"!hhHh{len(groups)}h", len(groups), weight, 0x4000 if sign else 0, dscale, *groups)
+
+
+def _encode_text(value) -> bytes:
+    return value.encode("utf-8") if isinstance(value, str) else _to_text(value).encode("utf-8")
+
+
+def _encode_bytea(value) -> bytes:
+    return bytes(value) if isinstance(value, (bytes, bytearray, memoryview)) else _encode_text(value)
+
+
+def _encode_jsonb(value) -> bytes:
+    if isinstance(value, (bytes, bytearray)):
+        return b"\x01" + bytes(value)
+    return b"\x01" + _encode_text(value)
+
+
+def _encode_date(value) -> bytes:
+    if isinstance(value, datetime):
+        value = value.date()
+    return struct.pack("!i", (value - _PG_EPOCH_DATE).days)
+
+
+def _encode_timestamp(value) -> bytes:
+    if not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    delta = value.replace(tzinfo=None) - _PG_EPOCH
+    return struct.pack("!q", (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds)
+
+
+def _encode_time(value) -> bytes:
+    if isinstance(value, timedelta):
+        micros = (value.days * 86400 + value.seconds) * 1_000_000 + value.microseconds
+    else:
+        micros = ((value.hour * 60 + value.minute) * 60 + value.second) * 1_000_000 + value.microsecond
+    return struct.pack("!q", micros)
+
+
+_BINARY_ENCODERS = {
+    "smallint": struct.Struct("!h").pack,
+    "integer": struct.Struct("!i").pack,
+    "bigint": struct.Struct("!q").pack,
+    "real": struct.Struct("!f").pack,
+    "double precision": struct.Struct("!d").pack,
+    "boolean": struct.Struct("!?").pack,
+    "numeric": _encode_numeric,
+    "text": _encode_text,
+    "character varying": _encode_text,
+    "character": _encode_text,
+    "json": _encode_text,
+    "jsonb": _encode_jsonb,
+    "bytea": _encode_bytea,
+    "date": _encode_date,
+    "timestamp without time zone": _encode_timestamp,
+    "time without time zone": _encode_time,
+}
+
+
+def get_binary_encoders(column_types: list[str]) -> list:
+    """
+    Resolves a binary COPY encoder for each target column.
+
+    Args:
+        column_types (list[str]): Postgres type names of the target columns (as given by regtype, e.g. "integer").
+
+    Returns:
+        list: One encoder callable per column.
+
+    Raises:
+        UnsupportedCopyType: If any column type has no binary encoder.
+    """
+    encoders = []
+    for column_type in column_types:
+        # Strip type modifiers, e.g. "character varying(60)" or "numeric(10,2)"
+        base_type = column_type.split("(")[0].strip()
+        if base_type not in _BINARY_ENCODERS:
+            raise UnsupportedCopyType(f"No binary COPY encoder for type '{column_type}'")
+        encoders.append(_BINARY_ENCODERS[base_type])
+    return encoders
+
+
+def encode_binary_rows(rows: list[tuple], encoders: list, buffer: io.BytesIO):
+    """
+    Writes rows to a buffer as a complete PostgreSQL binary COPY stream (header, tuples, trailer).
+
+    Args:
+        rows (list[tuple]): Rows to encode.
+        encoders (list): Per-column encoders from get_binary_encoders.
+        buffer (io.BytesIO): Buffer to write the encoded stream into.
+    """
+    write = buffer.write
+    field_count = struct.pack("!h", len(encoders))
+    write(_BINARY_HEADER)
+    for row in rows:
+        write(field_count)
+        for value, encode in zip(row, encoders):
+            if value is None:
+                write(b"\xff\xff\xff\xff")
+                continue
+            data = encode(value)
+            write(struct.pack("!i", len(data)))
+            write(data)
+    write(_BINARY_TRAILER)
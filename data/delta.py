@@ -0,0 +1,166 @@
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import psycopg2
+from psycopg2 import sql
+
+from config.config import DatabaseConfig, MIGRATION
+from schema.ddl import parse_create_table
+from schema.translator import _INTEGER_PG_TYPES, extract_column_types, extract_primary_key_columns, get_integer_primary_key
+from utils.logger import log
+from utils.metrics import METRICS
+from .converters import compile_converters, convert_batch
+from .exporter import iter_table_batches
+from .importer import _copy_batch, _prepare_copy
+from .journal import MigrationJournal
+
+STAGING_TABLE = "_topostgres_delta"
+
+
+def detect_watermark(pg_sql: str, mysql_sql: str, column: str = None) -> tuple[str, str] | None:
+    """
+    Picks the column a table's changes can be found by. A column kept current by MySQL itself
+    (ON UPDATE CURRENT_TIMESTAMP) catches inserts and updates; failing that, an integer primary key catches inserts.
+
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
+        mysql_sql (str): The MySQL CREATE TABLE statement.
+        column (str): A column to use instead of detecting one, e.g. from the sync_columns config.
+
+    Returns:
+        tuple[str, str] | None: The column and its kind, "timestamp" or "key", or None if the table has neither.
+    """
+    types = extract_column_types(pg_sql)
+    if column:
+        return column, "key" if types.get(column) in _INTEGER_PG_TYPES else "timestamp"
+    if mysql_sql:
+        for col in parse_create_table(mysql_sql).columns:
+            if col.on_update and "CURRENT_TIMESTAMP" in col.on_update.upper() and col.name in types:
+                return col.name, "timestamp"
+    key = get_integer_primary_key(pg_sql)
+    return (key, "key") if key else None
+
+
+def _watermark_filter(column: str, kind: str, state: dict) -> tuple[str, tuple]:
+    """
+    Builds the MySQL WHERE clause selecting the rows changed since the recorded watermark (None for all rows).
+    Timestamps are re-read from sync_overlap seconds back, as a row can commit after rows with later timestamps.
+    """
+    if not state or state.get("column") != column or state.get("watermark") is None:
+        return None, ()
+    if kind == "key":
+        return f"`{column}` > %s", (int(state["watermark"]),)
+    since = datetime.fromisoformat(state["watermark"]) - timedelta(seconds=MIGRATION.sync_overlap)
+    return f"`{column}` >= %s", (since,)
+
+
+def sync_table(table: str, pg_sql: str, mysql_sql: str, mysql_config: DatabaseConfig, pg_config: DatabaseConfig, journal: MigrationJournal) -> int:
+    """
+    Copies the rows of a table changed since its last sync into PostgreSQL, inserting new rows and updating
+    existing ones by primary key. Each batch is COPYed into a temporary staging table and merged from there with
+    INSERT ... ON CONFLICT DO UPDATE, and the new watermark is recorded in the same transaction. Without a recorded
+    watermark every row is copied, so the first sync after a full load catches up from scratch.
+    Deleted rows are not detected.
+
+    Args:
+        table (str): The table to sync.
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
+        mysql_sql (str): The MySQL CREATE TABLE statement, to detect the watermark column.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        journal (MigrationJournal): Journal the watermark is kept in.
+
+    Returns:
+        int: The number of rows copied, or None if the table can't be synced.
+    """
+    keys = extract_primary_key_columns(pg_sql)
+    watermark = detect_watermark(pg_sql, mysql_sql, MIGRATION.sync_columns.get(table))
+    if not keys or not watermark:
+        log(f"[{table}] No primary key or no column to find changes by, can't sync it.", level="warn")
+        return None
+    column, kind = watermark
+    if kind == "key":
+        log(f"[{table}] Syncing by primary key: only new rows are copied, not updated ones.", level="info")
+    columns = list(extract_column_types(pg_sql))
+    position = columns.index(column)
+    where, params = _watermark_filter(column, kind, journal.get_sync_state(table))
+
+    conn = psycopg2.connect(**pg_config.unpack_postgres())
+    cur = conn.cursor()
+    staging = sql.Identifier(STAGING_TABLE)
+    cur.execute(sql.SQL("CREATE TEMP TABLE {staging} (LIKE {table}) ON COMMIT DELETE ROWS").format(
+        staging=staging, table=sql.Identifier(table)
+    ))
+    copy_query, copy_format, encoders = _prepare_copy(cur, STAGING_TABLE, "text", table)
+    updates = [column_name for column_name in columns if column_name not in keys]
+    merge_query = sql.SQL("INSERT INTO {table} ({columns}) SELECT {columns} FROM {staging} ON CONFLICT ({keys}) DO {action}").format(
+        table=sql.Identifier(table),
+        columns=sql.SQL(", ").join(map(sql.Identifier, columns)),
+        staging=staging,
+        keys=sql.SQL(", ").join(map(sql.Identifier, keys)),
+        action=sql.SQL("UPDATE SET {}").format(sql.SQL(", ").join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(name)) for name in updates
+        )) if updates else sql.SQL("NOTHING"),
+    )
+
+    converters = compile_converters(pg_sql)
+    synced = 0
+    try:
+        # In watermark order, so the watermark recorded after each batch covers every row before it
+        for batch in iter_table_batches(table, mysql_config, where=where, params=params, order_by=column):
+            batch_start = time.perf_counter()
+            last = batch[-1][position]
+            sent, waited = _copy_batch(cur, copy_query, copy_format, encoders, convert_batch(batch, converters))
+            start = time.perf_counter()
+            cur.execute(merge_query)
+            if last is not None:
+                if kind == "key":
+                    value = int(last)
+                else:
+                    # A sync_columns override can name a DATE column, whose isoformat takes no separator
+                    value = last.isoformat(sep=" ") if isinstance(last, datetime) else last.isoformat()
+                journal.record_sync_state(cur, table, {"column": column, "kind": kind, "watermark": value}, len(batch))
+            conn.commit()
+            waited += time.perf_counter() - start
+            synced += len(batch)
+            METRICS.record(table, "load", rows=len(batch), bytes=sent, seconds=time.perf_counter() - batch_start, wait={"postgres": waited})
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+    log(f"[{table}] ✅ Synced {synced} changed rows.", "success")
+    return synced
+
+
+def sync_tables(translated: dict[str, str], mysql_tables: dict[str, str], mysql_config: DatabaseConfig, pg_config: DatabaseConfig, journal: MigrationJournal, workers: int = None) -> dict:
+    """
+    Runs sync_table over many tables on a thread pool.
+
+    Args:
+        translated (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+        mysql_tables (dict[str, str]): Mapping of table names to their MySQL CREATE TABLE statements.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        journal (MigrationJournal): Journal the watermarks are kept in.
+        workers (int): Tables synced at once. Defaults to the migration config.
+
+    Returns:
+        dict: Mapping of table names to the number of rows copied, or None if the table failed or can't be synced.
+    """
+    workers = workers or MIGRATION.workers
+    results = {}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="sync") as pool:
+        futures = {
+            table: pool.submit(sync_table, table, pg_sql, mysql_tables.get(table, ""), mysql_config, pg_config, journal)
+            for table, pg_sql in translated.items()
+        }
+        for table, future in futures.items():
+            try:
+                results[table] = future.result()
+            except Exception as e:
+                log(f"[{table}] Sync failed: {e}", level="error")
+                results[table] = None
+    return results
@@ -0,0 +1,283 @@
+import itertools
+import queue
+import re
+import threading
+import time
+from dataclasses import dataclass
+from typing import Iterator, Optional, Union
+
+from config.config import DatabaseConfig, MIGRATION
+from schema.post_load import build_post_load, plan_post_load
+from schema.statements import iter_dump_statements
+from schema.translator import _translate_table, extract_column_definitions, split_deferred_constraints, translate_schema
+from utils.logger import log
+from utils.metrics import METRICS
+from .converters import compile_converters, convert_batch
+
+_CREATE_RE = re.compile(r"CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?(?:`((?:[^`]|``)+)`|(\w+))", re.I)
+_INSERT_RE = re.compile(
+    r"(?:INSERT|REPLACE)\s+(?:(?:LOW_PRIORITY|DELAYED|HIGH_PRIORITY|IGNORE)\s+)*INTO\s+(?:`((?:[^`]|``)+)`|(\w+))\s*"
+    r"(?:\(([^)]*)\)\s*)?VALUES\s*",
+    re.I,
+)
+# One value of an INSERT, or the parenthesis around a row, with any separators before it
+_VALUE_RE = re.compile(r"""[\s,]*(?:
+    '(?P<string>[^'\\]*(?:(?:\\.|'')[^'\\]*)*)'
+  | (?P<hex>0x[0-9A-Fa-f]*|[Xx]'[0-9A-Fa-f]*')
+  | (?P<bits>0b[01]+|[Bb]'[01]*')
+  | (?P<number>[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?)
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<null>NULL\b)
+  | (?P<word>[A-Za-z_][A-Za-z0-9_]*)
+)""", re.X)
+_UNESCAPES = {"0": "\x00", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a", "%": "\\%", "_": "\\_"}
+_ESCAPE_RE = re.compile(r"\\(.)|''", re.S)
+
+
+@dataclass
+class DumpTable:
+    name: str
+    sql: str                        # The MySQL CREATE TABLE statement
+
+
+@dataclass
+class DumpRows:
+    table: str
+    columns: Optional[list[str]]    # Column list of the INSERT, None for all columns in table order
+    rows: list[tuple]
+
+
+def _unescape_match(match) -> str:
+    escaped = match.group(1)
+    return "'" if escaped is None else _UNESCAPES.get(escaped, escaped)
+
+
+def _unescape(text: str) -> str:
+    if "\\" not in text and "''" not in text:
+        return text
+    return _ESCAPE_RE.sub(_unescape_match, text)
+
+
+def parse_insert_values(text: str, start: int = 0) -> list[tuple]:
+    """
+    Parses the value tuples of an INSERT statement, as mysqldump writes them.
+    Strings and numbers are kept as text (Postgres parses them on COPY, without losing precision), NULL becomes None,
+    hex and _binary strings become bytes and bit literals become ints.
+
+    Args:
+        text (str): The statement.
+        start (int): Position of the first value tuple.
+
+    Returns:
+        list[tuple]: The rows.
+    """
+    rows = []
+    row = None
+    introducer = None
+    pos = start
+    for m in _VALUE_RE.finditer(text, start):
+        if m.start() != pos:
+            break
+        pos = m.end()
+        kind = m.lastgroup
+        if kind == "string":
+            value = _unescape(m.group(kind))
+            if introducer is not None:
+                if introducer == "_binary":
+                    value = value.encode("utf-8", "surrogateescape")
+                introducer = None
+            row.append(value)
+        elif kind == "number":
+            row.append(m.group(kind))
+        elif kind == "open":
+            row = []
+        elif kind == "close":
+            rows.append(tuple(row))
+        elif kind == "null":
+            row.append(None)
+        elif kind == "hex":
+            digits = m.group(kind)
+            row.append(bytes.fromhex(digits[2:] if digits[0] == "0" else digits[2:-1]))
+            introducer = None
+        elif kind == "bits":
+            digits = m.group(kind)
+            row.append(int(digits[2:] if digits[0] == "0" else digits[2:-1] or "0", 2))
+        else:
+            word = m.group(kind)
+            upper = word.upper()
+            if word.startswith("_"):
+                # Character set introducer, e.g. _binary '...' or _utf8mb4 '...'
+                introducer = word.lower()
+            elif upper in ("TRUE", "FALSE"):
+                row.append("1" if upper == "TRUE" else "0")
+            else:
+                raise ValueError(f"Unexpected word in INSERT values: {word}")
+    if text[pos:].strip(" \t\r\n,;"):
+        raise ValueError(f"Unexpected input in INSERT values at {pos}: {text[pos:pos + 40]!r}")
+    return rows
+
+
+def _identifier(quoted: Optional[str], bare: Optional[str]) -> str:
+    return quoted.replace("``", "`") if quoted is not None else bare
+
+
+def iter_dump_events(source, batch_size: int = None) -> Iterator[Union[DumpTable, DumpRows]]:
+    """
+    Reads a mysqldump file as a stream of table definitions and row batches, in file order.
+    Rows of consecutive INSERTs into the same table are gathered into batches of batch_size; a table's rows always
+    come after its definition. Everything else in the dump (SET, LOCK TABLES, views, triggers, ...) is skipped.
+
+    Args:
+        source (str | file): Path of the dump (optionally gzipped), or a text file object.
+        batch_size (int): Rows per DumpRows batch. Defaults to the migration config.
+
+    Yields:
+        DumpTable | DumpRows: The next table definition or batch of rows.
+    """
+    batch_size = batch_size or MIGRATION.batch_size
+    pending = None
+
+    def flush():
+        nonlocal pending
+        batch, pending = pending, None
+        return batch
+
+    for statement in iter_dump_statements(source):
+        head = statement[:7].upper()
+        if head in ("INSERT ", "REPLACE"):
+            match = _INSERT_RE.match(statement)
+            if match:
+                start = time.perf_counter()
+                table = _identifier(match.group(1), match.group(2))
+                columns = [column.strip().strip("`") for column in match.group(3).split(",")] if match.group(3) else None
+                rows = parse_insert_values(statement, match.end())
+                METRICS.record(table, "export", rows=len(rows), bytes=len(statement), seconds=time.perf_counter() - start)
+                if pending is not None and (pending.table != table or pending.columns != columns):
+                    yield flush()
+                while rows:
+                    if pending is None:
+                        pending = DumpRows(table, columns, [])
+                    room = batch_size - len(pending.rows)
+                    pending.rows.extend(rows[:room])
+                    rows = rows[room:]
+                    if len(pending.rows) >= batch_size:
+                        yield flush()
+                continue
+        if head == "CREATE ":
+            match = _CREATE_RE.match(statement)
+            if match:
+                if pending is not None:
+                    yield flush()
+                yield DumpTable(_identifier(match.group(1), match.group(2)), statement)
+    if pending is not None:
+        yield flush()
+
+
+def _prefetch(events: Iterator, depth: int) -> Iterator:
+    """
+    Runs an iterator in a background thread, a bounded number of items ahead, so reading and parsing the dump
+    overlaps with loading into Postgres.
+    """
+    items = queue.Queue(maxsize=depth)
+    done = object()
+    stop = threading.Event()
+    errors = []
+
+    def produce():
+        try:
+            for item in events:
+                while not stop.is_set():
+                    try:
+                        items.put(item, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    return
+        except Exception as e:
+            errors.append(e)
+        finally:
+            while not stop.is_set():
+                try:
+                    items.put(done, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    producer = threading.Thread(target=produce, name="dump-reader", daemon=True)
+    producer.start()
+    try:
+        while True:
+            item = items.get()
+            if item is done:
+                break
+            yield item
+    finally:
+        stop.set()
+        producer.join()
+    if errors:
+        raise errors[0]
+
+
+def _column_converters(pg_sql: str, columns: Optional[list[str]]):
+    """
+    Compiles a table's converters, re-indexed for the column list of an INSERT if it has one.
+    """
+    converters = compile_converters(pg_sql)
+    if not columns:
+        return converters
+    names = list(extract_column_definitions(pg_sql))
+    positions = {column: index for index, column in enumerate(columns)}
+    return [(positions[names[index]], converter) for index, converter in converters if names[index] in positions]
+
+
+def load_dump(source, pg_config: DatabaseConfig, batch_size: int = None, queue_depth: int = None, post_load: bool = True) -> dict[str, int]:
+    """
+    Loads a mysqldump file into PostgreSQL without a MySQL server, streaming it so the dump is never held in memory.
+    Each CREATE TABLE is translated and created (bare, like migrate_schema does) as soon as it is read, and the
+    table's INSERTs are converted and loaded with COPY as they follow. Once the whole dump is in, the schema is
+    translated again as a whole, for the foreign key checks, and the keys, indexes and foreign keys are built.
+
+    Args:
+        source (str | file): Path of the dump (optionally gzipped), or a text file object.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        batch_size (int): Rows per COPY batch. Defaults to the migration config.
+        queue_depth (int): Batches read ahead of the load. Defaults to the migration config.
+        post_load (bool): Build keys, indexes and foreign keys at the end.
+
+    Returns:
+        dict[str, int]: Mapping of table names to the number of rows loaded.
+    """
+    # Imported here rather than at the top, so reading a dump (see iter_dump_events) works without the driver
+    from schema.creator import create_pg_tables
+    from .importer import import_table_batches
+
+    mysql_tables, translated, loaded = {}, {}, {}
+    events = _prefetch(iter_dump_events(source, batch_size), queue_depth or MIGRATION.queue_depth)
+    for key, group in itertools.groupby(events, key=lambda event: (type(event), getattr(event, "table", None), getattr(event, "columns", None))):
+        kind, table, columns = key
+        if kind is DumpTable:
+            for event in group:
+                log(f"[{event.name}] Creating table from the dump...", "info")
+                mysql_tables[event.name] = event.sql
+                translated[event.name] = _translate_table(event.sql)
+                bare, _ = split_deferred_constraints(translated[event.name], event.sql)
+                create_pg_tables({event.name: bare}, pg_config)
+            continue
+
+        if table not in translated:
+            log(f"[{table}] Rows found before the table's CREATE TABLE, skipping them.", level="warn")
+            for _ in group:
+                pass
+            continue
+        converters = _column_converters(translated[table], columns)
+        batches = (convert_batch(event.rows, converters) for event in group)
+        # Values are parsed as text, which only the text COPY format takes as is
+        loaded[table] = loaded.get(table, 0) + import_table_batches(table, batches, pg_config, copy_format="text", columns=columns)
+
+    log(f"✅ Loaded {sum(loaded.values())} rows into {len(loaded)} tables from the dump.", "success")
+    if post_load and mysql_tables:
+        _, steps = plan_post_load(translate_schema(mysql_tables), mysql_tables)
+        build_post_load(steps, pg_config)
+    return loaded
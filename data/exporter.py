@@ -1,15 +1,73 @@
+import time
+
 import mysql.connector
 
+from config.config import MIGRATION
 from utils.logger import log
+from utils.metrics import METRICS
 
 def export_table_data(table, config):
-    conn = mysql.connector.connect(**config.unpack_mysql())
-    cursor = conn.cursor()
-    cursor.execute(f"SELECT * FROM {table}")
-    rows = cursor.fetchall()
-    cursor.close()
-    conn.close()
+    """
+    Exports a whole table into memory. Prefer iter_table_batches for anything that might not fit in RAM.
+    """
+    rows = [row for batch in iter_table_batches(table, config) for row in batch]
     if not rows:
         log(f"No data found in table {table}.", level="warn")
         log(f"Query: SELECT * FROM {table}", level="info")
     return rows
+
+
+def use_raw_rows(method: str = None, copy_format: str = None) -> bool:
+    """
+    Whether rows should be exported raw (see iter_table_batches): only a text COPY can take MySQL's bytes as they
+    are. Defaults to the migration config.
+    """
+    return MIGRATION.raw_passthrough and (method or MIGRATION.load_method) == "copy" and (copy_format or MIGRATION.copy_format) == "text"
+
+
+def iter_table_batches(table, config, batch_size: int = None, where: str = None, params: tuple = (), order_by: str = None, raw: bool = False):
+    """
+    Streams a table out of MySQL in batches, using an unbuffered cursor so only one batch is held in memory at a time.
+    Raw batches hold every value as the bytes MySQL sent (None for NULL), skipping the connector's conversion to
+    Python objects; compile_converters(raw=True) and encode_raw_text_rows take them from there.
+
+    Args:
+        table (str): The name of the table to export.
+        config (DatabaseConfig): Config object for the database connection.
+        batch_size (int): Rows per batch. Defaults to the migration config.
+        where (str): Optional WHERE clause (without the keyword) restricting the rows exported, e.g. a chunk range.
+        params (tuple): Parameters for placeholders in the WHERE clause.
+        order_by (str): Optional column to export in order of, needed to resume from a high-water mark.
+        raw (bool): Fetch values as raw bytes.
+
+    Yields:
+        list[tuple]: The next batch of rows.
+    """
+    batch_size = batch_size or MIGRATION.batch_size
+    conn = mysql.connector.connect(**config.unpack_mysql())
+    cursor = conn.cursor(buffered=False, raw=raw)
+    exhausted = False
+    try:
+        query = f"SELECT * FROM `{table}`"
+        if where:
+            query += f" WHERE {where}"
+        if order_by:
+            query += f" ORDER BY `{order_by}`"
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            waited = time.perf_counter() - start
+            METRICS.record(table, "export", rows=len(rows), seconds=waited, wait={"mysql": waited})
+            if not rows:
+                exhausted = True
+                break
+            yield rows
+            start = time.perf_counter()
+    finally:
+        if exhausted:
+            cursor.close()
+            conn.close()
+        else:
+            # Stopped part way through: closing normally would have to read the rest of the result set first
+            conn.shutdown()
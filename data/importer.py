@@ -1,57 +1,336 @@
+import io
+import json
+import os
+import struct
+import threading
 import psycopg2
 from psycopg2 import sql
 
-from config.config import DatabaseConfig
+from config.config import DatabaseConfig, MIGRATION
+from schema.fast_load import apply_session_settings
 from utils.logger import log
+from utils.metrics import METRICS, truncate
+from .copy_encoder import (
+    COPY_FORMATS,
+    UnsupportedCopyType,
+    encode_binary_rows,
+    encode_csv_rows,
+    encode_raw_text_rows,
+    encode_text_rows,
+    get_binary_encoders,
+)
 import time
 
+# Errors that mean Postgres (or the COPY encoder) rejected the data, as opposed to the connection failing
+LOAD_ERRORS = (psycopg2.DataError, psycopg2.IntegrityError, psycopg2.ProgrammingError, psycopg2.NotSupportedError,
+               UnsupportedCopyType, TypeError, ValueError, struct.error)
+_REJECT_LOCK = threading.Lock()
 
-def import_table_data(table: str, rows: list[tuple], config: DatabaseConfig):
+
+class TooManyRejects(Exception):
+    """
+    Raised when a load rejects more rows than MIGRATION.max_rejects.
+    """
+
+
+def import_table_data(table: str, rows: list[tuple], config: DatabaseConfig, method: str = None, copy_format: str = None, batch_size: int = None):
     """
     Imports data into a PostgreSQL table.
+    Uses COPY ... FROM STDIN by default, falling back to row-by-row INSERTs if COPY fails for the table.
 
     Args:
         table (str): The name of the table to import data into.
         rows (list[tuple]): List of rows to be inserted into the table, each row is a tuple of values.
         config (DatabaseConfig): Database configuration object containing connection details.
+        method (str): "copy" or "insert". Defaults to the migration config.
+        copy_format (str): COPY format, one of "text", "csv" or "binary". Defaults to the migration config.
+        batch_size (int): Rows sent per COPY batch / committed per INSERT batch. Defaults to the migration config.
     """
     if not rows:
         log(f"No data to import for table {table}.", level="warn")
         return
 
+    batch_size = batch_size or MIGRATION.batch_size
+    batches = (rows[start:start + batch_size] for start in range(0, len(rows), batch_size))
+    import_table_batches(table, batches, config, method=method, copy_format=copy_format, total_rows=len(rows))
+
+
+def import_table_batches(table: str, batches, config: DatabaseConfig, method: str = None, copy_format: str = None, total_rows: int = None, label: str = None, checkpoint=None, atomic: bool = False, columns: list[str] = None, raw: bool = False) -> int:
+    """
+    Imports an iterable of row batches into a PostgreSQL table, committing after every batch.
+    Batches are consumed as they arrive, so a generator can keep producing rows while earlier batches load.
+    When a batch fails, its bad rows are isolated by bisection (see _bisect_rows) and written to the table's reject
+    file, and the load carries on. A load rejecting more than max_rejects rows is given up.
+
+    Args:
+        table (str): The name of the table to import data into.
+        batches (Iterable[list[tuple]]): Batches of rows, each row is a tuple of values.
+        config (DatabaseConfig): Database configuration object containing connection details.
+        method (str): "copy" or "insert". Defaults to the migration config.
+        copy_format (str): COPY format, one of "text", "csv" or "binary". Defaults to the migration config.
+        total_rows (int): Total row count if known, only used for progress logging.
+        label (str): Name used in log lines, e.g. to tell chunks of the same table apart. Defaults to the table name.
+        checkpoint (Callable[[cursor, list[tuple] | None], None]): Called with the load cursor just before each batch
+            is committed, and with None once everything loaded cleanly, so progress can be recorded in the same transaction.
+        atomic (bool): Load everything in one transaction instead of committing per batch. Giving up rolls back the lot.
+        columns (list[str]): The columns the row values are for, in order. Defaults to all columns in table order.
+        raw (bool): The rows are raw (see iter_table_batches), converted with compile_converters(raw=True). They
+            are loaded with a text COPY, encoded into one buffer reused for every batch, and only decoded to
+            strings for rows sent with INSERT.
+
+    Returns:
+        int: The number of rows imported.
+    """
+    label = label or table
+    method = method or MIGRATION.load_method
+    copy_format = copy_format or MIGRATION.copy_format
+    if copy_format not in COPY_FORMATS:
+        raise ValueError(f"Unknown COPY format '{copy_format}', expected one of {COPY_FORMATS}")
+
     conn = psycopg2.connect(**config.unpack_postgres())
     cur = conn.cursor()
+    try:
+        if raw:
+            # Raw values are the UTF-8 MySQL sent, passed through without being decoded
+            conn.set_client_encoding("UTF8")
+            copy_format = "text"
+        apply_session_settings(cur)
+        start_time = time.time()
+
+        copy_query, encoders = None, None
+        if method == "copy":
+            copy_query, copy_format, encoders = _prepare_copy(cur, table, copy_format, label, columns)
+        raw_buffer = io.BytesIO() if raw else None
+
+        def commit_batch(batch) -> float:
+            # Returns the time spent waiting on Postgres
+            start = time.perf_counter()
+            if checkpoint:
+                checkpoint(cur, batch)
+            if atomic:
+                cur.execute("RELEASE SAVEPOINT topostgres_batch")
+            else:
+                conn.commit()
+            return time.perf_counter() - start
+
+        insert_query = None
+
+        def load(rows: list[tuple]) -> tuple[int, float]:
+            # Sends rows with COPY, or one INSERT each once COPY is off (or for a single row being isolated).
+            # Returns the COPY data size and the time spent waiting on Postgres, which is all of it for INSERTs.
+            nonlocal insert_query
+            if copy_query is not None and len(rows) > 1:
+                return _copy_batch(cur, copy_query, copy_format, encoders, rows, raw_buffer)
+            start = time.perf_counter()
+            insert_query = insert_query or _insert_query(table, len(rows[0]), columns)
+            for row in rows:
+                cur.execute(insert_query, _decode_raw_row(row) if raw else row)
+            return 0, time.perf_counter() - start
+
+        successes = 0
+        failures = 0
+        aborted = False
+        total = f"/{total_rows}" if total_rows else ""
+        for batch in batches:
+            if not batch:
+                continue
+            batch_start = time.perf_counter()
+            if atomic:
+                cur.execute("SAVEPOINT topostgres_batch")
+            try:
+                sent, waited = load(batch)
+            except LOAD_ERRORS as e:
+                if atomic:
+                    cur.execute("ROLLBACK TO SAVEPOINT topostgres_batch")
+                else:
+                    conn.rollback()
+                log(f"[{label}] Rows {successes + 1}-{successes + len(batch)}{total} failed to load: {truncate(str(e), 500)}. Isolating the bad rows.", level="warn")
+                rejects = []
+                try:
+                    loaded = _bisect_rows(cur, batch, load, rejects, MIGRATION.max_rejects - failures)
+                except TooManyRejects:
+                    # Rejecting this much is a broken table, not dirty rows: give it up like a failed load
+                    conn.rollback()
+                    if atomic:
+                        successes = 0
+                    failures += len(rejects)
+                    _write_rejects(table, label, rejects, raw)
+                    log(f"[{label}] More than {MIGRATION.max_rejects} rows rejected, giving up on the table.", level="error")
+                    aborted = True
+                    break
+                _write_rejects(table, label, rejects, raw)
+                failures += len(rejects)
+                if copy_query is not None and not rejects:
+                    # Every row loaded on its own: the table is fine, COPY is what fails for it
+                    log(f"[{label}] COPY fails for this table, falling back to INSERT.", level="warn")
+                    copy_query = None
+                commit_batch(batch)
+                successes += loaded
+                # Isolating is a string of round trips, so the whole batch counts as waiting on Postgres
+                seconds = time.perf_counter() - batch_start
+                METRICS.record(table, "load", rows=loaded, seconds=seconds, wait={"postgres": seconds})
+                continue
+
+            waited += commit_batch(batch)
+            successes += len(batch)
+            METRICS.record(table, "load", rows=len(batch), bytes=sent, seconds=time.perf_counter() - batch_start, wait={"postgres": waited})
+
+        if checkpoint and not aborted:
+            checkpoint(cur, None)
+        conn.commit()
+    except Exception:
+        # A failed export re-raised through the batches, or an error the load doesn't isolate rows for
+        if not conn.closed:
+            conn.rollback()
+        raise
+    finally:
+        cur.close()
+        conn.close()
+
+    if successes == 0 and failures == 0:
+        log(f"No data to import for {label}.", level="warn")
+        return 0
+
+    elapsed = time.time() - start_time
+    rate = round(successes / elapsed) if elapsed > 0 else successes
+    log(f"[{label}] ✅ Imported {successes}{total} rows in {round(elapsed, 2)}s ({rate} rows/s, Failures: {failures})", level="success" if failures == 0 else "warn")
+    return successes
+
+
+def _get_column_types(cur, table: str) -> list[str]:
+    """
+    Gets the Postgres type name of every column of a table, in column order.
+    """
+    cur.execute(
+        "SELECT atttypid::regtype::text FROM pg_attribute "
+        "WHERE attrelid = quote_ident(%s)::regclass AND attnum > 0 AND NOT attisdropped ORDER BY attnum",
+        (table,)
+    )
+    return [row[0] for row in cur.fetchall()]
+
+
+def _column_list(columns: list[str] = None) -> sql.Composable:
+    if not columns:
+        return sql.SQL("")
+    return sql.SQL(" ({})").format(sql.SQL(", ").join(sql.Identifier(column) for column in columns))
 
-    # Infer column count from first row
-    column_count = len(rows[0])
-    placeholders = sql.SQL(', ').join(sql.Placeholder() for _ in range(column_count))
 
-    insert_query = sql.SQL("INSERT INTO {table} VALUES ({values})").format(
+def _prepare_copy(cur, table: str, copy_format: str, label: str, columns: list[str] = None):
+    """
+    Builds the COPY statement for a table, resolving binary encoders up front.
+
+    Returns:
+        tuple: The COPY query, the COPY format actually used and the binary encoders (None unless binary).
+    """
+    encoders = None
+    if copy_format == "binary" and columns:
+        # The binary encoders are resolved for the whole table, in column order
+        copy_format = "text"
+    if copy_format == "binary":
+        try:
+            encoders = get_binary_encoders(_get_column_types(cur, table))
+        except UnsupportedCopyType as e:
+            log(f"[{label}] {e}, using text COPY instead.", level="warn")
+            copy_format = "text"
+
+    copy_query = sql.SQL("COPY {table}{columns} FROM STDIN WITH (FORMAT {format})").format(
+        table=sql.Identifier(table),
+        columns=_column_list(columns),
+        format=sql.SQL(copy_format)
+    )
+    return copy_query, copy_format, encoders
+
+
+def _copy_batch(cur, copy_query, copy_format: str, encoders, batch: list[tuple], raw_buffer: io.BytesIO = None) -> tuple[int, float]:
+    """
+    Encodes one batch in the given COPY format and sends it in a single COPY round trip. Raw batches are encoded
+    into raw_buffer, emptied first, so the buffer is allocated once per load rather than per batch.
+
+    Returns:
+        tuple[int, float]: The size of the COPY data sent, and the seconds spent in the round trip.
+    """
+    if raw_buffer is not None:
+        buffer = raw_buffer
+        buffer.seek(0)
+        buffer.truncate()
+        encode_raw_text_rows(batch, buffer)
+    elif copy_format == "binary":
+        buffer = io.BytesIO()
+        encode_binary_rows(batch, encoders, buffer)
+    else:
+        buffer = io.StringIO()
+        (encode_csv_rows if copy_format == "csv" else encode_text_rows)(batch, buffer)
+    sent = buffer.tell()
+    buffer.seek(0)
+    start = time.perf_counter()
+    cur.copy_expert(copy_query, buffer)
+    return sent, time.perf_counter() - start
+
+
+def _insert_query(table: str, column_count: int, columns: list[str] = None) -> sql.Composable:
+    placeholders = sql.SQL(', ').join(sql.Placeholder() for _ in range(column_count))
+    return sql.SQL("INSERT INTO {table}{columns} VALUES ({values})").format(
         table=sql.Identifier(table),
+        columns=_column_list(columns),
         values=placeholders
     )
 
-    failures = 0
-    successes = 0
-    total_rows = len(rows)
-    start_time = time.time()
 
-    for idx, row in enumerate(rows, 1):
-        try:
-            cur.execute(insert_query, row)
-            successes += 1
-        except Exception as e:
-            log(f"[{table}] Failed row {idx}/{total_rows}: {e}. Query, row: [{insert_query}, {row}]", level="error")
-            failures += 1
-            break
-
-        if idx % 500 == 0:
-            conn.commit()
-            log(f"[{table}] Inserted {idx}/{total_rows} rows...", level="info")
-
-    conn.commit()
-    cur.close()
-    conn.close()
-
-    elapsed = round(time.time() - start_time, 2)
-    log(f"[{table}] ✅ Imported {successes}/{total_rows} rows in {elapsed}s (Failures: {failures})", level="success" if failures == 0 else "warn")
+def _bisect_rows(cur, rows: list[tuple], load, rejects: list, max_rejects: int) -> int:
+    """
+    Loads every row of a failed batch that can be loaded, by retrying it in halves under savepoints until the
+    failing rows are alone. A bad row costs O(log n) attempts, and the good rows still go in in bulk.
+
+    Args:
+        cur: The load cursor, inside a transaction.
+        rows (list[tuple]): The rows to load.
+        load (Callable[[list[tuple]], Any]): Sends rows to Postgres, raising one of LOAD_ERRORS if any is rejected.
+        rejects (list): Gets a (row, error) pair for every row that can't be loaded.
+        max_rejects (int): Raises TooManyRejects once more rows than this were rejected.
+
+    Returns:
+        int: The number of rows loaded.
+    """
+    cur.execute("SAVEPOINT topostgres_split")
+    try:
+        load(rows)
+    except LOAD_ERRORS as e:
+        cur.execute("ROLLBACK TO SAVEPOINT topostgres_split")
+        cur.execute("RELEASE SAVEPOINT topostgres_split")
+        if len(rows) == 1:
+            rejects.append((rows[0], e))
+            if len(rejects) > max_rejects:
+                raise TooManyRejects()
+            return 0
+        middle = len(rows) // 2
+        return _bisect_rows(cur, rows[:middle], load, rejects, max_rejects) + _bisect_rows(cur, rows[middle:], load, rejects, max_rejects)
+    cur.execute("RELEASE SAVEPOINT topostgres_split")
+    return len(rows)
+
+
+def _decode_raw_row(row: tuple, errors: str = "strict") -> tuple:
+    """
+    Turns a raw row into strings, which Postgres casts to the column types like it does COPY text.
+    """
+    return tuple(value.decode("utf-8", errors) if isinstance(value, (bytes, bytearray)) else value for value in row)
+
+
+def _write_rejects(table: str, label: str, rejects: list, raw: bool = False):
+    """
+    Logs rejected rows and appends them, with their errors, to the table's reject file (JSON lines) in the reject directory.
+    """
+    if raw:
+        # Invalid UTF-8 may be why the row was rejected, keep it visible
+        rejects = [(_decode_raw_row(row, "backslashreplace"), error) for row, error in rejects]
+    for row, error in rejects:
+        # Rows can hold whole documents or BLOBs, only the start of one is worth logging
+        log(f"[{label}] Rejected row: {truncate(str(error).strip(), 500)}. Row: {truncate(row)}", level="error")
+    if not rejects or not MIGRATION.reject_dir:
+        return
+    os.makedirs(MIGRATION.reject_dir, exist_ok=True)
+    lines = "".join(
+        json.dumps({"chunk": label, "error": str(error).strip(), "row": list(row)}, default=repr) + "\n"
+        for row, error in rejects
+    )
+    with _REJECT_LOCK, open(os.path.join(MIGRATION.reject_dir, f"{table}.rejects.jsonl"), "a", encoding="utf-8") as f:
+        f.write(lines)
@@ -0,0 +1,173 @@
+import json
+from dataclasses import asdict
+
+import psycopg2
+from psycopg2.extras import Json
+
+from config.config import DatabaseConfig
+from .chunker import TableChunk
+
+JOURNAL_TABLE = "_topostgres_journal"
+_STATE_FIELDS = ("high_water", "completed")
+
+
+class MigrationJournal:
+    """
+    Durable record of committed migration work, kept in a control table in the target PostgreSQL database.
+    Chunk progress is written through the load cursor, in the same transaction as the rows it describes, so after
+    a crash the journal never claims more (or less) than what was actually committed.
+    Only holds connection details, so it can be passed to process workers.
+    """
+
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+
+    def _connect(self):
+        return psycopg2.connect(**self.config.unpack_postgres())
+
+    def setup(self, resume: bool = False):
+        """
+        Creates the journal table if needed. Unless resuming, any previous run's progress is cleared.
+
+        Args:
+            resume (bool): Keep the progress recorded by earlier runs.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute(
+            f"CREATE TABLE IF NOT EXISTS {JOURNAL_TABLE} ("
+            "unit TEXT PRIMARY KEY, "
+            "table_name TEXT, "
+            "plan JSONB, "
+            "high_water BIGINT, "
+            "rows BIGINT NOT NULL DEFAULT 0, "
+            "completed BOOLEAN NOT NULL DEFAULT FALSE, "
+            "updated_at TIMESTAMPTZ NOT NULL DEFAULT now())"
+        )
+        if not resume:
+            cur.execute(f"TRUNCATE {JOURNAL_TABLE}")
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    def is_done(self, unit: str) -> bool:
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute(f"SELECT completed FROM {JOURNAL_TABLE} WHERE unit = %s", (unit,))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+        return bool(row and row[0])
+
+    def mark_done(self, unit: str):
+        """
+        Marks a unit of work that isn't a chunk (e.g. "phase:schema") as completed.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        self.mark_done_with(cur, unit)
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    def mark_done_with(self, cur, unit: str):
+        """
+        Marks a unit of work as completed through the given cursor, so it commits along with the caller's transaction.
+        """
+        cur.execute(
+            f"INSERT INTO {JOURNAL_TABLE} (unit, completed) VALUES (%s, TRUE) "
+            "ON CONFLICT (unit) DO UPDATE SET completed = TRUE, updated_at = now()",
+            (unit,)
+        )
+
+    def get_chunks(self, table: str) -> list[TableChunk]:
+        """
+        Gets the chunk plan recorded for a table by an earlier run, with each chunk's committed progress.
+        Resuming has to reuse the recorded plan, as a fresh plan's ranges would not line up with the journal.
+
+        Returns:
+            list[TableChunk]: The recorded chunks, empty if the table was never started.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute(f"SELECT plan, high_water, completed FROM {JOURNAL_TABLE} WHERE table_name = %s", (table,))
+        chunks = []
+        for plan, high_water, completed in cur.fetchall():
+            plan = plan if isinstance(plan, dict) else json.loads(plan)
+            chunks.append(TableChunk(**plan, high_water=high_water, completed=completed))
+        cur.close()
+        conn.close()
+        return sorted(chunks, key=lambda chunk: chunk.index)
+
+    def register_chunks(self, chunks: list[TableChunk]):
+        """
+        Records a table's chunk plan before any of it is loaded.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        for chunk in chunks:
+            plan = {key: value for key, value in asdict(chunk).items() if key not in _STATE_FIELDS}
+            cur.execute(
+                f"INSERT INTO {JOURNAL_TABLE} (unit, table_name, plan) VALUES (%s, %s, %s) ON CONFLICT (unit) DO NOTHING",
+                (chunk.label, chunk.table, Json(plan))
+            )
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    def checkpoint(self, cur, batch: list[tuple], chunk: TableChunk):
+        """
+        Records a chunk's progress through the load cursor, just before its transaction commits.
+        Matches the checkpoint hook of import_table_batches.
+
+        Args:
+            cur: The cursor the rows were loaded with.
+            batch (list[tuple] | None): The batch about to be committed, or None once the whole chunk is loaded.
+            chunk (TableChunk): The chunk being loaded.
+        """
+        if batch is None:
+            cur.execute(f"UPDATE {JOURNAL_TABLE} SET completed = TRUE, updated_at = now() WHERE unit = %s", (chunk.label,))
+            return
+        # int() also takes the key as raw bytes (see iter_table_batches)
+        high_water = int(batch[-1][chunk.key_index]) if chunk.resumable else None
+        cur.execute(
+            f"UPDATE {JOURNAL_TABLE} SET high_water = COALESCE(%s, high_water), rows = rows + %s, updated_at = now() WHERE unit = %s",
+            (high_water, len(batch), chunk.label)
+        )
+
+    def forget_tables(self, tables: list[str]):
+        """
+        Drops the chunk plans and progress recorded for the given tables, so the next run loads them from scratch.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute(f"DELETE FROM {JOURNAL_TABLE} WHERE table_name = ANY(%s)", (list(tables),))
+        conn.commit()
+        cur.close()
+        conn.close()
+
+    def get_sync_state(self, table: str) -> dict:
+        """
+        Gets the delta sync state recorded for a table by record_sync_state, or None if it was never synced.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        cur.execute(f"SELECT plan FROM {JOURNAL_TABLE} WHERE unit = %s", (f"sync:{table}",))
+        row = cur.fetchone()
+        cur.close()
+        conn.close()
+        if not row:
+            return None
+        return row[0] if isinstance(row[0], dict) else json.loads(row[0])
+
+    def record_sync_state(self, cur, table: str, state: dict, rows: int = 0):
+        """
+        Records a table's delta sync state (its watermark) through the load cursor, so it commits with the rows.
+        Kept without a table_name, so get_chunks never mistakes it for a chunk.
+        """
+        cur.execute(
+            f"INSERT INTO {JOURNAL_TABLE} (unit, plan, rows, completed) VALUES (%s, %s, %s, TRUE) "
+            "ON CONFLICT (unit) DO UPDATE SET plan = EXCLUDED.plan, rows = "
+            f"{JOURNAL_TABLE}.rows + EXCLUDED.rows, updated_at = now()",
+            (f"sync:{table}", Json(state), rows)
+        )
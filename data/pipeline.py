@@ -0,0 +1,177 @@
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from functools import partial
+
+from config.config import DatabaseConfig, MIGRATION
+from utils.logger import log
+from utils.metrics import METRICS
+from .chunker import TableChunk, plan_table_chunks
+from .converters import Converter, compile_converters, convert_batch
+from .exporter import iter_table_batches, use_raw_rows
+from .importer import import_table_batches
+from .journal import MigrationJournal
+
+_DONE = object()
+
+
+def migrate_table(table: str, pg_sql: str, estimated_rows: int, mysql_config: DatabaseConfig, pg_config: DatabaseConfig, journal: MigrationJournal = None) -> int:
+    """
+    Migrates one table's data, splitting it into chunks copied by separate workers if it is large enough.
+    With a journal, progress is checkpointed as it commits and chunks already completed by an earlier run are skipped.
+
+    Args:
+        table (str): The name of the table to migrate.
+        pg_sql (str): The translated PostgreSQL CREATE TABLE statement, used to pick a chunking key.
+        estimated_rows (int): Estimated row count, e.g. from get_mysql_table_sizes.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        journal (MigrationJournal): Optional progress journal to record into and resume from.
+
+    Returns:
+        int: The number of rows imported by this call.
+    """
+    chunks = pending_chunks(table, pg_sql, estimated_rows, mysql_config, journal)
+    if not chunks:
+        return 0
+
+    raw = use_raw_rows()
+    converters = compile_converters(pg_sql, raw)
+    if converters:
+        log(f"[{table}] Converting {len(converters)} columns on the way in.", "info")
+
+    if len(chunks) == 1:
+        return migrate_chunk(chunks[0], mysql_config, pg_config, journal, converters, raw)
+
+    log(f"[{table}] Copying ~{estimated_rows} rows in {len(chunks)} chunks with {MIGRATION.chunk_workers} workers...", "info")
+    with ThreadPoolExecutor(max_workers=MIGRATION.chunk_workers, thread_name_prefix=f"chunk-{table}") as pool:
+        imported = sum(pool.map(lambda chunk: migrate_chunk(chunk, mysql_config, pg_config, journal, converters, raw), chunks))
+    log(f"[{table}] ✅ All {len(chunks)} chunks copied, {imported} rows.", "success")
+    return imported
+
+
+def pending_chunks(table: str, pg_sql: str, estimated_rows: int, mysql_config: DatabaseConfig, journal: MigrationJournal = None) -> list[TableChunk]:
+    """
+    Gets the chunks of a table still to be copied: the unfinished chunks recorded by an earlier run if the journal
+    has any, otherwise a fresh plan, registered in the journal.
+
+    Returns:
+        list[TableChunk]: The chunks to copy, empty if an earlier run already copied the whole table.
+    """
+    chunks = journal.get_chunks(table) if journal else []
+    if chunks:
+        chunks = [chunk for chunk in chunks if not chunk.completed]
+        if not chunks:
+            log(f"[{table}] Already migrated, skipping.", "info")
+        else:
+            log(f"[{table}] Resuming {len(chunks)} unfinished chunks.", "info")
+        return chunks
+    chunks = plan_table_chunks(table, pg_sql, mysql_config, estimated_rows)
+    if journal:
+        journal.register_chunks(chunks)
+    return chunks
+
+
+def migrate_chunk(chunk: TableChunk, mysql_config: DatabaseConfig, pg_config: DatabaseConfig, journal: MigrationJournal = None, converters: list[Converter] = None, raw: bool = False) -> int:
+    """
+    Migrates the rows of a single table chunk, on its own MySQL and PostgreSQL connections.
+    Key-range chunks are exported in key order and committed batch by batch, so they can resume from their
+    high-water mark. Other chunks are loaded in a single transaction, so they are either fully there or not at all.
+
+    Returns:
+        int: The number of rows imported.
+    """
+    where, params = chunk.where()
+    if chunk.high_water is not None:
+        log(f"[{chunk.label}] Resuming after {chunk.column} = {chunk.high_water}.", "info")
+    return migrate_table_data(
+        chunk.table, mysql_config, pg_config,
+        where=where,
+        params=params,
+        label=chunk.label,
+        order_by=chunk.column,
+        checkpoint=partial(journal.checkpoint, chunk=chunk) if journal else None,
+        atomic=not chunk.resumable,
+        converters=converters,
+        raw=raw,
+    )
+
+
+def migrate_table_data(table: str, mysql_config: DatabaseConfig, pg_config: DatabaseConfig, batch_size: int = None, queue_depth: int = None, where: str = None, params: tuple = (), label: str = None, order_by: str = None, checkpoint=None, atomic: bool = False, converters: list[Converter] = None, raw: bool = False) -> int:
+    """
+    Streams a table from MySQL into PostgreSQL.
+    The export runs in a background thread and hands batches over a bounded queue, so the import starts with the
+    first batch and peak memory is roughly (queue_depth + 2) * batch_size rows, whatever the table size.
+
+    Args:
+        table (str): The name of the table to migrate.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        batch_size (int): Rows per batch. Defaults to the migration config.
+        queue_depth (int): Batches buffered between export and import. Defaults to the migration config.
+        where (str): Optional MySQL WHERE clause restricting the rows migrated, e.g. a chunk range.
+        params (tuple): Parameters for placeholders in the WHERE clause.
+        label (str): Name used in log lines. Defaults to the table name.
+        order_by (str): Optional column to export in order of.
+        checkpoint (Callable): Progress hook passed on to import_table_batches.
+        atomic (bool): Load in a single transaction, see import_table_batches.
+        converters (list[Converter]): Per-column value fixes from compile_converters, applied batch by batch in the export thread.
+        raw (bool): Move the rows as raw bytes (see iter_table_batches), the converters must be compiled for raw rows.
+
+    Returns:
+        int: The number of rows imported.
+    """
+    log(f"Migrating data: {label or table}", "info")
+    batch_size = batch_size or MIGRATION.batch_size
+    batches = queue.Queue(maxsize=queue_depth or MIGRATION.queue_depth)
+    stop = threading.Event()
+    errors = []
+
+    def put(item) -> bool:
+        # Blocks while the queue is full (backpressure), but gives up once the importer has stopped reading
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def produce():
+        try:
+            with closing(iter_table_batches(table, mysql_config, batch_size, where=where, params=params, order_by=order_by, raw=raw)) as rows:
+                for batch in rows:
+                    if converters:
+                        start = time.perf_counter()
+                        batch = convert_batch(batch, converters)
+                        METRICS.record(table, "convert", rows=len(batch), seconds=time.perf_counter() - start)
+                    if not put(batch):
+                        break
+        except Exception as e:
+            errors.append(e)
+        finally:
+            put(_DONE)
+
+    def consume():
+        while True:
+            batch = batches.get()
+            if batch is _DONE:
+                # A failed export must not reach the final commit, which would journal the chunk as complete
+                if errors:
+                    raise errors[0]
+                return
+            yield batch
+
+    producer = threading.Thread(target=produce, name=f"export-{label or table}", daemon=True)
+    producer.start()
+    try:
+        imported = import_table_batches(table, consume(), pg_config, label=label, checkpoint=checkpoint, atomic=atomic, raw=raw)
+    finally:
+        stop.set()
+        producer.join()
+
+    if errors:
+        raise errors[0]
+    return imported
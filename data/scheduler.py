@@ -0,0 +1,103 @@
+import heapq
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from config.config import MIGRATION
+from schema.translator import extract_foreign_keys
+from utils.logger import log
+
+
+def build_dependency_graph(translated: dict[str, str]) -> dict[str, set[str]]:
+    """
+    Builds the foreign key dependency graph of a translated schema.
+
+    Args:
+        translated (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+
+    Returns:
+        dict[str, set[str]]: Mapping of each table to the tables it references (self references and unknown tables excluded).
+    """
+    graph = {}
+    for table, pg_sql in translated.items():
+        graph[table] = {
+            fk["foreign_table"] for fk in extract_foreign_keys(pg_sql)
+            if fk["foreign_table"] != table and fk["foreign_table"] in translated
+        }
+    return graph
+
+
+def run_table_migrations(tables: list[str], migrate, dependencies: dict[str, set[str]] = None, sizes: dict[str, tuple[int, int]] = None, workers: int = None, worker_mode: str = None, task_args: dict[str, tuple] = None) -> dict:
+    """
+    Runs a per-table migration function over a worker pool.
+    A table is only started once every table it references has finished, and among the tables that are ready the
+    largest goes first, so the biggest tables don't end up running alone at the end. Foreign key cycles are broken
+    by starting the largest table still waiting.
+
+    Args:
+        tables (list[str]): Tables to migrate.
+        migrate (Callable[..., Any]): Called with a table name (plus its task_args), in a worker. Must be picklable for "process" mode.
+        dependencies (dict[str, set[str]]): Tables each table references, e.g. from build_dependency_graph.
+        sizes (dict[str, tuple[int, int]]): Estimated (rows, data length) per table, e.g. from get_mysql_table_sizes.
+        workers (int): Number of tables migrated at once. Defaults to the migration config.
+        worker_mode (str): "thread" or "process". Defaults to the migration config.
+        task_args (dict[str, tuple]): Extra positional arguments passed to migrate for each table.
+
+    Returns:
+        dict: Mapping of table names to whatever migrate returned, or None if it raised.
+    """
+    dependencies = dependencies or {}
+    sizes = sizes or {}
+    task_args = task_args or {}
+    workers = workers or MIGRATION.workers
+    worker_mode = worker_mode or MIGRATION.worker_mode
+    if worker_mode not in ("thread", "process"):
+        raise ValueError(f"Unknown worker mode '{worker_mode}', expected 'thread' or 'process'")
+
+    def priority(table: str) -> tuple:
+        rows, data_length = sizes.get(table, (0, 0))
+        # heapq is a min-heap, so negate to pop the largest table first
+        return (-data_length, -rows, table)
+
+    # Only wait on tables that are part of this run, skipped tables never finish
+    pending = set(tables)
+    waiting_on = {table: dependencies.get(table, set()) & pending for table in tables}
+    dependents = {table: [] for table in tables}
+    for table, parents in waiting_on.items():
+        for parent in parents:
+            dependents[parent].append(table)
+
+    ready = [priority(table) for table in tables if not waiting_on[table]]
+    heapq.heapify(ready)
+
+    results = {}
+    running = {}
+    executor_class = ProcessPoolExecutor if worker_mode == "process" else ThreadPoolExecutor
+    with executor_class(max_workers=workers) as pool:
+        while pending or running:
+            if not ready and not running:
+                # Everything left is part of a foreign key cycle
+                table = min(pending, key=priority)
+                log(f"Foreign key cycle detected, starting {table} before the tables it references.", level="warn")
+                heapq.heappush(ready, priority(table))
+
+            # Only fill free slots, so that tables which become ready later still get picked by size
+            while ready and len(running) < workers:
+                table = heapq.heappop(ready)[-1]
+                if table not in pending:
+                    continue
+                pending.discard(table)
+                running[pool.submit(migrate, table, *task_args.get(table, ()))] = table
+
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                table = running.pop(future)
+                try:
+                    results[table] = future.result()
+                except Exception as e:
+                    log(f"[{table}] Migration failed: {e}", level="error")
+                    results[table] = None
+                for child in dependents[table]:
+                    waiting_on[child].discard(table)
+                    if not waiting_on[child] and child in pending:
+                        heapq.heappush(ready, priority(child))
+
+    return results
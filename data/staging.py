@@ -0,0 +1,287 @@
+import gzip
+import hashlib
+import json
+import mmap
+import os
+import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+import psycopg2
+from psycopg2 import sql
+
+from config.config import DatabaseConfig, MIGRATION
+from schema.creator import create_pg_tables
+from schema.fast_load import apply_session_settings
+from schema.post_load import build_post_load, plan_post_load
+from schema.translator import split_deferred_constraints
+from utils.logger import log
+from utils.metrics import METRICS
+from .chunker import TableChunk, plan_table_chunks
+from .converters import compile_converters, convert_batch
+from .copy_encoder import encode_csv_rows, encode_text_rows
+from .exporter import iter_table_batches
+from .journal import MigrationJournal
+
+MANIFEST = "manifest.json"
+STAGE_COMPRESSIONS = ("gzip", "none")
+STAGE_FORMATS = ("text", "csv")
+
+
+class StageManifest:
+    """
+    Index of a staging directory: the schema of every staged table, its chunk plan and the files holding each
+    finished chunk. A file is only listed once it is completely written, so a listed file is always whole.
+    Safe to update from several export threads.
+    """
+
+    def __init__(self, directory: str, copy_format: str = "text", compression: str = "gzip"):
+        self.directory = directory
+        self.copy_format = copy_format
+        self.compression = compression
+        self.created_at = datetime.now(timezone.utc).isoformat()
+        self.tables: dict[str, dict] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def load(cls, directory: str) -> "StageManifest":
+        with open(os.path.join(directory, MANIFEST), encoding="utf-8") as f:
+            data = json.load(f)
+        manifest = cls(directory, data["format"], data["compression"])
+        manifest.created_at = data["created_at"]
+        manifest.tables = data["tables"]
+        return manifest
+
+    def add_table(self, table: str, mysql_sql: str, pg_sql: str, chunks: list[TableChunk]):
+        with self._lock:
+            self.tables[table] = {
+                "mysql_sql": mysql_sql,
+                "pg_sql": pg_sql,
+                "chunks": [asdict(chunk) for chunk in chunks],
+                "files": {},
+            }
+
+    def add_file(self, chunk: TableChunk, name: str, rows: int, size: int):
+        with self._lock:
+            self.tables[chunk.table]["files"][str(chunk.index)] = {"path": name, "rows": rows, "bytes": size}
+
+    def chunks(self, table: str) -> list[TableChunk]:
+        return [TableChunk(**plan) for plan in self.tables[table]["chunks"]]
+
+    def save(self):
+        """
+        Writes the manifest, replacing the file atomically.
+        """
+        with self._lock:
+            data = {
+                "created_at": self.created_at,
+                "format": self.copy_format,
+                "compression": self.compression,
+                "tables": self.tables,
+            }
+            path = os.path.join(self.directory, MANIFEST)
+            temp_path = f"{path}.{os.getpid()}.tmp"
+            with open(temp_path, "w", encoding="utf-8") as f:
+                json.dump(data, f, indent=1)
+            os.replace(temp_path, path)
+
+
+def _file_name(chunk: TableChunk, compression: str) -> str:
+    name = re.sub(r"[^\w.-]", "_", chunk.table)
+    if name != chunk.table:
+        # Keep names apart that only differ in characters replaced above
+        name += "-" + hashlib.md5(chunk.table.encode()).hexdigest()[:8]
+    return f"{name}.{chunk.index:04d}.copy" + (".gz" if compression == "gzip" else "")
+
+
+def export_to_stage(directory: str, mysql_tables: dict[str, str], translated: dict[str, str], mysql_config: DatabaseConfig, sizes: dict[str, tuple[int, int]] = None, compression: str = None, copy_format: str = "text", workers: int = None) -> StageManifest:
+    """
+    Exports tables from MySQL into COPY files in a local staging directory, instead of loading them straight into
+    PostgreSQL. Each chunk goes to its own file, already converted and in COPY format, so import_from_stage can
+    load it later, or on another host, without touching MySQL again. The schema is kept in the manifest too.
+    Exporting into a directory that already has a manifest resumes it: chunks with a file are skipped.
+
+    Args:
+        directory (str): The staging directory, created if needed.
+        mysql_tables (dict[str, str]): Mapping of table names to their MySQL CREATE TABLE statements.
+        translated (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        sizes (dict[str, tuple[int, int]]): Estimated (rows, data length) per table, for chunking.
+        compression (str): "gzip" or "none" (files can then be memory-mapped on import). Defaults to the migration config.
+        copy_format (str): COPY format of the files, "text" or "csv".
+        workers (int): Chunks exported at once. Defaults to the migration config.
+
+    Returns:
+        StageManifest: The manifest of the staging directory.
+    """
+    compression = compression or MIGRATION.stage_compression
+    workers = workers or MIGRATION.workers
+    sizes = sizes or {}
+    if compression not in STAGE_COMPRESSIONS:
+        raise ValueError(f"Unknown stage compression '{compression}', expected one of {STAGE_COMPRESSIONS}")
+    if copy_format not in STAGE_FORMATS:
+        raise ValueError(f"Unknown stage format '{copy_format}', expected one of {STAGE_FORMATS}")
+
+    os.makedirs(directory, exist_ok=True)
+    if os.path.exists(os.path.join(directory, MANIFEST)):
+        manifest = StageManifest.load(directory)
+        if (manifest.copy_format, manifest.compression) != (copy_format, compression):
+            raise ValueError(f"{directory} holds a {manifest.copy_format} / {manifest.compression} stage, not {copy_format} / {compression}")
+        log(f"Resuming the export into {directory}.", "info")
+    else:
+        manifest = StageManifest(directory, copy_format, compression)
+
+    work = []
+    for table, pg_sql in translated.items():
+        entry = manifest.tables.get(table)
+        if entry is None or entry["pg_sql"] != pg_sql:
+            chunks = plan_table_chunks(table, pg_sql, mysql_config, sizes.get(table, (0, 0))[0])
+            manifest.add_table(table, mysql_tables.get(table, ""), pg_sql, chunks)
+        converters = compile_converters(pg_sql)
+        files = manifest.tables[table]["files"]
+        work += [(chunk, converters) for chunk in manifest.chunks(table) if str(chunk.index) not in files]
+    manifest.save()
+
+    encode = encode_csv_rows if copy_format == "csv" else encode_text_rows
+
+    def export_chunk(chunk: TableChunk, converters) -> int:
+        name = _file_name(chunk, compression)
+        path = os.path.join(directory, name)
+        temp_path = path + ".tmp"
+        where, params = chunk.where()
+        rows = 0
+        # newline="" keeps the COPY line endings as they are on every platform
+        if compression == "gzip":
+            f = gzip.open(temp_path, "wt", encoding="utf-8", newline="", compresslevel=3)
+        else:
+            f = open(temp_path, "w", encoding="utf-8", newline="")
+        with f:
+            for batch in iter_table_batches(chunk.table, mysql_config, where=where, params=params, order_by=chunk.column):
+                encode(convert_batch(batch, converters), f)
+                rows += len(batch)
+        os.replace(temp_path, path)
+        manifest.add_file(chunk, name, rows, os.path.getsize(path))
+        manifest.save()
+        log(f"[{chunk.label}] Staged {rows} rows in {name}.", "info")
+        return rows
+
+    log(f"Exporting {len(work)} chunks into {directory} with {workers} workers...", "info")
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage-export") as pool:
+        futures = {pool.submit(export_chunk, chunk, converters): chunk for chunk, converters in work}
+        for future, chunk in futures.items():
+            try:
+                future.result()
+            except Exception as e:
+                log(f"[{chunk.label}] Export to the stage failed: {e}", level="error")
+                failed.append(chunk.label)
+    if failed:
+        log(f"{len(failed)} chunks weren't staged, export again to retry them: {failed}", level="error")
+    else:
+        log(f"✅ Staged {len(translated)} tables in {directory}.", "success")
+    return manifest
+
+
+def _open_staged(path: str, compression: str):
+    """
+    Opens a staged file for COPY to read from: gzipped files are decompressed as they are read, plain files are
+    memory-mapped.
+    """
+    if compression == "gzip":
+        return gzip.open(path, "rb")
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+def import_from_stage(directory: str, pg_config: DatabaseConfig, journal: MigrationJournal = None, create: bool = True, post_load: bool = True, workers: int = None) -> dict:
+    """
+    Loads a staging directory written by export_to_stage into PostgreSQL. Every file is sent as it is in a single
+    COPY, in its own transaction. With a journal, a loaded file is marked done in that same transaction and skipped
+    when the import is run again, so a failed or interrupted import can simply be replayed.
+
+    Args:
+        directory (str): The staging directory.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        journal (MigrationJournal): Optional progress journal.
+        create (bool): Create the (bare) tables from the schema in the manifest first.
+        post_load (bool): Build keys, indexes and foreign keys once everything is loaded.
+        workers (int): Files loaded at once. Defaults to the migration config.
+
+    Returns:
+        dict: Mapping of table names to the number of rows loaded, or None if any of the table's files failed.
+    """
+    manifest = StageManifest.load(directory)
+    workers = workers or MIGRATION.workers
+    translated = {table: entry["pg_sql"] for table, entry in manifest.tables.items()}
+    if create:
+        create_pg_tables({table: split_deferred_constraints(pg_sql, manifest.tables[table]["mysql_sql"])[0] for table, pg_sql in translated.items()}, pg_config)
+
+    missing = [table for table, entry in manifest.tables.items() if len(entry["files"]) < len(entry["chunks"])]
+    if missing:
+        log(f"The stage is missing chunks of {missing}, their data will be incomplete.", level="warn")
+
+    def load_file(table: str, index: str, entry: dict) -> int:
+        unit = f"stage:{table}#{index}"
+        if journal and journal.is_done(unit):
+            log(f"[{table}#{index}] Already loaded from the stage, skipping.", "info")
+            return 0
+        path = os.path.join(directory, entry["path"])
+        if os.path.getsize(path) != entry["bytes"]:
+            raise ValueError(f"{path} is {os.path.getsize(path)} bytes, the manifest says {entry['bytes']}")
+        copy_query = sql.SQL("COPY {table} FROM STDIN WITH (FORMAT {format})").format(
+            table=sql.Identifier(table),
+            format=sql.SQL(manifest.copy_format)
+        )
+        conn = psycopg2.connect(**pg_config.unpack_postgres())
+        cur = conn.cursor()
+        apply_session_settings(cur)
+        start = time.perf_counter()
+        try:
+            if entry["rows"]:
+                source = _open_staged(path, manifest.compression)
+                try:
+                    cur.copy_expert(copy_query, source)
+                finally:
+                    source.close()
+            if journal:
+                journal.mark_done_with(cur, unit)
+            conn.commit()
+        except psycopg2.Error:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
+        seconds = time.perf_counter() - start
+        METRICS.record(table, "load", rows=entry["rows"], bytes=entry["bytes"], seconds=seconds, wait={"postgres": seconds})
+        log(f"[{table}#{index}] Loaded {entry['rows']} rows from the stage.", "info")
+        return entry["rows"]
+
+    files = [(table, index, entry) for table, table_entry in manifest.tables.items() for index, entry in table_entry["files"].items()]
+    # Largest files first, so the biggest loads don't end up running alone at the end
+    files.sort(key=lambda item: -item[2]["bytes"])
+    results = {table: 0 for table in manifest.tables}
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="stage-import") as pool:
+        futures = {pool.submit(load_file, table, index, entry): (table, index) for table, index, entry in files}
+        for future, (table, index) in futures.items():
+            try:
+                rows = future.result()
+                if results[table] is not None:
+                    results[table] += rows
+            except Exception as e:
+                log(f"[{table}#{index}] Load from the stage failed: {e}", level="error")
+                results[table] = None
+
+    failed = [table for table, rows in results.items() if rows is None]
+    if failed:
+        log(f"Loading from the stage failed for tables: {failed}", level="error")
+    else:
+        log(f"✅ Loaded {sum(results.values())} rows from {directory}.", "success")
+    if post_load and not failed:
+        mysql_tables = {table: entry["mysql_sql"] for table, entry in manifest.tables.items()}
+        _, steps = plan_post_load(translated, mysql_tables)
+        build_post_load(steps, pg_config)
+    return results
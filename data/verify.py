@@ -0,0 +1,265 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+
+import mysql.connector
+import psycopg2
+
+from config.config import DatabaseConfig, MIGRATION
+from schema.translator import extract_column_definitions
+from utils.logger import log
+from .chunker import TableChunk, plan_table_chunks
+
+# Per Postgres base type, the MySQL and Postgres expressions giving the same text for the same value.
+# Seconds are %S, as mysql.connector would take %s for a parameter placeholder.
+# Zero dates are loaded as NULL, or the earliest date in NOT NULL columns (see data.converters), so they are hashed as such.
+_NORMALIZED = {
+    "BYTEA": ("LOWER(HEX({c}))", "encode({c}, 'hex')"),
+    "DATE": ("IF(YEAR({c}) = 0 OR MONTH({c}) = 0 OR DAYOFMONTH({c}) = 0, {zero}, DATE_FORMAT({c}, '%Y-%m-%d'))", "to_char({c}, 'YYYY-MM-DD')"),
+    "TIMESTAMP": ("IF(YEAR({c}) = 0 OR MONTH({c}) = 0 OR DAYOFMONTH({c}) = 0, {zero}, DATE_FORMAT({c}, '%Y-%m-%d %H:%i:%S.%f'))", "to_char({c}, 'YYYY-MM-DD HH24:MI:SS.US')"),
+    "TIME": ("TIME_FORMAT({c}, '%H:%i:%S.%f')", "to_char({c}, 'HH24:MI:SS.US')"),
+    "BIT": ("LPAD(BIN({c}), {length}, '0')", "{c}::text"),
+}
+_DEFAULT = ("CAST({c} AS CHAR)", "{c}::text")
+_EARLIEST = {"DATE": "'0001-01-01'", "TIMESTAMP": "'0001-01-01 00:00:00.000000'"}
+# Approximate values: the two servers print them differently, so they are left out of the hashes
+_UNHASHED = ("REAL", "DOUBLE", "FLOAT")
+# Row separator and NULL marker, control characters that don't turn up in real data
+_SEPARATOR = ("CHAR(31 USING utf8mb4)", "chr(31)")
+_NULL = ("CHAR(30 USING utf8mb4)", "chr(30)")
+
+
+@dataclass
+class TableVerification:
+    table: str
+    mysql_rows: int = 0
+    pg_rows: int = 0
+    chunks: int = 0
+    mismatched_chunks: list[str] = field(default_factory=list)
+    missing: list = field(default_factory=list)        # Keys of rows only in MySQL
+    extra: list = field(default_factory=list)          # Keys of rows only in Postgres
+    changed: list = field(default_factory=list)        # Keys of rows whose values differ
+    unhashed_columns: list[str] = field(default_factory=list)
+    failed: bool = False                               # The row counts couldn't be compared
+
+    @property
+    def ok(self) -> bool:
+        return not self.failed and self.mysql_rows == self.pg_rows and not self.mismatched_chunks
+
+
+def row_hash_expressions(pg_sql: str) -> tuple[str, str, list[str]]:
+    """
+    Builds the expressions hashing a row to the same MD5 on both servers, over a normalized text form of each column.
+
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
+
+    Returns:
+        tuple[str, str, list[str]]: The MySQL expression, the Postgres expression and the columns left out of the hash.
+    """
+    mysql_parts, pg_parts, unhashed = [], [], []
+    for column, definition in extract_column_definitions(pg_sql).items():
+        base = re.match(r"\w+", definition).group().upper()
+        if base in _UNHASHED:
+            unhashed.append(column)
+            continue
+        if definition.split()[0].endswith("[]"):
+            # SET columns, stored as arrays in definition order, which is how MySQL prints them
+            mysql_expr, pg_expr = "{c}", "array_to_string({c}, ',')"
+        else:
+            mysql_expr, pg_expr = _NORMALIZED.get(base, _DEFAULT)
+        length = re.match(r"\w+\s*\((\d+)\)", definition)
+        not_null = "NOT NULL" in definition.upper() or "PRIMARY KEY" in definition.upper()
+        zero = _EARLIEST.get(base, "NULL") if not_null else "NULL"
+        mysql_expr = mysql_expr.format(c=f"`{column}`", length=length.group(1) if length else 1, zero=zero)
+        pg_expr = pg_expr.format(c=f'"{column}"')
+        mysql_parts.append(f"COALESCE(CONVERT({mysql_expr} USING utf8mb4), {_NULL[0]})")
+        pg_parts.append(f"COALESCE({pg_expr}, {_NULL[1]})")
+    return (
+        f"MD5(CONCAT_WS({_SEPARATOR[0]}, {', '.join(mysql_parts or ['NULL'])}))",
+        f"md5(concat_ws({_SEPARATOR[1]}, {', '.join(pg_parts or ['NULL'])}))",
+        unhashed,
+    )
+
+
+def _range_clause(column: str, lo, hi, quote: str) -> tuple[str, tuple]:
+    if lo is None:
+        return "", ()
+    return f" WHERE {quote}{column}{quote} BETWEEN %s AND %s", (lo, hi)
+
+
+class _Sides:
+    """
+    One MySQL and one Postgres cursor, running the same checksum queries against a table on both servers.
+    """
+
+    def __init__(self, table: str, pg_sql: str, mysql_config: DatabaseConfig, pg_config: DatabaseConfig):
+        self.table = table
+        self.mysql_hash, self.pg_hash, _ = row_hash_expressions(pg_sql)
+        self.mysql_conn = mysql.connector.connect(**mysql_config.unpack_mysql())
+        self.pg_conn = psycopg2.connect(**pg_config.unpack_postgres())
+        self.mysql_cur = self.mysql_conn.cursor()
+        self.pg_cur = self.pg_conn.cursor()
+
+    def close(self):
+        self.mysql_cur.close()
+        self.mysql_conn.close()
+        self.pg_cur.close()
+        self.pg_conn.close()
+
+    def query(self, mysql_sql: str, pg_sql: str, mysql_params: tuple = (), pg_params: tuple = ()) -> tuple[list, list]:
+        self.mysql_cur.execute(mysql_sql, mysql_params)
+        self.pg_cur.execute(pg_sql, pg_params)
+        return self.mysql_cur.fetchall(), self.pg_cur.fetchall()
+
+    def aggregate(self, column: str = None, lo=None, hi=None) -> tuple[tuple, tuple]:
+        """
+        Row count and sum of 60-bit row hash prefixes over a key range (the whole table without one), on both sides.
+        The sum doesn't depend on row order, so each side can scan however it likes.
+        """
+        mysql_where, params = _range_clause(column, lo, hi, "`")
+        pg_where, _ = _range_clause(column, lo, hi, '"')
+        mysql_rows, pg_rows = self.query(
+            f"SELECT COUNT(*), COALESCE(SUM(CAST(CONV(SUBSTRING({self.mysql_hash}, 1, 15), 16, 10) AS UNSIGNED)), 0) FROM `{self.table}`{mysql_where}",
+            f"SELECT COUNT(*), COALESCE(SUM(('x' || substr({self.pg_hash}, 1, 15))::bit(60)::bigint), 0) FROM \"{self.table}\"{pg_where}",
+            params, params,
+        )
+        return tuple(map(int, mysql_rows[0])), tuple(map(int, pg_rows[0]))
+
+    def row_hashes(self, column: str, lo, hi) -> tuple[dict, dict]:
+        mysql_where, params = _range_clause(column, lo, hi, "`")
+        pg_where, _ = _range_clause(column, lo, hi, '"')
+        mysql_rows, pg_rows = self.query(
+            f"SELECT `{column}`, {self.mysql_hash} FROM `{self.table}`{mysql_where}",
+            f"SELECT \"{column}\", {self.pg_hash} FROM \"{self.table}\"{pg_where}",
+            params, params,
+        )
+        return dict(mysql_rows), dict(pg_rows)
+
+    def key_range(self, column: str) -> tuple:
+        mysql_rows, pg_rows = self.query(f"SELECT MIN(`{column}`), MAX(`{column}`) FROM `{self.table}`", f"SELECT MIN(\"{column}\"), MAX(\"{column}\") FROM \"{self.table}\"")
+        bounds = [bound for bound in (*mysql_rows[0], *pg_rows[0]) if bound is not None]
+        return (min(bounds), max(bounds)) if bounds else (None, None)
+
+
+def verify_chunk(chunk: TableChunk, pg_sql: str, mysql_config: DatabaseConfig, pg_config: DatabaseConfig, row_threshold: int = None) -> tuple[bool, list, list, list]:
+    """
+    Compares one chunk of a table between MySQL and Postgres by row count and an aggregate of row hashes, computed
+    inside each database. A key-range chunk that doesn't match is halved until the mismatching ranges are at most
+    row_threshold keys wide, and only those are compared row by row, so little more than the differences is ever fetched.
+
+    Args:
+        chunk (TableChunk): The chunk, a key range or the whole table.
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        row_threshold (int): Widest key range compared row by row. Defaults to the migration config.
+
+    Returns:
+        tuple[bool, list, list, list]: Whether the chunk matches, then the keys missing from Postgres, extra in
+        Postgres and changed. The key lists stay empty for tables without an integer key.
+    """
+    row_threshold = row_threshold or MIGRATION.verify_row_threshold
+    sides = _Sides(chunk.table, pg_sql, mysql_config, pg_config)
+    missing, extra, changed = [], [], []
+
+    def bisect(lo, hi):
+        if hi - lo + 1 <= row_threshold:
+            mysql_hashes, pg_hashes = sides.row_hashes(chunk.column, lo, hi)
+            missing.extend(sorted(mysql_hashes.keys() - pg_hashes.keys()))
+            extra.extend(sorted(pg_hashes.keys() - mysql_hashes.keys()))
+            changed.extend(sorted(key for key in mysql_hashes.keys() & pg_hashes.keys() if mysql_hashes[key] != pg_hashes[key]))
+            return
+        middle = (lo + hi) // 2
+        for sub_lo, sub_hi in ((lo, middle), (middle + 1, hi)):
+            mysql_sum, pg_sum = sides.aggregate(chunk.column, sub_lo, sub_hi)
+            if mysql_sum != pg_sum:
+                bisect(sub_lo, sub_hi)
+
+    try:
+        mysql_sum, pg_sum = sides.aggregate(chunk.column, chunk.lo, chunk.hi)
+        if mysql_sum == pg_sum:
+            return True, missing, extra, changed
+        if chunk.column:
+            lo, hi = (chunk.lo, chunk.hi) if chunk.lo is not None else sides.key_range(chunk.column)
+            if lo is not None:
+                bisect(lo, hi)
+        return False, missing, extra, changed
+    finally:
+        sides.close()
+
+
+def _count_rows(table: str, mysql_config: DatabaseConfig, pg_config: DatabaseConfig) -> tuple[int, int]:
+    sides = _Sides(table, "", mysql_config, pg_config)
+    try:
+        mysql_rows, pg_rows = sides.query(f"SELECT COUNT(*) FROM `{table}`", f"SELECT COUNT(*) FROM \"{table}\"")
+        return mysql_rows[0][0], pg_rows[0][0]
+    finally:
+        sides.close()
+
+
+def verify_tables(translated: dict[str, str], mysql_config: DatabaseConfig, pg_config: DatabaseConfig, sizes: dict[str, tuple[int, int]] = None, workers: int = None, chunk_rows: int = None) -> dict[str, TableVerification]:
+    """
+    Verifies migrated data against the source without pulling rows out of either database: every table's row counts
+    are compared, then each key-range chunk is checksummed on both servers in parallel, drilling down only into
+    chunks that don't match (see verify_chunk). Tables without a single-column integer key are checked as one chunk.
+
+    Args:
+        translated (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details.
+        sizes (dict[str, tuple[int, int]]): Estimated (rows, data length) per table, for chunking.
+        workers (int): Chunks checked at once. Defaults to the migration config.
+        chunk_rows (int): Target rows per checksummed chunk. Defaults to the migration config.
+
+    Returns:
+        dict[str, TableVerification]: The outcome per table.
+    """
+    sizes = sizes or {}
+    workers = workers or MIGRATION.workers
+    chunk_rows = chunk_rows or MIGRATION.verify_chunk_rows
+    results = {table: TableVerification(table, unhashed_columns=row_hash_expressions(pg_sql)[2]) for table, pg_sql in translated.items()}
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify") as pool:
+        counts = {table: pool.submit(_count_rows, table, mysql_config, pg_config) for table in translated}
+        checks = []
+        for table, pg_sql in translated.items():
+            chunks = plan_table_chunks(table, pg_sql, mysql_config, sizes.get(table, (0, 0))[0], chunk_rows=chunk_rows)
+            if not chunks[0].column:
+                # Hash buckets are computed by MySQL alone, Postgres can't select the same rows
+                chunks = [TableChunk(table, 0)]
+            results[table].chunks = len(chunks)
+            checks += [(chunk, pool.submit(verify_chunk, chunk, pg_sql, mysql_config, pg_config)) for chunk in chunks]
+
+        for table, future in counts.items():
+            try:
+                results[table].mysql_rows, results[table].pg_rows = future.result()
+            except (mysql.connector.Error, psycopg2.Error) as e:
+                log(f"[{table}] Counting rows failed: {e}", level="error")
+                results[table].failed = True
+        for chunk, future in checks:
+            result = results[chunk.table]
+            try:
+                matches, missing, extra, changed = future.result()
+            except (mysql.connector.Error, psycopg2.Error) as e:
+                log(f"[{chunk.label}] Verification failed: {e}", level="error")
+                matches, missing, extra, changed = False, [], [], []
+            if not matches:
+                result.mismatched_chunks.append(chunk.label)
+            result.missing += missing
+            result.extra += extra
+            result.changed += changed
+
+    for table, result in results.items():
+        if result.unhashed_columns:
+            log(f"[{table}] Floating point columns aren't checksummed: {result.unhashed_columns}", level="info")
+        if result.ok:
+            log(f"[{table}] ✅ {result.mysql_rows} rows match over {result.chunks} chunks.", "success")
+        else:
+            log(
+                f"[{table}] Mismatch: {result.mysql_rows} rows in MySQL, {result.pg_rows} in Postgres, "
+                f"{len(result.mismatched_chunks)}/{result.chunks} chunks differ. Missing keys: {result.missing[:20]}, "
+                f"extra keys: {result.extra[:20]}, changed keys: {result.changed[:20]}",
+                level="error"
+            )
+    return results
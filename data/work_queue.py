@@ -0,0 +1,390 @@
+import os
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict
+
+import psycopg2
+from psycopg2.extras import Json
+
+from config.config import DatabaseConfig, MIGRATION
+from utils.logger import log
+from .chunker import TableChunk
+from .converters import compile_converters
+from .exporter import use_raw_rows
+from .journal import MigrationJournal
+from .pipeline import migrate_chunk, pending_chunks
+
+QUEUE_TABLE = "_topostgres_queue"
+# One row: the number of the coordinator run filling the queue, and whether it has queued everything
+QUEUE_STATE_TABLE = "_topostgres_queue_state"
+_STATE_FIELDS = ("high_water", "completed")
+
+
+class LeaseLost(Exception):
+    """
+    Raised when another worker took over a unit, so the rows loaded for it must not be committed.
+    """
+
+
+class WorkQueue:
+    """
+    Queue of data migration units (whole tables, or chunks of large ones) in a control table in the target
+    PostgreSQL database, shared by any number of workers on any number of hosts. A worker claims a unit with
+    SELECT ... FOR UPDATE SKIP LOCKED, so workers never wait on each other, and holds it under a lease renewed by
+    heartbeats. A unit whose lease runs out, because its worker died or hung, is claimed again by the next worker,
+    up to max_attempts claims. Every claim bumps the unit's attempt number, which fences off the previous holder.
+    Each coordinator run is numbered, and seals the queue once it has queued every unit, so workers can tell a
+    drained queue from one still being filled.
+    Only holds connection details, so it can be passed to process workers.
+    """
+
+    def __init__(self, config: DatabaseConfig):
+        self.config = config
+
+    def _connect(self):
+        return psycopg2.connect(**self.config.unpack_postgres())
+
+    def _run(self, query: str, params: tuple = ()) -> list[tuple]:
+        conn = self._connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(query, params)
+            rows = cur.fetchall() if cur.description else []
+            conn.commit()
+            return rows
+        finally:
+            cur.close()
+            conn.close()
+
+    def setup(self, reset: bool = False):
+        """
+        Creates the queue tables if needed and starts a new run, unsealed until seal is called.
+
+        Args:
+            reset (bool): Empty the queue, forgetting the units of any previous run.
+        """
+        self._run(
+            f"CREATE TABLE IF NOT EXISTS {QUEUE_TABLE} ("
+            "unit TEXT PRIMARY KEY, "
+            "table_name TEXT NOT NULL, "
+            "plan JSONB NOT NULL, "
+            "pg_sql TEXT NOT NULL, "
+            "priority BIGINT NOT NULL DEFAULT 0, "
+            "state TEXT NOT NULL DEFAULT 'pending', "
+            "worker TEXT, "
+            "lease_until TIMESTAMPTZ, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "rows BIGINT, "
+            "error TEXT, "
+            "updated_at TIMESTAMPTZ NOT NULL DEFAULT now());"
+            f"CREATE INDEX IF NOT EXISTS {QUEUE_TABLE}_claim ON {QUEUE_TABLE} (priority DESC, unit) WHERE state <> 'done';"
+            f"CREATE TABLE IF NOT EXISTS {QUEUE_STATE_TABLE} (id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id), run INTEGER NOT NULL, sealed BOOLEAN NOT NULL);"
+            f"INSERT INTO {QUEUE_STATE_TABLE} (run, sealed) VALUES (1, FALSE) "
+            f"ON CONFLICT (id) DO UPDATE SET run = {QUEUE_STATE_TABLE}.run + 1, sealed = FALSE"
+            + (f"; TRUNCATE {QUEUE_TABLE}" if reset else "")
+        )
+
+    def seal(self):
+        """
+        Marks the current run as fully queued: workers finding nothing left to claim can then stop.
+        """
+        self._run(f"UPDATE {QUEUE_STATE_TABLE} SET sealed = TRUE")
+
+    def state(self) -> tuple[int, bool]:
+        """
+        Gets the number of the current run and whether it is sealed, (0, False) before any run.
+        """
+        rows = self._run(f"SELECT run, sealed FROM {QUEUE_STATE_TABLE}")
+        return rows[0] if rows else (0, False)
+
+    def enqueue(self, chunks: list[TableChunk], pg_sql: str, priority: int = 0):
+        """
+        Adds a table's chunks to the queue, with the translated DDL the workers need to convert its rows.
+        Units already queued are kept as they are, except failed ones, which get a fresh set of attempts.
+
+        Args:
+            chunks (list[TableChunk]): The chunks to queue, e.g. from pending_chunks.
+            pg_sql (str): The translated PostgreSQL CREATE TABLE statement.
+            priority (int): Units with a higher priority are claimed first.
+        """
+        if not chunks:
+            return
+        conn = self._connect()
+        cur = conn.cursor()
+        try:
+            for chunk in chunks:
+                plan = {key: value for key, value in asdict(chunk).items() if key not in _STATE_FIELDS}
+                cur.execute(
+                    f"INSERT INTO {QUEUE_TABLE} (unit, table_name, plan, pg_sql, priority) VALUES (%s, %s, %s, %s, %s) "
+                    "ON CONFLICT (unit) DO UPDATE SET state = 'pending', attempts = 0, worker = NULL, lease_until = NULL, "
+                    f"error = NULL, updated_at = now() WHERE {QUEUE_TABLE}.state = 'failed'",
+                    (chunk.label, chunk.table, Json(plan), pg_sql, priority)
+                )
+            conn.commit()
+        finally:
+            cur.close()
+            conn.close()
+
+    def forget_tables(self, tables: list[str]):
+        """
+        Drops the queued units of the given tables, whatever their state, so they can be queued again.
+        """
+        self._run(f"DELETE FROM {QUEUE_TABLE} WHERE table_name = ANY(%s)", (list(tables),))
+
+    def claim(self, worker: str) -> tuple[TableChunk, str, int] | None:
+        """
+        Claims the next unit: the pending unit with the highest priority, or one whose lease ran out.
+
+        Args:
+            worker (str): Name of the claiming worker, unique across all hosts.
+
+        Returns:
+            tuple[TableChunk, str, int] | None: The chunk, its table's PostgreSQL DDL and the attempt number the
+            lease is held under, or None if nothing can be claimed right now.
+        """
+        rows = self._run(
+            # Units out of attempts aren't claimed again, they are failed here
+            f"UPDATE {QUEUE_TABLE} SET state = 'failed', worker = NULL, error = 'Lease expired on the last attempt', "
+            "updated_at = now() WHERE state = 'running' AND lease_until < now() AND attempts >= %s;"
+            f"UPDATE {QUEUE_TABLE} SET state = 'running', worker = %s, attempts = attempts + 1, "
+            "lease_until = now() + make_interval(secs => %s), updated_at = now() "
+            f"WHERE unit = (SELECT unit FROM {QUEUE_TABLE} "
+            "WHERE state = 'pending' OR (state = 'running' AND lease_until < now()) "
+            "ORDER BY priority DESC, unit LIMIT 1 FOR UPDATE SKIP LOCKED) "
+            "RETURNING plan, pg_sql, attempts",
+            (MIGRATION.max_attempts, worker, MIGRATION.lease_seconds)
+        )
+        if not rows:
+            return None
+        plan, pg_sql, attempt = rows[0]
+        return TableChunk(**plan), pg_sql, attempt
+
+    def heartbeat(self, workers: list[str]) -> int:
+        """
+        Renews the leases of every unit the given workers hold.
+
+        Returns:
+            int: The number of leases renewed.
+        """
+        conn = self._connect()
+        cur = conn.cursor()
+        try:
+            cur.execute(
+                f"UPDATE {QUEUE_TABLE} SET lease_until = now() + make_interval(secs => %s) "
+                "WHERE state = 'running' AND worker = ANY(%s)",
+                (MIGRATION.lease_seconds, workers)
+            )
+            conn.commit()
+            return cur.rowcount
+        finally:
+            cur.close()
+            conn.close()
+
+    def fence(self, cur, unit: str, worker: str, attempt: int):
+        """
+        Checks through a load cursor that the worker still holds the unit under the same attempt, and keeps it from
+        being claimed by anyone else until the cursor's transaction ends. FOR KEY SHARE doesn't block heartbeats.
+
+        Raises:
+            LeaseLost: If the unit was claimed again since.
+        """
+        cur.execute(
+            f"SELECT 1 FROM {QUEUE_TABLE} WHERE unit = %s AND worker = %s AND attempts = %s FOR KEY SHARE",
+            (unit, worker, attempt)
+        )
+        if cur.fetchone() is None:
+            raise LeaseLost(f"[{unit}] Claimed again by another worker, abandoning attempt {attempt}.")
+
+    def complete(self, unit: str, worker: str, attempt: int, rows: int) -> bool:
+        """
+        Marks a unit as done, if the worker still holds it under the same attempt.
+
+        Returns:
+            bool: Whether the unit was marked done.
+        """
+        return bool(self._run(
+            f"UPDATE {QUEUE_TABLE} SET state = 'done', rows = %s, lease_until = NULL, error = NULL, updated_at = now() "
+            "WHERE unit = %s AND worker = %s AND attempts = %s RETURNING unit",
+            (rows, unit, worker, attempt)
+        ))
+
+    def fail(self, unit: str, worker: str, attempt: int, error: str):
+        """
+        Gives a unit back after a failed attempt: it is retried, unless it is out of attempts.
+        """
+        self._run(
+            f"UPDATE {QUEUE_TABLE} SET state = CASE WHEN attempts >= %s THEN 'failed' ELSE 'pending' END, "
+            "worker = NULL, lease_until = NULL, error = %s, updated_at = now() "
+            "WHERE unit = %s AND worker = %s AND attempts = %s",
+            (MIGRATION.max_attempts, error, unit, worker, attempt)
+        )
+
+    def status(self) -> dict[str, int]:
+        """
+        Counts the units in each state ("pending", "running", "done", "failed"), and the workers holding a live
+        lease ("workers").
+        """
+        rows = self._run(
+            f"SELECT state, count(*), count(DISTINCT worker) FILTER (WHERE lease_until >= now()) FROM {QUEUE_TABLE} GROUP BY state"
+        )
+        counts = {"pending": 0, "running": 0, "done": 0, "failed": 0, "workers": 0}
+        for state, count, workers in rows:
+            counts[state] = count
+            counts["workers"] += workers
+        return counts
+
+
+class _LeasedJournal(MigrationJournal):
+    """
+    The journal as seen by a worker running a claimed unit: every batch is fenced against the queue before its
+    progress is recorded, so a worker that lost its lease can't commit rows the unit's new holder also loads.
+    """
+
+    def __init__(self, config: DatabaseConfig, queue: WorkQueue, worker: str, attempt: int):
+        super().__init__(config)
+        self.queue = queue
+        self.worker = worker
+        self.attempt = attempt
+
+    def checkpoint(self, cur, batch: list[tuple], chunk: TableChunk):
+        self.queue.fence(cur, chunk.label, self.worker, self.attempt)
+        super().checkpoint(cur, batch, chunk)
+
+
+def run_unit(chunk: TableChunk, pg_sql: str, mysql_config: DatabaseConfig, pg_config: DatabaseConfig, journal: MigrationJournal) -> int:
+    """
+    Runs one claimed unit through the normal export / import path, resuming after the high-water mark the journal
+    has for it if an earlier attempt got part of the way.
+
+    Returns:
+        int: The number of rows imported.
+    """
+    recorded = {recorded.label: recorded for recorded in journal.get_chunks(chunk.table)}.get(chunk.label, chunk)
+    if recorded.completed:
+        log(f"[{chunk.label}] Already migrated by an earlier attempt.", "info")
+        return 0
+    raw = use_raw_rows()
+    return migrate_chunk(recorded, mysql_config, pg_config, journal, compile_converters(pg_sql, raw), raw)
+
+
+def run_worker(mysql_config: DatabaseConfig, pg_config: DatabaseConfig, slots: int = None, name: str = None, runner=None) -> int:
+    """
+    Runs units from the work queue until none are left. Each of the slots claims and runs one unit at a time, and a
+    heartbeat thread renews the leases of the units being run. The worker stops once the run is sealed and drained:
+    until then it waits for units still being queued, and for units other workers hold, to take over any of them
+    whose lease runs out. A worker started on a queue an earlier run left sealed and drained waits for the next run.
+
+    Args:
+        mysql_config (DatabaseConfig): Source MySQL connection details.
+        pg_config (DatabaseConfig): Target PostgreSQL connection details, where the queue is.
+        slots (int): Units run at once. Defaults to the migration config's workers.
+        name (str): Worker name, unique across hosts. Defaults to the host name and process id.
+        runner (Callable): Runs a claimed unit, with the signature of run_unit (the default).
+
+    Returns:
+        int: The number of rows imported by this worker.
+    """
+    slots = slots or MIGRATION.workers
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    runner = runner or run_unit
+    queue = WorkQueue(pg_config)
+    names = [f"{name}:{slot}" for slot in range(slots)]
+    interval = MIGRATION.lease_seconds / 3
+    stop = threading.Event()
+
+    def progress() -> tuple[int, bool, bool]:
+        # (run, sealed, drained), before any run while the tables don't exist yet
+        try:
+            run, sealed = queue.state()
+            counts = queue.status()
+        except psycopg2.errors.UndefinedTable:
+            return 0, False, False
+        return run, sealed, not counts["pending"] and not counts["running"]
+
+    run, sealed, drained = progress()
+    target = run + 1 if sealed and drained else run
+
+    def heartbeat():
+        while not stop.wait(interval):
+            try:
+                queue.heartbeat(names)
+            except psycopg2.Error as e:
+                log(f"[{name}] Heartbeat failed, retrying: {e}", level="warn")
+
+    def work(worker: str) -> int:
+        imported = 0
+        while True:
+            try:
+                claimed = queue.claim(worker)
+            except psycopg2.errors.UndefinedTable:
+                claimed = None
+            if claimed is None:
+                run, sealed, drained = progress()
+                if run >= target and sealed and drained:
+                    return imported
+                time.sleep(interval)
+                continue
+            chunk, pg_sql, attempt = claimed
+            log(f"[{worker}] Claimed {chunk.label} (attempt {attempt}).", "info")
+            try:
+                rows = runner(chunk, pg_sql, mysql_config, pg_config, _LeasedJournal(pg_config, queue, worker, attempt))
+            except LeaseLost as e:
+                log(str(e), level="warn")
+                continue
+            except Exception as e:
+                log(f"[{chunk.label}] Attempt {attempt} failed: {e}", level="error")
+                queue.fail(chunk.label, worker, attempt, str(e))
+                continue
+            if queue.complete(chunk.label, worker, attempt, rows):
+                imported += rows
+            else:
+                log(f"[{chunk.label}] Finished after another worker took it over.", level="warn")
+
+    log(f"[{name}] Working on the queue with {slots} slots...", "info")
+    beat = threading.Thread(target=heartbeat, name=f"heartbeat-{name}", daemon=True)
+    beat.start()
+    try:
+        with ThreadPoolExecutor(max_workers=slots, thread_name_prefix="queue-worker") as pool:
+            imported = sum(pool.map(work, names))
+    finally:
+        stop.set()
+        beat.join()
+    log(f"[{name}] ✅ Queue empty, imported {imported} rows.", "success")
+    return imported
+
+
+def enqueue_tables(tables: list[str], translated: dict[str, str], mysql_config: DatabaseConfig, queue: WorkQueue, journal: MigrationJournal, sizes: dict[str, tuple[int, int]] = None) -> int:
+    """
+    Plans the chunks of every table (see pending_chunks) and puts them in the work queue, largest chunks first.
+
+    Returns:
+        int: The number of units queued.
+    """
+    sizes = sizes or {}
+    queued = 0
+    for table in tables:
+        estimated_rows = sizes.get(table, (0, 0))[0]
+        chunks = pending_chunks(table, translated[table], estimated_rows, mysql_config, journal)
+        queue.enqueue(chunks, translated[table], priority=estimated_rows // max(len(chunks), 1))
+        queued += len(chunks)
+    log(f"Queued {queued} units of {len(tables)} tables.", "info")
+    return queued
+
+
+def wait_for_queue(queue: WorkQueue, interval: float = None) -> dict[str, int]:
+    """
+    Waits until every unit in the queue is done or failed, logging its progress.
+
+    Returns:
+        dict[str, int]: The final counts, see WorkQueue.status.
+    """
+    interval = interval or MIGRATION.progress_interval
+    while True:
+        counts = queue.status()
+        log(f"Work queue: {counts['done']} done, {counts['running']} running, {counts['pending']} pending, "
+            f"{counts['failed']} failed, {counts['workers']} workers.", "info")
+        if not counts["pending"] and not counts["running"]:
+            return counts
+        time.sleep(interval)
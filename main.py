@@ -1,11 +1,25 @@
+import argparse
 import re
-from schema.extractor import get_mysql_tables
+from functools import partial
+from cli import add_migrate_arguments
+from schema.extractor import get_mysql_tables, get_mysql_table_sizes
+from schema.cache import SchemaCache, get_mysql_tables_cached
 from schema.translator import translate_schema
 from schema.creator import create_pg_tables
-from data.exporter import export_table_data
-from data.importer import import_table_data
+from schema.post_load import build_post_load, plan_post_load
+from schema.fast_load import analyze_tables, find_emptied_tables, make_unlogged, restore_durability
+from data.journal import MigrationJournal
+from data.pipeline import migrate_table
+from data.async_engine import run_async_migrations
+from data.dump import load_dump
+from data.delta import sync_tables
+from data.verify import verify_tables
+from data.staging import export_to_stage, import_from_stage
+from data.work_queue import QUEUE_TABLE, WorkQueue, enqueue_tables, run_worker, wait_for_queue
+from data.scheduler import build_dependency_graph, run_table_migrations
 from utils.logger import log
-from config.config import MYSQL, POSTGRES
+from utils.metrics import METRICS, ProgressReporter
+from config.config import MYSQL, POSTGRES, MIGRATION
 
 # TESTING COMMAND(S)
 # python -m unittest tests/test.py
@@ -30,32 +44,154 @@ def count_columns(create_stmt: str) -> int:
     return comma_lines + 1  # +1 for the last column
 
 # Migration functions:
-def migrate_schema():
+def load_schema() -> tuple[dict[str, str], dict[str, str]]:
+    """
+    Extracts and translates the MySQL schema. With a schema cache configured, only the tables that changed since
+    the last run are extracted and translated again.
+
+    Returns:
+        tuple[dict[str, str], dict[str, str]]: The MySQL and the PostgreSQL CREATE TABLE statements, by table name.
+    """
+    cache = SchemaCache(MIGRATION.schema_cache) if MIGRATION.schema_cache else None
     log("Extracting schema from MySQL...", "info")
-    tables = get_mysql_tables(MYSQL)
+    with METRICS.phase("*", "extract", database="mysql") as counts:
+        tables = get_mysql_tables_cached(MYSQL, cache) if cache else get_mysql_tables(MYSQL)
+        counts["bytes"] = sum(len(sql) for sql in tables.values())
+    log("Translating schema to PostgreSQL...", "info")
+    with METRICS.phase("*", "translate") as counts:
+        translated = translate_schema(tables, cache=cache)
+        counts["bytes"] = sum(len(sql) for sql in tables.values())
+    if cache:
+        cache.save()
+    return tables, translated
+
+def migrate_schema():
+    tables, translated = load_schema()
     log(f"Fetched {len(tables)} tables [~{sum([count_columns(x) for x in tables.values()])} columns total] from MySQL.", "info")
     [print(f"===[MYSQL 8 version {x} ]===\n{tables[x]}\n===[ ------- ]===") for x in tables.keys()]
-    log("Translating schema to PostgreSQL...", "info")
-    translated = translate_schema(tables)
     [print(f"===[POSTGRES version {x} ]===\n{translated[x]}\n===[ ------- ]===") for x in translated.keys()]
     log(f"Translated {len(translated)} tables [~{sum([count_columns(x) for x in translated.values()])} columns total] to PostgreSQL.", "info")
+    # Keys and indexes are built after the data is loaded, see build_post_load
+    bare_tables, post_load_steps = plan_post_load(translated, tables)
     log("Creating PostgreSQL tables...", "info")
-    create_pg_tables(translated, POSTGRES)
+    with METRICS.phase("*", "create", database="postgres"):
+        create_pg_tables(make_unlogged(bare_tables) if MIGRATION.fast_load else bare_tables, POSTGRES)
 
     
     log("✅ Schema migration complete.", "success")
+    return translated, post_load_steps
 
-def migrate_data():
-    tables = [x for x in get_mysql_tables(MYSQL) if x not in TABLE_NAME_SKIPLIST]
+def migrate_data(translated: dict[str, str] = None, journal: MigrationJournal = None) -> bool:
+    if translated is None:
+        _, translated = load_schema()
+    tables = [x for x in translated if x not in TABLE_NAME_SKIPLIST]
     log(f"Skipping tables: {TABLE_NAME_SKIPLIST}", "info")
-    for table in tables:
-        log(f"Migrating data: {table}", "info")
-        rows = export_table_data(table, MYSQL)
-        import_table_data(table, rows, POSTGRES)
+    sizes = get_mysql_table_sizes(MYSQL)
+    if MIGRATION.engine == "asyncio":
+        log(f"Migrating data for {len(tables)} tables over {MIGRATION.mysql_streams} MySQL / {MIGRATION.pg_streams} PostgreSQL streams...", "info")
+        results = run_async_migrations(tables, translated, MYSQL, POSTGRES, sizes=sizes, journal=journal)
+    else:
+        log(f"Migrating data for {len(tables)} tables with {MIGRATION.workers} {MIGRATION.worker_mode} workers...", "info")
+        results = run_table_migrations(
+            tables,
+            partial(migrate_table, mysql_config=MYSQL, pg_config=POSTGRES, journal=journal),
+            dependencies=build_dependency_graph(translated),
+            sizes=sizes,
+            task_args={table: (translated[table], sizes.get(table, (0, 0))[0]) for table in tables},
+        )
+    failed = [table for table, rows in results.items() if rows is None]
+    if failed:
+        log(f"Data migration failed for tables: {failed}", "error")
+    return not failed
+
+def main(resume: bool = False, dump: str = None, stage_export: str = None, stage_import: str = None, sync: bool = False, verify: bool = False, coordinator: bool = False, worker: bool = False):
+    reporter = ProgressReporter(
+        interval=MIGRATION.progress_interval,
+        json_path=MIGRATION.metrics_json,
+        prometheus_path=MIGRATION.metrics_prometheus,
+    )
+    with reporter:
+        if dump:
+            load_dump(dump, POSTGRES)
+        elif sync:
+            journal = MigrationJournal(POSTGRES)
+            # Watermarks live in the journal, so syncing always keeps it
+            journal.setup(resume=True)
+            tables, translated = load_schema()
+            translated = {table: sql for table, sql in translated.items() if table not in TABLE_NAME_SKIPLIST}
+            sync_tables(translated, tables, MYSQL, POSTGRES, journal)
+        elif verify:
+            _, translated = load_schema()
+            translated = {table: sql for table, sql in translated.items() if table not in TABLE_NAME_SKIPLIST}
+            results = verify_tables(translated, MYSQL, POSTGRES, sizes=get_mysql_table_sizes(MYSQL))
+            failed = [table for table, result in results.items() if not result.ok]
+            if failed:
+                log(f"Verification found differences in tables: {failed}", "error")
+            else:
+                log(f"✅ All {len(results)} tables match.", "success")
+        elif stage_export:
+            tables, translated = load_schema()
+            translated = {table: sql for table, sql in translated.items() if table not in TABLE_NAME_SKIPLIST}
+            export_to_stage(stage_export, tables, translated, MYSQL, sizes=get_mysql_table_sizes(MYSQL))
+        elif stage_import:
+            journal = MigrationJournal(POSTGRES)
+            journal.setup(resume=resume)
+            import_from_stage(stage_import, POSTGRES, journal=journal, create=not resume)
+        elif worker:
+            run_worker(MYSQL, POSTGRES)
+        else:
+            migrate(resume, distributed=coordinator)
+
+def distribute_data(translated: dict[str, str], journal: MigrationJournal, resume: bool = False, reload: list[str] = ()) -> bool:
+    # Workers on any host (python cli.py worker) load the queued units, this only waits for them
+    queue = WorkQueue(POSTGRES)
+    queue.setup(reset=not resume)
+    if reload:
+        queue.forget_tables(reload)
+    tables = [x for x in translated if x not in TABLE_NAME_SKIPLIST]
+    enqueue_tables(tables, translated, MYSQL, queue, journal, sizes=get_mysql_table_sizes(MYSQL))
+    queue.seal()
+    counts = wait_for_queue(queue)
+    if counts["failed"]:
+        log(f"Data migration failed for {counts['failed']} units, see {QUEUE_TABLE}. Run with --resume to retry them.", "error")
+    return not counts["failed"]
+
+def migrate(resume: bool = False, distributed: bool = False):
+    journal = MigrationJournal(POSTGRES)
+    journal.setup(resume=resume)
+    if resume and journal.is_done("phase:schema"):
+        log("Schema already migrated by an earlier run, skipping.", "info")
+        tables, translated = load_schema()
+        _, post_load_steps = plan_post_load(translated, tables)
+    else:
+        translated, post_load_steps = migrate_schema()
+        journal.mark_done("phase:schema")
+    reload = []
+    if resume and MIGRATION.fast_load:
+        # A crash since the last run empties the tables still unlogged, but not the journal
+        reload = find_emptied_tables(list(translated), POSTGRES)
+        if reload:
+            log(f"Unlogged tables emptied since the last run, loading them again: {reload}", "warn")
+            journal.forget_tables(reload)
+    loaded = distribute_data(translated, journal, resume, reload) if distributed else migrate_data(translated, journal)
+    if loaded:
+        journal.mark_done("phase:data")
+    # Fast load tables are made logged between the indexes and the foreign keys, a logged table can't reference an unlogged one
+    restore = partial(restore_durability, list(translated), POSTGRES, journal) if MIGRATION.fast_load else None
+    if resume and journal.is_done("phase:post_load"):
+        log("Keys and indexes already built by an earlier run, skipping.", "info")
+    elif not build_post_load(post_load_steps, POSTGRES, before_foreign_keys=restore):
+        journal.mark_done("phase:post_load")
+    if MIGRATION.fast_load:
+        # Nothing to do unless the post-load step was skipped before getting there
+        restore()
+        analyze_tables(list(translated), POSTGRES)
 
-def main():
-    migrate_schema()
-    migrate_data()
+def parse_args():
+    parser = argparse.ArgumentParser(description="Migrate a MySQL 8 database to PostgreSQL.")
+    add_migrate_arguments(parser)
+    return parser.parse_args()
 
 if __name__ == "__main__":
-    main()
+    args = parse_args()
+    main(resume=args.resume, dump=args.dump, stage_export=args.stage_export, stage_import=args.stage_import, sync=args.sync, verify=args.verify, coordinator=args.coordinator, worker=args.worker)
@@ -1,9 +1,36 @@
-from .extractor import get_mysql_tables
-from .translator import translate_schema
-from .creator import create_pg_tables
-
-__all__ = [
-    "get_mysql_tables",
-    "translate_schema",
-    "create_pg_tables",
-]
+import importlib
+
+# Submodule of every export. They are imported on first use, so importing one module of the package (e.g. the
+# translator) doesn't load the database drivers the others need.
+_EXPORTS = {
+    "SchemaCache": "cache",
+    "get_mysql_tables_cached": "cache",
+    "TableInfo": "catalog",
+    "get_mysql_catalog": "catalog",
+    "render_create_table": "catalog",
+    "get_mysql_tables": "extractor",
+    "get_mysql_table_sizes": "extractor",
+    "translate_schema": "translator",
+    "create_pg_tables": "creator",
+    "plan_creation_levels": "creator",
+    "analyze_tables": "fast_load",
+    "make_unlogged": "fast_load",
+    "restore_durability": "fast_load",
+    "PostLoadStep": "post_load",
+    "build_post_load": "post_load",
+    "plan_post_load": "post_load",
+    "find_sql_files": "sql_files",
+    "read_sql_tables": "sql_files",
+    "translate_sql_files": "sql_files",
+    "iter_dump_statements": "statements",
+}
+
+__all__ = list(_EXPORTS)
+
+
+def __getattr__(name: str):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{_EXPORTS[name]}", __name__), name)
+    globals()[name] = value
+    return value
@@ -0,0 +1,133 @@
+import hashlib
+import json
+import os
+
+import mysql.connector
+
+from config.config import DatabaseConfig
+from utils.logger import log
+from .extractor import get_mysql_table_fingerprints, get_mysql_tables
+
+# Translations are only reused by the same translator: a change to any of these files invalidates the whole cache
+_TRANSLATOR_FILES = ("ddl.py", "translator.py", "type_map.py")
+_FORMAT = 1
+
+
+def _translator_version() -> str:
+    digest = hashlib.sha256(str(_FORMAT).encode())
+    for name in _TRANSLATOR_FILES:
+        with open(os.path.join(os.path.dirname(__file__), name), "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def _ddl_hash(mysql_sql: str) -> str:
+    return hashlib.sha256(mysql_sql.encode()).hexdigest()
+
+
+class SchemaCache:
+    """
+    On-disk snapshot of an extracted and translated schema, so a rerun only extracts and translates the tables
+    whose definition changed.
+    Per table it keeps the source fingerprint and MySQL DDL, and the translation with what it depended on: the hash
+    of the DDL it came from, the table's own single-column keys and the keys of the tables its foreign keys
+    reference. translate_schema reuses a translation while all of those still match.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.version = _translator_version()
+        self.tables: dict[str, dict] = {}
+        if os.path.exists(path):
+            try:
+                with open(path, encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.version:
+                    self.tables = data.get("tables", {})
+                else:
+                    log("The translator changed since the schema cache was written, ignoring it.", level="info")
+            except (OSError, ValueError) as e:
+                log(f"Could not read the schema cache {path}, ignoring it: {e}", level="warn")
+
+    def get_mysql(self, table: str, fingerprint: str) -> str:
+        """
+        Returns the cached MySQL DDL of a table, or None unless it was extracted with this fingerprint.
+        """
+        entry = self.tables.get(table)
+        if entry and entry.get("fingerprint") == fingerprint:
+            return entry.get("mysql")
+        return None
+
+    def put_mysql(self, table: str, fingerprint: str, mysql_sql: str):
+        entry = self.tables.get(table)
+        if entry is None or entry.get("mysql") != mysql_sql:
+            # A different DDL invalidates the translation too
+            entry = self.tables[table] = {}
+        entry.update(fingerprint=fingerprint, mysql=mysql_sql)
+
+    def get_translation(self, table: str, mysql_sql: str) -> dict:
+        """
+        Returns the cached translation of a table as a dict with "translated", "keys" and "references" (referenced
+        table -> its keys at translation time), or None if there is none for this exact DDL.
+        """
+        entry = self.tables.get(table)
+        if entry and "translated" in entry and entry.get("ddl_hash") == _ddl_hash(mysql_sql):
+            return entry
+        return None
+
+    def put_translation(self, table: str, mysql_sql: str, translated: str, keys: set[str], references: dict[str, set[str]]):
+        entry = self.tables.setdefault(table, {})
+        entry.update(
+            ddl_hash=_ddl_hash(mysql_sql),
+            translated=translated,
+            keys=sorted(keys),
+            references={name: sorted(columns) for name, columns in references.items()},
+        )
+
+    def prune(self, tables):
+        """
+        Forgets tables that no longer exist.
+        """
+        self.tables = {name: entry for name, entry in self.tables.items() if name in tables}
+
+    def save(self):
+        """
+        Writes the cache, replacing the file atomically so an interrupted run can't leave it half written.
+        """
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        temp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": self.version, "tables": self.tables}, f)
+        os.replace(temp_path, self.path)
+
+
+def get_mysql_tables_cached(config: DatabaseConfig, cache: SchemaCache) -> dict[str, str]:
+    """
+    Gets the CREATE TABLE statements of every table like get_mysql_tables, but only extracts the tables whose
+    fingerprint changed since they were cached. The rest come from the cache.
+
+    Args:
+        config (DatabaseConfig): Config object for the database connection.
+        cache (SchemaCache): The schema cache, updated with the tables extracted.
+
+    Returns:
+        dict[str, str]: Mapping of table names to their creation SQL statements.
+    """
+    try:
+        fingerprints = get_mysql_table_fingerprints(config)
+    except mysql.connector.Error as e:
+        log(f"Could not fingerprint the schema, extracting all of it: {e}", level="warn")
+        return get_mysql_tables(config)
+
+    tables = {name: cache.get_mysql(name, fingerprint) for name, fingerprint in fingerprints.items()}
+    stale = [name for name, sql in tables.items() if sql is None]
+    log(f"Schema cache: {len(tables) - len(stale)} tables unchanged, extracting {len(stale)}.", level="info")
+    if stale:
+        extracted = get_mysql_tables(config, names=stale)
+        for name in stale:
+            if name in extracted:
+                tables[name] = extracted[name]
+                cache.put_mysql(name, fingerprints[name], extracted[name])
+    cache.prune(fingerprints)
+    return {name: sql for name, sql in tables.items() if sql is not None}
@@ -0,0 +1,242 @@
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Optional
+
+import mysql.connector
+
+from config.config import DatabaseConfig
+
+
+@dataclass
+class ColumnInfo:
+    name: str
+    column_type: str                # Full MySQL type, e.g. "varchar(60)", "enum('a','b')", "int unsigned"
+    data_type: str                  # Base type, e.g. "varchar"
+    nullable: bool
+    default: Optional[str] = None
+    extra: str = ""                 # e.g. "auto_increment", "DEFAULT_GENERATED on update CURRENT_TIMESTAMP"
+    generation_expression: str = ""
+    comment: str = ""
+
+
+@dataclass
+class IndexInfo:
+    name: str
+    unique: bool
+    index_type: str                 # "BTREE", "FULLTEXT", "SPATIAL", ...
+    columns: list[str] = field(default_factory=list)  # Rendered parts, e.g. "bio(255)", "created DESC", "(lower(name))"
+
+
+@dataclass
+class ForeignKeyInfo:
+    name: str
+    columns: list[str] = field(default_factory=list)
+    referenced_table: str = ""
+    referenced_columns: list[str] = field(default_factory=list)
+    update_rule: str = "RESTRICT"
+    delete_rule: str = "RESTRICT"
+
+
+@dataclass
+class TableInfo:
+    name: str
+    engine: str = "InnoDB"
+    collation: str = ""
+    comment: str = ""
+    create_options: str = ""
+    columns: list[ColumnInfo] = field(default_factory=list)
+    indexes: list[IndexInfo] = field(default_factory=list)
+    foreign_keys: list[ForeignKeyInfo] = field(default_factory=list)
+    checks: list[tuple[str, str]] = field(default_factory=list)  # (name, clause)
+
+    @property
+    def partitioned(self) -> bool:
+        return "partitioned" in self.create_options.lower()
+
+
+def get_mysql_catalog(config: DatabaseConfig, names: list[str] = None) -> dict[str, TableInfo]:
+    """
+    Reads the structure of every table in a MySQL database with a handful of set-based information_schema queries,
+    instead of one SHOW CREATE TABLE round trip per table.
+
+    Args:
+        config (DatabaseConfig): Config object for the database connection.
+        names (list[str]): Only read these tables. Defaults to all of them.
+
+    Returns:
+        dict[str, TableInfo]: Mapping of table names to their structure, in SHOW TABLES order.
+    """
+    if names is not None and not names:
+        return {}
+
+    def only(column: str) -> str:
+        return f" AND {column} IN ({', '.join(['%s'] * len(names))})" if names is not None else ""
+    params = tuple(names or ())
+
+    conn = mysql.connector.connect(**config.unpack_mysql())
+    cursor = conn.cursor()
+
+    cursor.execute(
+        "SELECT TABLE_NAME, ENGINE, TABLE_COLLATION, TABLE_COMMENT, CREATE_OPTIONS FROM information_schema.TABLES "
+        f"WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'{only('TABLE_NAME')} ORDER BY TABLE_NAME",
+        params
+    )
+    catalog = {
+        name: TableInfo(name, engine or "InnoDB", collation or "", comment or "", create_options or "")
+        for name, engine, collation, comment, create_options in cursor.fetchall()
+    }
+
+    cursor.execute(
+        "SELECT TABLE_NAME, COLUMN_NAME, COLUMN_TYPE, DATA_TYPE, IS_NULLABLE, COLUMN_DEFAULT, EXTRA, "
+        "GENERATION_EXPRESSION, COLUMN_COMMENT FROM information_schema.COLUMNS "
+        f"WHERE TABLE_SCHEMA = DATABASE(){only('TABLE_NAME')} ORDER BY TABLE_NAME, ORDINAL_POSITION",
+        params
+    )
+    for table, name, column_type, data_type, nullable, default, extra, expression, comment in cursor.fetchall():
+        if table in catalog:
+            catalog[table].columns.append(ColumnInfo(
+                name, _text(column_type), _text(data_type).lower(), nullable == "YES",
+                None if default is None else _text(default), extra or "", _text(expression or ""), comment or ""
+            ))
+
+    cursor.execute(
+        "SELECT TABLE_NAME, INDEX_NAME, NON_UNIQUE, INDEX_TYPE, COLUMN_NAME, SUB_PART, COLLATION, EXPRESSION "
+        f"FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE(){only('TABLE_NAME')} ORDER BY TABLE_NAME, INDEX_NAME, SEQ_IN_INDEX",
+        params
+    )
+    indexes = defaultdict(dict)
+    for table, name, non_unique, index_type, column, sub_part, collation, expression in cursor.fetchall():
+        index = indexes[table].setdefault(name, IndexInfo(name, not int(non_unique), index_type))
+        part = f"({_text(expression)})" if expression else column + (f"({sub_part})" if sub_part else "")
+        index.columns.append(part + (" DESC" if collation == "D" else ""))
+
+    cursor.execute(
+        "SELECT k.TABLE_NAME, k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME, k.REFERENCED_COLUMN_NAME, "
+        "r.UPDATE_RULE, r.DELETE_RULE FROM information_schema.KEY_COLUMN_USAGE k "
+        "JOIN information_schema.REFERENTIAL_CONSTRAINTS r "
+        "ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME AND r.TABLE_NAME = k.TABLE_NAME "
+        f"WHERE k.TABLE_SCHEMA = DATABASE(){only('k.TABLE_NAME')} ORDER BY k.TABLE_NAME, k.CONSTRAINT_NAME, k.ORDINAL_POSITION",
+        params
+    )
+    foreign_keys = defaultdict(dict)
+    for table, name, column, referenced_table, referenced_column, update_rule, delete_rule in cursor.fetchall():
+        foreign_key = foreign_keys[table].setdefault(name, ForeignKeyInfo(name, [], referenced_table, [], update_rule, delete_rule))
+        foreign_key.columns.append(column)
+        foreign_key.referenced_columns.append(referenced_column)
+
+    cursor.execute(
+        "SELECT t.TABLE_NAME, c.CONSTRAINT_NAME, c.CHECK_CLAUSE FROM information_schema.TABLE_CONSTRAINTS t "
+        "JOIN information_schema.CHECK_CONSTRAINTS c "
+        "ON c.CONSTRAINT_SCHEMA = t.CONSTRAINT_SCHEMA AND c.CONSTRAINT_NAME = t.CONSTRAINT_NAME "
+        f"WHERE t.TABLE_SCHEMA = DATABASE() AND t.CONSTRAINT_TYPE = 'CHECK'{only('t.TABLE_NAME')} ORDER BY t.TABLE_NAME, c.CONSTRAINT_NAME",
+        params
+    )
+    for table, name, clause in cursor.fetchall():
+        if table in catalog:
+            catalog[table].checks.append((name, _text(clause)))
+
+    cursor.close()
+    conn.close()
+
+    def index_order(index: IndexInfo) -> tuple:
+        # SHOW CREATE TABLE lists the primary key, then unique keys, then plain keys, then full-text / spatial keys
+        return (index.name != "PRIMARY", not index.unique, index.index_type in ("FULLTEXT", "SPATIAL"), index.name)
+
+    for name, table in catalog.items():
+        table.indexes = sorted(indexes[name].values(), key=index_order)
+        table.foreign_keys = list(foreign_keys[name].values())
+    return catalog
+
+
+def render_create_table(table: TableInfo) -> str:
+    """
+    Renders a catalog table as a MySQL CREATE TABLE statement in the same shape as SHOW CREATE TABLE
+    (without backticks, like get_mysql_tables returns), so the translator can consume it unchanged.
+
+    Args:
+        table (TableInfo): The table structure from get_mysql_catalog.
+
+    Returns:
+        str: The CREATE TABLE statement.
+    """
+    lines = [_render_column(column) for column in table.columns]
+    for index in table.indexes:
+        columns = ",".join(index.columns)
+        if index.name == "PRIMARY":
+            lines.append(f"PRIMARY KEY ({columns})")
+        elif index.index_type in ("FULLTEXT", "SPATIAL"):
+            lines.append(f"{index.index_type} KEY {index.name} ({columns})")
+        elif index.unique:
+            lines.append(f"UNIQUE KEY {index.name} ({columns})")
+        else:
+            lines.append(f"KEY {index.name} ({columns})")
+    for foreign_key in table.foreign_keys:
+        line = (
+            f"CONSTRAINT {foreign_key.name} FOREIGN KEY ({', '.join(foreign_key.columns)}) "
+            f"REFERENCES {foreign_key.referenced_table} ({', '.join(foreign_key.referenced_columns)})"
+        )
+        # Like SHOW CREATE TABLE, leave out the default actions
+        if foreign_key.delete_rule not in ("RESTRICT", "NO ACTION"):
+            line += f" ON DELETE {foreign_key.delete_rule}"
+        if foreign_key.update_rule not in ("RESTRICT", "NO ACTION"):
+            line += f" ON UPDATE {foreign_key.update_rule}"
+        lines.append(line)
+    for name, clause in table.checks:
+        lines.append(f"CONSTRAINT {name} CHECK ({clause})")
+
+    options = f"ENGINE={table.engine}"
+    if table.collation:
+        options += f" DEFAULT CHARSET={table.collation.split('_')[0]} COLLATE={table.collation}"
+    if table.comment:
+        options += " COMMENT=" + _quote(table.comment)
+    return f"CREATE TABLE {table.name} (\n  " + ",\n  ".join(lines) + f"\n) {options}"
+
+
+def _render_column(column: ColumnInfo) -> str:
+    parts = [column.name, column.column_type]
+    extra = column.extra.lower()
+    if column.generation_expression:
+        expression = column.generation_expression
+        parts.append(f"GENERATED ALWAYS AS (({expression}))" if not expression.startswith("(") else f"GENERATED ALWAYS AS ({expression})")
+        parts.append("STORED" if "stored" in extra else "VIRTUAL")
+    if not column.nullable:
+        parts.append("NOT NULL")
+    elif column.data_type == "timestamp":
+        # SHOW CREATE TABLE spells out NULL for nullable timestamps
+        parts.append("NULL")
+
+    if column.default is not None:
+        if "default_generated" in extra:
+            default = column.default
+            is_function = default.upper().startswith(("CURRENT_TIMESTAMP", "NOW(", "LOCALTIMESTAMP"))
+            parts.append(f"DEFAULT {default}" if is_function else f"DEFAULT ({default})")
+        elif column.data_type == "bit" and column.default.startswith("b'"):
+            parts.append(f"DEFAULT {column.default}")
+        else:
+            parts.append("DEFAULT " + _quote(column.default))
+    elif column.nullable and not column.generation_expression and column.data_type not in _NO_DEFAULT_TYPES:
+        parts.append("DEFAULT NULL")
+
+    if "auto_increment" in extra:
+        parts.append("AUTO_INCREMENT")
+    if "on update" in extra:
+        parts.append("ON UPDATE " + column.extra[extra.index("on update") + len("on update"):].strip())
+    if column.comment:
+        parts.append("COMMENT " + _quote(column.comment))
+    return " ".join(parts)
+
+
+# Types that can't have a literal default, SHOW CREATE TABLE leaves "DEFAULT NULL" off them
+_NO_DEFAULT_TYPES = (
+    "tinytext", "text", "mediumtext", "longtext", "tinyblob", "blob", "mediumblob", "longblob", "json",
+    "geometry", "point", "linestring", "polygon", "multipoint", "multilinestring", "multipolygon", "geometrycollection",
+)
+
+
+def _quote(value: str) -> str:
+    return "'" + value.replace("\\", "\\\\").replace("'", "''") + "'"
+
+
+def _text(value) -> str:
+    # information_schema columns come back as bytes on some server / connector combinations
+    return value.decode("utf-8") if isinstance(value, (bytes, bytearray)) else str(value)
@@ -1,17 +1,140 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
 import psycopg2
 
-from config.config import DatabaseConfig
+from config.config import DatabaseConfig, MIGRATION
 from utils.logger import log
+from .translator import extract_foreign_keys, split_foreign_keys
+
+_CREATE_TABLE_RE = re.compile(r"^(\s*CREATE\s+(?:UNLOGGED\s+)?TABLE\s+)(?!IF\s+NOT\s+EXISTS\b)", re.IGNORECASE)
+
+
+def plan_creation_levels(schema_def: dict[str, str]) -> tuple[list[list[str]], dict[str, str], list[tuple[str, str]]]:
+    """
+    Orders tables so each is created after the tables its foreign keys reference. Tables in the same level don't
+    reference each other, so a level can be created in parallel. Tables caught in a foreign key cycle (or depending
+    on one) go in a last level without their foreign keys, which are added once every table exists.
+
+    Args:
+        schema_def (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+
+    Returns:
+        tuple[list[list[str]], dict[str, str], list[tuple[str, str]]]: The levels of table names, the statements to
+        create them with, and the (table, ALTER TABLE ... ADD CONSTRAINT) statements to run afterwards.
+    """
+    dependencies = {
+        table: {fk["foreign_table"] for fk in extract_foreign_keys(pg_sql) if fk["foreign_table"] != table and fk["foreign_table"] in schema_def}
+        for table, pg_sql in schema_def.items()
+    }
+    statements = dict(schema_def)
+    levels, created = [], set()
+    while len(created) < len(schema_def):
+        level = [table for table in schema_def if table not in created and dependencies[table] <= created]
+        if not level:
+            break
+        levels.append(level)
+        created.update(level)
+
+    deferred = []
+    cyclic = [table for table in schema_def if table not in created]
+    if cyclic:
+        log(f"Foreign key cycle between {cyclic}, adding their foreign keys after the tables are created.", level="warn")
+        for table in cyclic:
+            statements[table], foreign_keys = split_foreign_keys(schema_def[table])
+            deferred += [(table, f"ALTER TABLE {table} ADD {foreign_key}") for foreign_key in foreign_keys]
+        levels.append(cyclic)
+    return levels, statements, deferred
+
 
-def create_pg_tables(schema_def: dict[str, str], config:DatabaseConfig):
+def _execute_batched(config: DatabaseConfig, statements: list[tuple[str, str]], batch_size: int) -> list[str]:
+    """
+    Runs DDL statements on one connection, batch_size statements per round trip, in a single transaction.
+    Each batch runs under a savepoint: if any statement fails, only that batch is rolled back and its statements are
+    retried one by one under their own savepoints, so a failure never undoes other tables.
+
+    Args:
+        config (DatabaseConfig): Target PostgreSQL connection details.
+        statements (list[tuple[str, str]]): (table, statement) pairs, in the order to run them.
+        batch_size (int): Statements sent per round trip.
+
+    Returns:
+        list[str]: The tables whose statement failed.
+    """
     conn = psycopg2.connect(**config.unpack_postgres())
     cur = conn.cursor()
-    for table_def in schema_def.values():
-        try:
-            cur.execute(table_def)
-        except psycopg2.errors.DuplicateTable:
-            log(f"Table already exists, skipping: {table_def}", level="warn")
-            conn.rollback()
-    conn.commit()
-    cur.close()
-    conn.close()
+    failed = []
+
+    def log_notices():
+        # CREATE TABLE IF NOT EXISTS reports an existing table as a notice
+        for notice in conn.notices:
+            if "already exists" in notice:
+                log(f"Table already exists, skipping: {notice.strip()}", level="warn")
+        del conn.notices[:]
+
+    try:
+        for start in range(0, len(statements), batch_size):
+            batch = statements[start:start + batch_size]
+            try:
+                cur.execute("SAVEPOINT topostgres_ddl;\n" + ";\n".join(statement.rstrip().rstrip(";") for _, statement in batch) + ";\nRELEASE SAVEPOINT topostgres_ddl")
+                log_notices()
+                continue
+            except psycopg2.Error:
+                cur.execute("ROLLBACK TO SAVEPOINT topostgres_ddl")
+                del conn.notices[:]
+            for table, statement in batch:
+                cur.execute("SAVEPOINT topostgres_ddl")
+                try:
+                    cur.execute(statement)
+                    cur.execute("RELEASE SAVEPOINT topostgres_ddl")
+                    log_notices()
+                except (psycopg2.errors.DuplicateTable, psycopg2.errors.DuplicateObject) as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT topostgres_ddl")
+                    log(f"[{table}] Already exists, skipping: {str(e).strip()}", level="warn")
+                except psycopg2.Error as e:
+                    cur.execute("ROLLBACK TO SAVEPOINT topostgres_ddl")
+                    log(f"[{table}] Failed to run {statement.strip()}: {str(e).strip()}", level="error")
+                    failed.append(table)
+        conn.commit()
+    finally:
+        cur.close()
+        conn.close()
+    return failed
+
+
+def create_pg_tables(schema_def: dict[str, str], config: DatabaseConfig, workers: int = None, batch_size: int = None) -> list[str]:
+    """
+    Creates tables in dependency order (see plan_creation_levels). Each level is spread over up to workers
+    connections, and each connection sends its CREATE TABLE statements batch_size at a time. A level is committed
+    before the next one starts, as the next one's foreign keys need its tables. Existing tables are skipped.
+
+    Args:
+        schema_def (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+        config (DatabaseConfig): Target PostgreSQL connection details.
+        workers (int): Connections creating tables at once. Defaults to the migration config.
+        batch_size (int): Statements per round trip. Defaults to the migration config.
+
+    Returns:
+        list[str]: The tables that could not be created (or whose deferred foreign keys failed).
+    """
+    workers = workers or MIGRATION.create_workers
+    batch_size = batch_size or MIGRATION.ddl_batch_size
+    levels, statements, deferred = plan_creation_levels(schema_def)
+    failed = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="create") as pool:
+        for level in levels:
+            # Small levels aren't worth more connections than one per full batch
+            lanes = max(min(workers, -(-len(level) // batch_size)), 1)
+            groups = [
+                [(table, _CREATE_TABLE_RE.sub(r"\1IF NOT EXISTS ", statements[table], count=1)) for table in level[lane::lanes]]
+                for lane in range(lanes)
+            ]
+            for lane_failed in pool.map(lambda group: _execute_batched(config, group, batch_size), groups):
+                failed += lane_failed
+    if deferred:
+        failed += _execute_batched(config, deferred, batch_size)
+    if failed:
+        log(f"Failed to create tables: {failed}", level="error")
+    else:
+        log(f"Created {len(schema_def)} tables in {len(levels)} dependency levels.", level="info")
+    return failed
@@ -0,0 +1,541 @@
+import re
+from dataclasses import dataclass, field
+from typing import NamedTuple, Optional, Union
+
+# One alternation over the whole statement, so tokenizing is a single linear scan. Leading whitespace is part of
+# each match. Numbers must not run into a word, as unquoted MySQL identifiers may start with digits (e.g. 2fa_enabled).
+_TOKEN_RE = re.compile(
+    r"""
+    \s*(?:
+     (?P<comment>--[^\n]*|\#[^\n]*|/\*.*?\*/)
+    |(?P<string>'(?:[^'\\]|\\.|'')*'|"(?:[^"\\]|\\.|"")*")
+    |(?P<ident>`(?:[^`]|``)*`)
+    |(?P<hex>[xX]'[0-9a-fA-F]*'|0x[0-9a-fA-F]+)
+    |(?P<bits>[bB]'[01]*'|0b[01]+)
+    |(?P<number>(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][-+]?\d+)?(?![\w$]))
+    |(?P<word>\d*[A-Za-z_$][\w$]*)
+    |(?P<op><=>|<=|>=|<>|!=|\|\||&&|<<|>>|\S)
+    )""",
+    re.VERBOSE | re.DOTALL,
+)
+_ESCAPE_RE = re.compile(r"\\(.)|''|\"\"", re.DOTALL)
+_ESCAPES = {"0": "\0", "b": "\b", "n": "\n", "r": "\r", "t": "\t", "Z": "\x1a", "%": "\\%", "_": "\\_"}
+_REFERENCE_ACTIONS = ("CASCADE", "RESTRICT", "SET NULL", "SET DEFAULT", "NO ACTION")
+# Words starting another statement, found after the table options when statements run together without a ';'
+_STATEMENT_WORDS = ("CREATE", "ALTER", "DROP", "INSERT", "REPLACE", "LOCK", "UNLOCK", "SET", "USE")
+
+
+class Token(NamedTuple):
+    kind: str       # "string", "ident", "hex", "bits", "number", "word" or "op"
+    text: str       # The source text
+    start: int
+    end: int
+
+    @property
+    def upper(self) -> str:
+        return self.text.upper() if self.kind == "word" else ""
+
+    @property
+    def name(self) -> str:
+        """
+        The token as an identifier, without backticks.
+        """
+        return self.text[1:-1].replace("``", "`") if self.kind == "ident" else self.text
+
+
+@dataclass
+class DataType:
+    name: str                                       # Lower-cased MySQL type, e.g. "varchar", "double precision"
+    args: list[str] = field(default_factory=list)   # e.g. ["10", "2"], or the decoded values of an ENUM / SET
+    unsigned: bool = False
+
+
+@dataclass
+class ColumnDef:
+    name: str
+    type: DataType
+    nullable: Optional[bool] = None     # None when neither NULL nor NOT NULL is given
+    default: Optional[str] = None       # Rendered expression, string literals in standard SQL quoting
+    auto_increment: bool = False
+    on_update: Optional[str] = None
+    primary_key: bool = False
+    unique: bool = False
+    comment: Optional[str] = None
+    charset: Optional[str] = None
+    collation: Optional[str] = None
+    generated: Optional[str] = None     # Expression of a generated column
+    checks: list[str] = field(default_factory=list)
+    extras: list[str] = field(default_factory=list)  # Attributes the parser doesn't know, kept verbatim
+
+
+@dataclass
+class KeyPart:
+    column: Optional[str] = None        # None for a functional key part
+    length: Optional[int] = None        # Prefix length, e.g. bio(255)
+    order: Optional[str] = None         # "ASC" or "DESC"
+    expression: Optional[str] = None    # Functional key parts only
+
+
+@dataclass
+class IndexDef:
+    kind: str                           # "primary", "unique", "index", "fulltext" or "spatial"
+    name: Optional[str] = None
+    parts: list[KeyPart] = field(default_factory=list)
+
+    @property
+    def columns(self) -> list[str]:
+        return [part.column for part in self.parts]
+
+    @property
+    def functional(self) -> bool:
+        return any(part.column is None for part in self.parts)
+
+
+@dataclass
+class ForeignKeyDef:
+    name: Optional[str] = None
+    columns: list[str] = field(default_factory=list)
+    ref_table: str = ""
+    ref_columns: list[str] = field(default_factory=list)
+    actions: list[tuple[str, str]] = field(default_factory=list)  # e.g. [("DELETE", "CASCADE")], in source order
+
+
+@dataclass
+class CheckDef:
+    name: Optional[str] = None
+    expression: str = ""
+    enforced: bool = True
+
+
+Constraint = Union[IndexDef, ForeignKeyDef, CheckDef]
+
+
+@dataclass
+class CreateTable:
+    name: str
+    columns: list[ColumnDef] = field(default_factory=list)
+    constraints: list[Constraint] = field(default_factory=list)  # In source order
+    options: dict[str, str] = field(default_factory=dict)         # e.g. {"ENGINE": "InnoDB"}
+
+    def column(self, name: str) -> Optional[ColumnDef]:
+        return next((column for column in self.columns if column.name == name), None)
+
+
+def tokenize(sql: str) -> list[Token]:
+    """
+    Splits MySQL DDL into tokens in a single pass, dropping whitespace and comments.
+
+    Args:
+        sql (str): The SQL text.
+
+    Returns:
+        list[Token]: The tokens, with their positions in the text.
+    """
+    new = tuple.__new__  # Skips the NamedTuple constructor, which dominates on large statements
+    tokens = []
+    for match in _TOKEN_RE.finditer(sql):
+        kind = match.lastgroup
+        if kind != "comment":
+            start, end = match.span(kind)
+            tokens.append(new(Token, (kind, sql[start:end], start, end)))
+    return tokens
+
+
+def parse_create_table(sql: str) -> CreateTable:
+    """
+    Parses a MySQL CREATE TABLE statement (as written by SHOW CREATE TABLE or mysqldump, with or without backticks)
+    into a CreateTable.
+
+    Args:
+        sql (str): The CREATE TABLE statement.
+
+    Returns:
+        CreateTable: The parsed table.
+
+    Raises:
+        ValueError: If the statement isn't a CREATE TABLE or one of its definitions can't be parsed.
+    """
+    return _Parser(sql).create_table()
+
+
+def unquote_string(text: str) -> str:
+    """
+    Decodes a MySQL string literal, e.g. 'it''s' or 'it\\'s', to its value.
+    """
+    def replace(match: re.Match) -> str:
+        if match.group(1) is None:
+            return match.group()[0]
+        return _ESCAPES.get(match.group(1), match.group(1))
+    return _ESCAPE_RE.sub(replace, text[1:-1])
+
+
+def quote_string(value: str) -> str:
+    """
+    Quotes a value as a standard SQL string literal, which is what PostgreSQL expects.
+    """
+    return "'" + value.replace("'", "''") + "'"
+
+
+def render_tokens(tokens: list[Token], sql: str) -> str:
+    """
+    Renders a run of tokens back to SQL for PostgreSQL: identifiers lose their backticks, string literals are
+    re-quoted and charset introducers (_utf8mb4'...') are dropped. Any gap between tokens becomes a single space.
+    """
+    out = []
+    previous = None
+    for i, token in enumerate(tokens):
+        if token.kind == "word" and token.text.startswith("_") and i + 1 < len(tokens) and tokens[i + 1].kind == "string" \
+                and tokens[i + 1].start == token.end:
+            continue
+        if previous is not None and previous.end != token.start:
+            out.append(" ")
+        if token.kind == "string":
+            out.append(quote_string(unquote_string(token.text)))
+        elif token.kind == "hex":
+            digits = token.text[2:-1] if token.text[1] == "'" else token.text[2:]
+            out.append(quote_string("\\x" + digits.lower()))
+        else:
+            out.append(token.name)
+        previous = token
+    return "".join(out)
+
+
+class _Parser:
+    """
+    Recursive descent over the token list of one CREATE TABLE statement.
+    The table body is split into its top-level definitions first, and each definition is parsed on its own.
+    """
+
+    def __init__(self, sql: str):
+        self.sql = sql
+        self.tokens = tokenize(sql)
+        self.pos = 0
+        self.end = len(self.tokens)
+        # Position of the closing parenthesis for every opening one, so groups are skipped without rescanning them
+        self.closing = {}
+        stack = []
+        for i, token in enumerate(self.tokens):
+            if token.kind == "op" and token.text == "(":
+                stack.append(i)
+            elif token.kind == "op" and token.text == ")" and stack:
+                self.closing[stack.pop()] = i
+
+    # ----- Token helpers -----
+
+    def peek(self, offset: int = 0) -> Optional[Token]:
+        index = self.pos + offset
+        return self.tokens[index] if index < self.end else None
+
+    def peek_word(self, offset: int = 0) -> str:
+        token = self.peek(offset)
+        return token.upper if token else ""
+
+    def is_op(self, text: str, offset: int = 0) -> bool:
+        token = self.peek(offset)
+        return token is not None and token.kind == "op" and token.text == text
+
+    def next(self) -> Token:
+        token = self.peek()
+        if token is None:
+            raise ValueError(f"Unexpected end of definition in: {self.sql.strip()[:200]}")
+        self.pos += 1
+        return token
+
+    def accept(self, *words: str) -> bool:
+        """
+        Consumes a sequence of keywords if the next tokens match it.
+        """
+        if all(self.peek_word(i) == word for i, word in enumerate(words)):
+            self.pos += len(words)
+            return True
+        return False
+
+    def expect(self, *words: str):
+        if not self.accept(*words):
+            raise ValueError(f"Expected {' '.join(words)} near '{self.near()}'")
+
+    def near(self) -> str:
+        token = self.peek()
+        return self.sql[token.start:token.start + 40] if token else "end of statement"
+
+    def group_range(self) -> tuple[int, int]:
+        """
+        Consumes a parenthesized group and returns the token range inside it.
+        """
+        if not self.is_op("(") or self.closing.get(self.pos, self.end) >= self.end:
+            raise ValueError(f"Expected a parenthesized group near '{self.near()}'")
+        start, close = self.pos + 1, self.closing[self.pos]
+        self.pos = close + 1
+        return start, close
+
+    def group(self) -> str:
+        """
+        Consumes a parenthesized group and returns its contents rendered for PostgreSQL.
+        """
+        return self.render(*self.group_range())
+
+    def items(self, start: int, end: int) -> list["_Parser"]:
+        """
+        Splits a token range on its top-level commas, returning a parser over each part.
+        """
+        parsers = []
+        item_start = i = start
+        while i < end:
+            token = self.tokens[i]
+            if token.kind == "op" and token.text == "(" and i in self.closing:
+                i = self.closing[i]
+            elif token.kind == "op" and token.text == ",":
+                parsers.append(self.sub_parser(item_start, i))
+                item_start = i + 1
+            i += 1
+        if item_start < end:
+            parsers.append(self.sub_parser(item_start, end))
+        return parsers
+
+    def sub_parser(self, start: int, end: int) -> "_Parser":
+        parser = _Parser.__new__(_Parser)
+        parser.sql, parser.tokens, parser.closing = self.sql, self.tokens, self.closing
+        parser.pos, parser.end = start, end
+        return parser
+
+    def identifier(self) -> str:
+        token = self.next()
+        if token.kind not in ("word", "ident"):
+            raise ValueError(f"Expected an identifier near '{self.sql[token.start:token.start + 40]}'")
+        # Qualified names (db.table) keep only the last part
+        while self.is_op(".") and self.peek(1) is not None and self.peek(1).kind in ("word", "ident"):
+            self.pos += 1
+            token = self.next()
+        return token.name
+
+    def render(self, start: int, end: int) -> str:
+        return render_tokens(self.tokens[start:end], self.sql)
+
+    # ----- Grammar -----
+
+    def create_table(self) -> CreateTable:
+        if not self.accept("CREATE"):
+            raise ValueError("Invalid CREATE TABLE syntax.")
+        self.accept("TEMPORARY")
+        if not self.accept("TABLE"):
+            raise ValueError("Invalid CREATE TABLE syntax.")
+        self.accept("IF", "NOT", "EXISTS")
+        table = CreateTable(self.identifier())
+        if not self.is_op("("):
+            raise ValueError("Invalid CREATE TABLE syntax.")
+
+        for parser in self.items(*self.group_range()):
+            definition = parser.definition()
+            if isinstance(definition, ColumnDef):
+                table.columns.append(definition)
+            elif definition is not None:
+                table.constraints.append(definition)
+        table.options = self.table_options()
+        return table
+
+    def definition(self) -> Union[ColumnDef, Constraint, None]:
+        first = self.peek()
+        if first is None:
+            return None
+        word = first.upper  # Empty for a backticked name, which is always a column
+        if word == "CONSTRAINT":
+            self.pos += 1
+            name = None
+            if self.peek_word() not in ("PRIMARY", "UNIQUE", "FOREIGN", "CHECK"):
+                name = self.identifier()
+            return self.constraint(name)
+        if word in ("PRIMARY", "UNIQUE", "FOREIGN", "CHECK", "KEY", "INDEX", "FULLTEXT", "SPATIAL"):
+            return self.constraint(None)
+        return self.column()
+
+    def constraint(self, name: Optional[str]) -> Constraint:
+        word = self.next().upper
+        if word == "PRIMARY":
+            self.expect("KEY")
+            self.index_type()
+            return IndexDef("primary", name, self.key_parts())
+        if word == "FOREIGN":
+            self.expect("KEY")
+            if not self.is_op("("):
+                self.identifier()  # MySQL's name for the supporting index
+            foreign_key = ForeignKeyDef(name, [part.column for part in self.key_parts()])
+            self.references(foreign_key)
+            return foreign_key
+        if word == "CHECK":
+            check = CheckDef(name, self.group())
+            if self.accept("NOT", "ENFORCED"):
+                check.enforced = False
+            self.accept("ENFORCED")
+            return check
+
+        kind = {"UNIQUE": "unique", "FULLTEXT": "fulltext", "SPATIAL": "spatial"}.get(word, "index")
+        if word not in ("KEY", "INDEX") and not self.accept("KEY"):
+            self.accept("INDEX")
+        index_name = None
+        if not self.is_op("(") and self.peek_word() != "USING":
+            index_name = self.identifier()
+        self.index_type()
+        # Index options (USING, COMMENT, VISIBLE, ...) after the key parts don't matter for the translation
+        return IndexDef(kind, index_name or name, self.key_parts())
+
+    def index_type(self):
+        if self.accept("USING"):
+            self.next()
+
+    def key_parts(self) -> list[KeyPart]:
+        parts = []
+        for parser in self.items(*self.group_range()):
+            if parser.is_op("("):
+                part = KeyPart(expression=parser.group())
+            else:
+                part = KeyPart(parser.identifier())
+                if parser.is_op("("):
+                    part.length = int(parser.group())
+            order = parser.peek_word()
+            if order in ("ASC", "DESC"):
+                part.order = order
+            parts.append(part)
+        return parts
+
+    def references(self, foreign_key: ForeignKeyDef):
+        self.expect("REFERENCES")
+        foreign_key.ref_table = self.identifier()
+        if self.is_op("("):
+            foreign_key.ref_columns = [part.column for part in self.key_parts()]
+        if self.accept("MATCH"):
+            self.next()
+        while self.accept("ON"):
+            event = self.next().upper
+            for action in _REFERENCE_ACTIONS:
+                if self.accept(*action.split()):
+                    foreign_key.actions.append((event, action))
+                    break
+            else:
+                raise ValueError(f"Unknown referential action near '{self.near()}'")
+
+    def column(self) -> ColumnDef:
+        column = ColumnDef(self.identifier(), self.data_type())
+        while self.peek() is not None:
+            self.column_attribute(column)
+        return column
+
+    def data_type(self) -> DataType:
+        token = self.next()
+        if token.kind != "word":
+            raise ValueError(f"Expected a data type near '{self.sql[token.start:token.start + 40]}'")
+        name = token.text.lower()
+        if name == "national":
+            name = self.next().text.lower()
+        if name == "double" and self.accept("PRECISION"):
+            name = "double precision"
+        elif name in ("char", "character") and self.accept("VARYING"):
+            name = "varchar"
+        elif name == "character":
+            name = "char"
+        elif name == "long" and self.peek_word() in ("VARCHAR", "VARBINARY"):
+            name = "mediumtext" if self.next().upper == "VARCHAR" else "mediumblob"
+
+        data_type = DataType(name)
+        if self.is_op("("):
+            args = self.items(*self.group_range())
+            if name in ("enum", "set"):
+                data_type.args = [unquote_string(arg.tokens[arg.end - 1].text) for arg in args if arg.tokens[arg.end - 1].kind == "string"]
+            else:
+                data_type.args = [arg.render(arg.pos, arg.end) for arg in args]
+        while self.peek_word() in ("UNSIGNED", "SIGNED", "ZEROFILL"):
+            data_type.unsigned = data_type.unsigned or self.next().upper == "UNSIGNED"
+        return data_type
+
+    def column_attribute(self, column: ColumnDef):
+        if self.accept("NOT", "NULL"):
+            column.nullable = False
+        elif self.accept("NULL"):
+            column.nullable = True
+        elif self.accept("DEFAULT"):
+            column.default = self.expression()
+        elif self.accept("AUTO_INCREMENT"):
+            column.auto_increment = True
+        elif self.accept("ON", "UPDATE"):
+            column.on_update = self.expression()
+        elif self.accept("PRIMARY", "KEY") or self.accept("KEY"):
+            column.primary_key = True
+        elif self.accept("UNIQUE"):
+            self.accept("KEY")
+            column.unique = True
+        elif self.accept("COMMENT"):
+            column.comment = unquote_string(self.next().text)
+        elif self.accept("CHARACTER", "SET") or self.accept("CHARSET"):
+            column.charset = self.next().name
+        elif self.accept("COLLATE"):
+            column.collation = self.next().name
+        elif self.accept("GENERATED", "ALWAYS", "AS") or self.accept("AS"):
+            column.generated = self.group()
+        elif self.accept("CONSTRAINT"):
+            if self.peek_word() != "CHECK":
+                self.identifier()
+        elif self.accept("CHECK"):
+            expression = self.group()
+            enforced = not self.accept("NOT", "ENFORCED")
+            self.accept("ENFORCED")
+            if enforced:
+                column.checks.append(expression)
+        elif self.peek_word() == "REFERENCES":
+            # MySQL parses but ignores inline references
+            self.references(ForeignKeyDef())
+        elif self.accept("SERIAL", "DEFAULT", "VALUE"):
+            column.auto_increment = True
+        elif self.peek_word() in ("VIRTUAL", "STORED", "VISIBLE", "INVISIBLE", "BINARY"):
+            self.next()
+        elif self.peek_word() in ("COLUMN_FORMAT", "STORAGE", "SRID", "ENGINE_ATTRIBUTE", "SECONDARY_ENGINE_ATTRIBUTE"):
+            self.next()
+            if self.is_op("="):
+                self.next()
+            self.next()
+        else:
+            self.next()
+            column.extras.append(self.render(self.pos - 1, self.pos))
+
+    def expression(self) -> str:
+        """
+        Consumes a DEFAULT / ON UPDATE value: a literal, a parenthesized expression or a function such as CURRENT_TIMESTAMP(6).
+        """
+        if self.is_op("("):
+            return "(" + self.group() + ")"
+        start = self.pos
+        token = self.next()
+        if token.kind == "op" and token.text in ("-", "+"):
+            self.next()
+        elif token.kind == "word" and token.text.startswith("_") and self.peek() is not None and self.peek().kind == "string":
+            self.next()
+        elif token.kind == "word" and self.is_op("("):
+            self.group_range()
+        return self.render(start, self.pos)
+
+    def table_options(self) -> dict[str, str]:
+        options = {}
+        while self.peek() is not None and not self.is_op(";"):
+            if self.peek_word() == "PARTITION":
+                options["PARTITION"] = self.sql[self.peek().start:].strip().rstrip(";")
+                break
+            if self.accept("DEFAULT"):
+                continue
+            if self.is_op(","):
+                self.next()
+                continue
+            token = self.peek()
+            if token.kind != "word" or token.upper in _STATEMENT_WORDS:
+                raise ValueError(f"Unexpected text after the table definition near '{self.near()}', is a ';' missing?")
+            key = self.next().upper
+            if key == "CHARACTER" and self.accept("SET"):
+                key = "CHARSET"
+            if self.is_op("="):
+                self.next()
+            if self.peek() is None:
+                break
+            if self.is_op("("):
+                # A list, e.g. UNION=(t1,t2) of a MERGE table
+                options[key] = self.group()
+                continue
+            value = self.next()
+            options[key] = unquote_string(value.text) if value.kind == "string" else value.name
+        return options
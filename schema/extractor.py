@@ -1,37 +1,84 @@
+import hashlib
 import mysql.connector
 import re
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
-from config.config import DatabaseConfig
+from config.config import DatabaseConfig, MIGRATION
+from utils.logger import log
+from .catalog import get_mysql_catalog, render_create_table
 
-def get_mysql_tables(config: DatabaseConfig) -> list[str]:
+def get_mysql_tables(config: DatabaseConfig, method: str = None, workers: int = None, names: list[str] = None) -> dict[str, str]:
     """
     Get all tables from a MySQL database.
-    This function connects to a MySQL database using the provided configuration and retrieves a list of all tables in the database,
-    in the form of a list of strings representing their respective creation SQL statements.
+    This function connects to a MySQL database using the provided configuration and retrieves all tables in the database,
+    each represented by its creation SQL statement.
+    The "catalog" method reads the whole schema from information_schema in a few set-based queries and renders the
+    statements itself, "show_create" runs SHOW CREATE TABLE for every table, spread over parallel connections.
+    Partitioned tables, and the whole schema if the catalog can't be read, always go through SHOW CREATE TABLE.
 
     Args:
         config (DatabaseConfig): Config object for the database connection.
+        method (str): "catalog" or "show_create". Defaults to the migration config.
+        workers (int): Connections used for SHOW CREATE TABLE. Defaults to the migration config.
+        names (list[str]): Only extract these tables. Defaults to all of them.
 
     Returns:
-        list[str]: The list of tables in the database, each represented by its creation SQL statement.
+        dict[str, str]: Mapping of table names to their creation SQL statements.
     """
-    # Connect to MySQL database and setup cursor:
-    conn = mysql.connector.connect(**config.unpack_mysql())
-    cursor = conn.cursor()
+    method = method or MIGRATION.extract_method
+    if method not in ("catalog", "show_create"):
+        raise ValueError(f"Unknown extract method '{method}', expected 'catalog' or 'show_create'")
+    if method == "show_create":
+        return _show_create_tables(config, names, workers)
+
+    try:
+        catalog = get_mysql_catalog(config, names)
+    except mysql.connector.Error as e:
+        log(f"Could not read the schema from information_schema, falling back to SHOW CREATE TABLE: {e}", level="warn")
+        return _show_create_tables(config, names, workers)
+
+    tables = {name: render_create_table(table) for name, table in catalog.items() if not table.partitioned}
+    partitioned = [name for name, table in catalog.items() if table.partitioned]
+    if partitioned:
+        tables.update(_show_create_tables(config, partitioned, workers))
+    return {name: tables[name] for name in catalog}
+
 
-    # Get the list of tables in the database:
-    cursor.execute("SHOW TABLES;")
-    table_names = [row[0] for row in cursor.fetchall()]
+def _show_create_tables(config: DatabaseConfig, names: list[str] = None, workers: int = None) -> dict[str, str]:
+    """
+    Runs SHOW CREATE TABLE for the given tables (all tables by default), with the tables dealt round-robin over
+    several connections.
+    """
+    workers = workers or MIGRATION.extract_workers
+    if names is None:
+        conn = mysql.connector.connect(**config.unpack_mysql())
+        cursor = conn.cursor()
+        cursor.execute("SHOW TABLES;")
+        names = [row[0] for row in cursor.fetchall()]
+        cursor.close()
+        conn.close()
+
+    def show_create(batch: list[str]) -> dict[str, str]:
+        conn = mysql.connector.connect(**config.unpack_mysql())
+        cursor = conn.cursor()
+        tables = {}
+        for name in batch:
+            cursor.execute(f"SHOW CREATE TABLE `{name}`;")
+            create_statement = cursor.fetchone()[1]
+            tables[name] = create_statement.replace("`", "")  # Remove backticks for compatibility
+        cursor.close()
+        conn.close()
+        return tables
+
+    if not names:
+        return {}
+    workers = max(min(workers, len(names)), 1)
     tables = {}
-    for name in table_names:
-        cursor.execute(f"SHOW CREATE TABLE `{name}`;")
-        create_statement = cursor.fetchone()[1]
-        tables[name] = create_statement.replace("`", "")  # Remove backticks for compatibility
-    # Close the cursor and connection:
-    # [print(f"===[ {x} ]===\n{tables[x]}\n===[ ------- ]===") for x in tables.keys()]
-    cursor.close()
-    conn.close()
-    return tables
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract") as pool:
+        for result in pool.map(show_create, [names[i::workers] for i in range(workers)]):
+            tables.update(result)
+    return {name: tables[name] for name in names}
 
 
 def _get_mysql_tables_raw(sql: str) -> dict[str, str]:
@@ -59,3 +106,82 @@ def _get_mysql_tables_raw(sql: str) -> dict[str, str]:
 
     return tables
 
+
+def get_mysql_table_sizes(config: DatabaseConfig) -> dict[str, tuple[int, int]]:
+    """
+    Gets the estimated size of every table in a MySQL database from information_schema.TABLES.
+    The row counts are InnoDB estimates, good enough for scheduling but not for verification.
+
+    Args:
+        config (DatabaseConfig): Config object for the database connection.
+
+    Returns:
+        dict[str, tuple[int, int]]: Mapping of table names to (estimated rows, data length in bytes).
+    """
+    conn = mysql.connector.connect(**config.unpack_mysql())
+    cursor = conn.cursor()
+    cursor.execute(
+        "SELECT TABLE_NAME, TABLE_ROWS, DATA_LENGTH FROM information_schema.TABLES "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'"
+    )
+    sizes = {name: (int(rows or 0), int(data_length or 0)) for name, rows, data_length in cursor.fetchall()}
+    cursor.close()
+    conn.close()
+    return sizes
+
+
+# One row per table and kind of definition, hashing everything a CREATE TABLE statement is rendered from
+_FINGERPRINT_QUERY = """
+SELECT TABLE_NAME, 'table', MD5(CONCAT_WS('|', CREATE_TIME, ENGINE, TABLE_COLLATION, CREATE_OPTIONS, TABLE_COMMENT))
+FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_TYPE = 'BASE TABLE'
+UNION ALL
+SELECT TABLE_NAME, 'columns', MD5(GROUP_CONCAT(CONCAT_WS('|', COLUMN_NAME, COLUMN_TYPE, IS_NULLABLE, IFNULL(COLUMN_DEFAULT, '<null>'),
+    EXTRA, GENERATION_EXPRESSION, COLLATION_NAME, COLUMN_COMMENT) ORDER BY ORDINAL_POSITION SEPARATOR '\n'))
+FROM information_schema.COLUMNS WHERE TABLE_SCHEMA = DATABASE() GROUP BY TABLE_NAME
+UNION ALL
+SELECT TABLE_NAME, 'indexes', MD5(GROUP_CONCAT(CONCAT_WS('|', INDEX_NAME, NON_UNIQUE, INDEX_TYPE, COLUMN_NAME, SUB_PART, COLLATION, EXPRESSION)
+    ORDER BY INDEX_NAME, SEQ_IN_INDEX SEPARATOR '\n'))
+FROM information_schema.STATISTICS WHERE TABLE_SCHEMA = DATABASE() GROUP BY TABLE_NAME
+UNION ALL
+SELECT k.TABLE_NAME, 'foreign_keys', MD5(GROUP_CONCAT(CONCAT_WS('|', k.CONSTRAINT_NAME, k.COLUMN_NAME, k.REFERENCED_TABLE_NAME,
+    k.REFERENCED_COLUMN_NAME, r.UPDATE_RULE, r.DELETE_RULE) ORDER BY k.CONSTRAINT_NAME, k.ORDINAL_POSITION SEPARATOR '\n'))
+FROM information_schema.KEY_COLUMN_USAGE k JOIN information_schema.REFERENTIAL_CONSTRAINTS r
+ON r.CONSTRAINT_SCHEMA = k.CONSTRAINT_SCHEMA AND r.CONSTRAINT_NAME = k.CONSTRAINT_NAME AND r.TABLE_NAME = k.TABLE_NAME
+WHERE k.TABLE_SCHEMA = DATABASE() GROUP BY k.TABLE_NAME
+UNION ALL
+SELECT t.TABLE_NAME, 'checks', MD5(GROUP_CONCAT(CONCAT_WS('|', c.CONSTRAINT_NAME, c.CHECK_CLAUSE, t.ENFORCED)
+    ORDER BY c.CONSTRAINT_NAME SEPARATOR '\n'))
+FROM information_schema.TABLE_CONSTRAINTS t JOIN information_schema.CHECK_CONSTRAINTS c
+ON c.CONSTRAINT_SCHEMA = t.CONSTRAINT_SCHEMA AND c.CONSTRAINT_NAME = t.CONSTRAINT_NAME
+WHERE t.TABLE_SCHEMA = DATABASE() AND t.CONSTRAINT_TYPE = 'CHECK' GROUP BY t.TABLE_NAME
+"""
+
+
+def get_mysql_table_fingerprints(config: DatabaseConfig) -> dict[str, str]:
+    """
+    Fingerprints the definition of every table in a MySQL database, in a single information_schema round trip.
+    The fingerprint covers CREATE_TIME (bumped when a table is rebuilt) and hashes of its columns, indexes, foreign
+    keys and checks, so it also changes on ALTERs done in place. UPDATE_TIME is left out on purpose: it moves with
+    every write, and a data change shouldn't invalidate the schema.
+
+    Args:
+        config (DatabaseConfig): Config object for the database connection.
+
+    Returns:
+        dict[str, str]: Mapping of table names to a fingerprint of their definition.
+    """
+    conn = mysql.connector.connect(**config.unpack_mysql())
+    cursor = conn.cursor()
+    # The default of 1024 bytes would cut the concatenations of wide tables short
+    cursor.execute("SET SESSION group_concat_max_len = 16777216")
+    cursor.execute(_FINGERPRINT_QUERY)
+    parts = defaultdict(list)
+    for table, kind, digest in cursor.fetchall():
+        parts[table].append(f"{kind}:{digest}")
+    cursor.close()
+    conn.close()
+    return {
+        table: hashlib.sha256("\n".join(sorted(parts[table])).encode()).hexdigest()
+        for table in sorted(parts)
+        if any(part.startswith("table:") for part in parts[table])
+    }
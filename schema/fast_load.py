@@ -0,0 +1,147 @@
+import re
+from concurrent.futures import ThreadPoolExecutor
+
+from config.config import DatabaseConfig, MIGRATION
+from utils.logger import log
+from utils.metrics import METRICS
+
+_CREATE_TABLE_RE = re.compile(r"^\s*CREATE\s+TABLE\b", re.IGNORECASE)
+
+
+def make_unlogged(schema_def: dict[str, str]) -> dict[str, str]:
+    """
+    Turns CREATE TABLE statements into CREATE UNLOGGED TABLE, for fast load mode. Unlogged tables skip the WAL, so
+    loading and indexing them writes every byte once instead of twice. restore_durability makes them logged again.
+
+    Args:
+        schema_def (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+
+    Returns:
+        dict[str, str]: The same statements creating unlogged tables.
+    """
+    return {table: _CREATE_TABLE_RE.sub("CREATE UNLOGGED TABLE", pg_sql, count=1) for table, pg_sql in schema_def.items()}
+
+
+def apply_session_settings(cur):
+    """
+    Applies the load settings of the migration config to a Postgres session: no waiting for the WAL flush on commit
+    in fast load mode, and more memory for index builds if maintenance_work_mem is set. Only lasts for the session.
+    """
+    if MIGRATION.fast_load:
+        # A crash can lose the last few commits, and the journal entries committed with them. Unlogged tables lose
+        # every row instead, see find_emptied_tables
+        cur.execute("SET synchronous_commit = off")
+    if MIGRATION.maintenance_work_mem:
+        cur.execute("SELECT set_config('maintenance_work_mem', %s, false)", (MIGRATION.maintenance_work_mem,))
+
+
+def _run_on_tables(tables: list[str], config: DatabaseConfig, statement: str, done, workers: int, action: str) -> list[str]:
+    """
+    Runs a statement on every table across a worker pool, each on its own connection, calling done(table, cur) in
+    the same transaction when it succeeds.
+
+    Returns:
+        list[str]: The tables it failed on.
+    """
+    import psycopg2
+
+    def run(table: str) -> bool:
+        conn = psycopg2.connect(**config.unpack_postgres())
+        cur = conn.cursor()
+        try:
+            apply_session_settings(cur)
+            with METRICS.phase(table, "index", database="postgres"):
+                cur.execute(statement.format(table=table))
+                if done:
+                    done(table, cur)
+                conn.commit()
+            return True
+        except psycopg2.Error as e:
+            conn.rollback()
+            log(f"[{table}] Failed to {action}: {e}", level="error")
+            return False
+        finally:
+            cur.close()
+            conn.close()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="fast-load") as pool:
+        return [table for table, ok in zip(tables, pool.map(run, tables)) if not ok]
+
+
+def restore_durability(tables: list[str], config: DatabaseConfig, journal=None, workers: int = None) -> list[str]:
+    """
+    Makes the tables of a fast load logged again, concurrently. SET LOGGED writes each table and its indexes to the
+    WAL once, which is still far less than logging every row and index entry as it was loaded. Must run before
+    foreign keys are added: a logged table can't reference an unlogged one.
+    With a journal, every table is recorded as logged in the same transaction, so a resumed run only finishes the rest.
+
+    Args:
+        tables (list[str]): The tables created unlogged.
+        config (DatabaseConfig): Target PostgreSQL connection details.
+        journal (MigrationJournal): Optional progress journal.
+        workers (int): Tables rewritten at once. Defaults to the migration config's index_workers.
+
+    Returns:
+        list[str]: The tables still unlogged.
+    """
+    workers = workers or MIGRATION.index_workers
+    if journal and journal.is_done("phase:logged"):
+        return []
+    pending = [table for table in tables if not (journal and journal.is_done(f"logged:{table}"))]
+    log(f"Making {len(pending)} tables logged again with {workers} workers...", level="info")
+    done = (lambda table, cur: journal.mark_done_with(cur, f"logged:{table}")) if journal else None
+    failed = _run_on_tables(pending, config, "ALTER TABLE {table} SET LOGGED", done, workers, "set logged")
+    if failed:
+        log(f"Tables still UNLOGGED, a Postgres crash would empty them: {failed}", level="error")
+    else:
+        if journal:
+            journal.mark_done("phase:logged")
+        log("✅ All tables are logged again.", level="success")
+    return failed
+
+
+def find_emptied_tables(tables: list[str], config: DatabaseConfig) -> list[str]:
+    """
+    Finds the tables of a fast load that are still unlogged and empty. A Postgres crash resets every unlogged table
+    to empty, while the journal survives it, so a resumed run has to forget what the journal says about these and
+    load them again. An unlogged table that still has rows was never reset, and holds what the journal records.
+
+    Args:
+        tables (list[str]): The tables created unlogged.
+        config (DatabaseConfig): Target PostgreSQL connection details.
+
+    Returns:
+        list[str]: The unlogged tables without any rows.
+    """
+    import psycopg2
+
+    conn = psycopg2.connect(**config.unpack_postgres())
+    cur = conn.cursor()
+    try:
+        cur.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'r' AND relpersistence = 'u' "
+            "AND relnamespace = current_schema()::regnamespace AND relname = ANY(%s)",
+            (list(tables),)
+        )
+        unlogged = [row[0] for row in cur.fetchall()]
+        emptied = []
+        for table in unlogged:
+            cur.execute(f"SELECT NOT EXISTS (SELECT 1 FROM {table})")
+            if cur.fetchone()[0]:
+                emptied.append(table)
+        return emptied
+    finally:
+        cur.close()
+        conn.close()
+
+
+def analyze_tables(tables: list[str], config: DatabaseConfig, workers: int = None) -> list[str]:
+    """
+    Gathers planner statistics for freshly loaded tables, concurrently, as autovacuum would only get to them later.
+
+    Returns:
+        list[str]: The tables it failed on.
+    """
+    workers = workers or MIGRATION.index_workers
+    log(f"Analyzing {len(tables)} tables with {workers} workers...", level="info")
+    return _run_on_tables(tables, config, "ANALYZE {table}", None, workers, "analyze")
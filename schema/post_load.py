@@ -0,0 +1,169 @@
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from config.config import DatabaseConfig, MIGRATION
+from utils.logger import log
+from utils.metrics import METRICS
+from .fast_load import apply_session_settings
+from .translator import extract_secondary_indexes, split_deferred_constraints
+
+
+@dataclass
+class PostLoadStep:
+    table: str
+    kind: str               # "primary", "unique", "index" or "foreign"
+    name: str
+    statements: list[str]   # Run in order, each committed on its own
+
+
+def _pg_name(*parts: str) -> str:
+    """
+    Builds an index / constraint name, keeping it within Postgres' 63 byte identifier limit without collisions.
+    """
+    name = "_".join(parts)
+    if len(name) <= 63:
+        return name
+    return name[:54] + "_" + hashlib.md5(name.encode()).hexdigest()[:8]
+
+
+def plan_post_load(translated: dict[str, str], mysql_tables: dict[str, str]) -> tuple[dict[str, str], list[PostLoadStep]]:
+    """
+    Moves every key and index out of the translated schema into steps to run after the data is loaded, so that
+    the bulk load doesn't pay for index maintenance and foreign key checks on every row.
+
+    Args:
+        translated (dict[str, str]): Mapping of table names to their PostgreSQL CREATE TABLE statements.
+        mysql_tables (dict[str, str]): Mapping of table names to their MySQL CREATE TABLE statements, for the keys and the secondary indexes.
+
+    Returns:
+        tuple[dict[str, str], list[PostLoadStep]]: The bare CREATE TABLE statements to create before loading,
+        and the post-load steps.
+    """
+    bare_tables = {}
+    steps = []
+    for table, pg_sql in translated.items():
+        bare_tables[table], constraints = split_deferred_constraints(pg_sql, mysql_tables.get(table, ""))
+        for constraint in constraints:
+            columns = ", ".join(constraint["columns"])
+            if constraint["type"] == "primary":
+                name = _pg_name(table, "pkey")
+                # Building the index first and attaching it only takes a brief lock, and lets other indexes build alongside
+                steps.append(PostLoadStep(table, "primary", name, [
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns})",
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} PRIMARY KEY USING INDEX {name}",
+                ]))
+            elif constraint["type"] == "unique":
+                name = _pg_name(table, *constraint["columns"], "key")
+                steps.append(PostLoadStep(table, "unique", name, [
+                    f"CREATE UNIQUE INDEX IF NOT EXISTS {name} ON {table} ({columns})",
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} UNIQUE USING INDEX {name}",
+                ]))
+            else:
+                name = constraint["name"] or _pg_name(table, *constraint["columns"], "fkey")
+                steps.append(PostLoadStep(table, "foreign", name, [
+                    f"ALTER TABLE {table} ADD CONSTRAINT {name} {constraint['definition']} NOT VALID",
+                ]))
+        for index in extract_secondary_indexes(mysql_tables.get(table, "")):
+            name = _pg_name(table, index["name"])
+            steps.append(PostLoadStep(table, "index", name, [
+                f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({', '.join(index['columns'])})",
+            ]))
+    return bare_tables, steps
+
+
+def _run_step(step: PostLoadStep, config: DatabaseConfig) -> bool:
+    """
+    Runs one post-load step on its own connection. Objects left over from an earlier run count as done.
+    Each statement is committed before the next: attaching an index as a constraint takes an exclusive lock, and a
+    transaction still holding the lock of its own index build would deadlock with the other builds on the table.
+
+    Returns:
+        bool: Whether the step succeeded.
+    """
+    import psycopg2
+
+    conn = psycopg2.connect(**config.unpack_postgres())
+    cur = conn.cursor()
+    try:
+        apply_session_settings(cur)
+        with METRICS.phase(step.table, "index", database="postgres"):
+            for statement in step.statements:
+                cur.execute(statement)
+                conn.commit()
+        log(f"[{step.table}] Built {step.kind} {step.name}.", level="info")
+        return True
+    except (psycopg2.errors.DuplicateTable, psycopg2.errors.DuplicateObject, psycopg2.errors.InvalidTableDefinition) as e:
+        conn.rollback()
+        log(f"[{step.table}] {step.kind} {step.name} already exists, skipping: {e}", level="warn")
+        return True
+    except psycopg2.errors.ObjectNotInPrerequisiteState as e:
+        conn.rollback()
+        if step.kind not in ("primary", "unique"):
+            log(f"[{step.table}] Failed to build {step.kind} {step.name}: {e}", level="error")
+            return False
+        # The index was already attached by an earlier run
+        log(f"[{step.table}] {step.kind} {step.name} already exists, skipping: {e}", level="warn")
+        return True
+    except psycopg2.Error as e:
+        conn.rollback()
+        log(f"[{step.table}] Failed to build {step.kind} {step.name}: {e}", level="error")
+        return False
+    finally:
+        cur.close()
+        conn.close()
+
+
+def build_post_load(steps: list[PostLoadStep], config: DatabaseConfig, workers: int = None, before_foreign_keys=None) -> list[PostLoadStep]:
+    """
+    Builds the deferred keys and indexes once the data is loaded.
+    Primary keys, unique constraints and secondary indexes are built concurrently across the worker pool. Foreign
+    keys are then added NOT VALID one at a time (a quick catalog change, but it locks both tables) and validated
+    concurrently, which checks existing rows without blocking reads or writes on the table.
+
+    Args:
+        steps (list[PostLoadStep]): Steps from plan_post_load.
+        config (DatabaseConfig): Target PostgreSQL connection details.
+        workers (int): Concurrent index builds / validations. Defaults to the migration config.
+        before_foreign_keys (Callable[[], Any]): Called once the keys and indexes are built, before any foreign key
+            is added, e.g. restore_durability.
+
+    Returns:
+        list[PostLoadStep]: The steps that failed.
+    """
+    workers = workers or MIGRATION.index_workers
+    index_steps = [step for step in steps if step.kind != "foreign"]
+    foreign_steps = [step for step in steps if step.kind == "foreign"]
+    failed = []
+
+    log(f"Building {len(index_steps)} keys and indexes with {workers} workers...", level="info")
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="index") as pool:
+        for step, ok in zip(index_steps, pool.map(lambda step: _run_step(step, config), index_steps)):
+            if not ok:
+                failed.append(step)
+
+    if before_foreign_keys:
+        before_foreign_keys()
+
+    log(f"Adding {len(foreign_steps)} foreign keys...", level="info")
+    added = []
+    for step in foreign_steps:
+        if _run_step(step, config):
+            added.append(step)
+        else:
+            failed.append(step)
+
+    validations = [
+        PostLoadStep(step.table, "validation", step.name, [f"ALTER TABLE {step.table} VALIDATE CONSTRAINT {step.name}"])
+        for step in added
+    ]
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="validate") as pool:
+        for step, ok in zip(validations, pool.map(lambda step: _run_step(step, config), validations)):
+            if not ok:
+                failed.append(step)
+
+    if failed:
+        log(f"{len(failed)} post-load steps failed: {[step.name for step in failed]}", level="error")
+    else:
+        log("✅ All keys, indexes and foreign keys built.", level="success")
+    return failed
@@ -0,0 +1,129 @@
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from config import config
+from utils.logger import log
+from .ddl import parse_create_table
+from .post_load import plan_post_load
+from .statements import iter_dump_statements
+from .translator import single_column_keys, translate_schema
+
+_CREATE_TABLE_RE = re.compile(r"CREATE\s+(?:TEMPORARY\s+)?TABLE\b", re.IGNORECASE)
+
+# Keys of every table being translated, set once per worker process by the pool initializer
+_known_keys: dict[str, set[str]] = {}
+
+
+def find_sql_files(paths: list[str]) -> list[tuple[str, str]]:
+    """
+    Lists the .sql files to translate: files given directly, and every .sql file under the directories given.
+
+    Args:
+        paths (list[str]): Files and directories.
+
+    Returns:
+        list[tuple[str, str]]: (path, output path relative to the output directory) pairs, sorted within each directory.
+    """
+    files = []
+    for path in paths:
+        if not os.path.isdir(path):
+            files.append((path, os.path.basename(path)))
+            continue
+        for root, dirs, names in os.walk(path):
+            dirs.sort()
+            files += [(os.path.join(root, name), os.path.relpath(os.path.join(root, name), path))
+                      for name in sorted(names) if name.lower().endswith(".sql")]
+    return files
+
+
+def read_sql_tables(path: str) -> dict[str, str]:
+    """
+    Reads the CREATE TABLE statements of a .sql file (a schema-only mysqldump, or one file per table), by table name.
+    Every other statement is ignored.
+    """
+    tables = {}
+    for statement in iter_dump_statements(path):
+        if _CREATE_TABLE_RE.match(statement):
+            tables[parse_create_table(statement).name] = statement
+    return tables
+
+
+def _file_keys(path: str) -> dict[str, set[str]]:
+    return {table: single_column_keys(mysql_sql) for table, mysql_sql in read_sql_tables(path).items()}
+
+
+def _init_worker(config_path: str, known_keys: dict[str, set[str]] = None):
+    # Spawned processes (the default on Windows and macOS) start from the default config, not the one given by --config
+    global _known_keys
+    config.set_config_path(config_path)
+    _known_keys = known_keys or {}
+
+
+def _translate_file(path: str, output: str) -> int:
+    tables = read_sql_tables(path)
+    translated = translate_schema(tables, known_keys=_known_keys)
+    bare_tables, steps = plan_post_load(translated, tables)
+    # Tables and every key as the migration creates them, foreign keys last so they can reference any file's tables
+    statements = [sql.strip() for sql in bare_tables.values()]
+    for kinds in (("primary", "unique", "index"), ("foreign",)):
+        statements += [statement.removesuffix(" NOT VALID") + ";" for step in steps if step.kind in kinds for statement in step.statements]
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    temp_path = output + ".tmp"
+    with open(temp_path, "w", encoding="utf-8", newline="\n") as f:
+        f.write("\n\n".join(statements) + "\n" if statements else "")
+    os.replace(temp_path, output)
+    return len(tables)
+
+
+def translate_sql_files(paths: list[str], output_dir: str, workers: int = None) -> dict[str, int]:
+    """
+    Translates .sql files of MySQL DDL into PostgreSQL DDL files, across a pool of processes, without a database.
+    Each input file gives an output file at the same relative path under output_dir, with its CREATE TABLE
+    statements followed by the statements creating their keys, indexes and foreign keys.
+    The files are read twice: once for the keys of every table, so a foreign key to a table of another file is
+    checked like translate_schema does for a whole schema, then to translate them.
+
+    Args:
+        paths (list[str]): .sql files, and directories to find .sql files in.
+        output_dir (str): Directory to write the translated files to.
+        workers (int): Processes to translate with. Defaults to the number of CPUs.
+
+    Returns:
+        dict[str, int]: Mapping of input files to the number of tables translated, or None if the file failed.
+    """
+    files = find_sql_files(paths)
+    workers = workers or os.cpu_count()
+    results = {}
+    known_keys = {}
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config.CONFIG_PATH,)) as pool:
+        futures = {path: pool.submit(_file_keys, path) for path, _ in files}
+        for path, future in futures.items():
+            try:
+                keys = future.result()
+            except Exception as e:
+                log(f"[{path}] Failed to read: {e}", level="error")
+                results[path] = None
+                continue
+            for table in keys.keys() & known_keys.keys():
+                log(f"[{path}] Table {table} is also defined in another file, using the last one.", level="warn")
+            known_keys.update(keys)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config.CONFIG_PATH, known_keys)) as pool:
+        futures = {
+            path: pool.submit(_translate_file, path, os.path.join(output_dir, relative))
+            for path, relative in files if path not in results
+        }
+        for path, future in futures.items():
+            try:
+                results[path] = future.result()
+            except Exception as e:
+                log(f"[{path}] Failed to translate: {e}", level="error")
+                results[path] = None
+
+    failed = [path for path, tables in results.items() if tables is None]
+    if failed:
+        log(f"Failed to translate {len(failed)} files: {failed}", level="error")
+    else:
+        log(f"✅ Translated {sum(results.values())} tables from {len(files)} files into {output_dir}.", level="success")
+    return results
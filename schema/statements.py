@@ -0,0 +1,128 @@
+import gzip
+import io
+import re
+from typing import Iterator
+
+# One token of a dump: a run of plain text and quoted strings (most of an extended INSERT in one match), a quoted
+# string / identifier, a comment, a semicolon or any other single character. Strings use the unrolled form so long
+# values are matched without per-character alternation.
+_SCAN_RE = re.compile(r"""
+    (?:[^'"`;\-\#/]+|'[^'\\]*(?:\\.[^'\\]*)*'|-(?!-)|/(?!\*))+
+  | '[^'\\]*(?:\\.[^'\\]*)*'
+  | "[^"\\]*(?:\\.[^"\\]*)*"
+  | `[^`]*`
+  | --[^\n]*\n
+  | \#[^\n]*\n
+  | /\*.*?\*/
+  | ;
+  | .
+""", re.S | re.X)
+_DELIMITER_RE = re.compile(r"\s*DELIMITER[ \t]+(\S+)[^\n]*\n", re.I)
+_CONDITIONAL_RE = re.compile(r"/\*!\d*\s?(.*)\*/", re.S)
+
+
+def _open_dump(source) -> io.TextIOBase:
+    """
+    Opens a dump file as text, gunzipping it if it is gzipped. Bytes that aren't valid UTF-8 (binary strings
+    without --hex-blob) are kept as surrogates so they can be turned back into the original bytes.
+    """
+    if hasattr(source, "read"):
+        return source
+    with open(source, "rb") as f:
+        gzipped = f.read(2) == b"\x1f\x8b"
+    if gzipped:
+        return gzip.open(source, "rt", encoding="utf-8", errors="surrogateescape")
+    return open(source, encoding="utf-8", errors="surrogateescape")
+
+
+def _incomplete(token: str, end: int, buffer: str) -> bool:
+    """
+    Whether a token might continue past the end of the buffer read so far.
+    """
+    if end == len(buffer):
+        return True
+    # The single-character fallback matched the start of a string / comment whose end isn't in the buffer yet
+    if token in "'\"`#":
+        return True
+    return token in "-/" and buffer[end] in "-*"
+
+
+def iter_dump_statements(source, chunk_size: int = 1 << 20) -> Iterator[str]:
+    """
+    Splits a mysqldump file into statements, reading it a chunk at a time. Memory use is bounded by the largest
+    statement (mysqldump caps extended INSERTs at net_buffer_length), not the size of the file.
+    Quotes, comments and DELIMITER changes are honoured. Plain comments are dropped; the contents of versioned
+    comments (/*!50100 ... */) are kept, since MySQL runs them.
+
+    Args:
+        source (str | file): Path of the dump (optionally gzipped), or a text file object.
+        chunk_size (int): Characters read at a time.
+
+    Yields:
+        str: The next statement, without its delimiter.
+    """
+    f = _open_dump(source)
+    buffer, pos, eof = "", 0, False
+    parts = []
+    started = False
+    delimiter = ";"
+    read_size = chunk_size
+    try:
+        while True:
+            token = None
+            if not started and not eof and buffer.find("\n", pos) < 0:
+                # A DELIMITER command runs to the end of its line, which hasn't been read yet
+                pass
+            elif not started and (match := _DELIMITER_RE.match(buffer, pos)):
+                delimiter = match.group(1)
+                pos = match.end()
+                continue
+            elif delimiter != ";":
+                # Stored programs (triggers, routines) are passed through whole, up to the custom delimiter
+                end = buffer.find(delimiter, pos)
+                if end >= 0:
+                    parts.append(buffer[pos:end])
+                    pos = end + len(delimiter)
+                    token = delimiter
+            else:
+                match = _SCAN_RE.match(buffer, pos)
+                token = match.group() if match else None
+                if token is not None and not eof and _incomplete(token, match.end(), buffer):
+                    token = None
+
+            if token is None:
+                if eof:
+                    break
+                # Grow the read when a single token outgrows the buffer, so long values aren't rescanned over and over
+                read_size = chunk_size if len(buffer) - pos < chunk_size else read_size * 2
+                data = f.read(read_size)
+                eof = not data
+                buffer = buffer[pos:] + data
+                pos = 0
+                continue
+
+            if delimiter == ";":
+                pos = match.end()
+            if token == delimiter:
+                statement = "".join(parts).strip()
+                parts, started = [], False
+                if statement:
+                    yield statement
+                continue
+
+            if token.startswith(("/*", "--", "#")) and len(token) > 1:
+                if token.startswith("/*!"):
+                    parts.append(" " + _CONDITIONAL_RE.match(token).group(1) + " ")
+                    started = True
+                else:
+                    parts.append(" ")
+                continue
+            parts.append(token)
+            started = started or not token.isspace()
+
+        statement = "".join(parts).strip()
+        if statement:
+            yield statement
+    finally:
+        if f is not source:
+            f.close()
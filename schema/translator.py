@@ -1,6 +1,9 @@
 import re
+from dataclasses import replace
 from typing import List
-from .type_map import TYPE_MAP, get_serial_type
+from utils.logger import log
+from .ddl import CheckDef, ColumnDef, CreateTable, ForeignKeyDef, IndexDef, parse_create_table, quote_string
+from .type_map import SIZED_TYPES, TYPE_MAP, UNSIGNED_TYPE_MAP, get_serial_type
 
 def extract_foreign_keys(pg_sql: str) -> List[dict[str, str]]:
     """
@@ -55,274 +58,374 @@ def extract_single_column_uniques_and_pks(pg_sql: str) -> List[str]:
     return unique_keys, primary_keys
 
 
-def translate_schema(tables: dict[str, str]) -> dict[str, str]:
-    initial_postgres_sql = {x: _translate_table(tables[x]) for x in tables.keys()}
-    sole_unique_and_primary_keys_columns = {} # {table_name: column_name (if individually unique or primary key)}]}
-    first_stage_processed_postgres_sql = {}
-    # Now we need to check, and remove, invalid foreign keys, the ones which do not point to a solely unique or primary key column.:
-    for table_name, pg_sql in initial_postgres_sql.items():
-        # Get individually unique and primary keys in the table
-        unique, primary = extract_single_column_uniques_and_pks(pg_sql)
-        # Update the dictionary with the unique and primary keys
-        for col in unique + primary:
-            sole_unique_and_primary_keys_columns[table_name] = col
-        print(f"Table: {table_name}.\nUnique keys: {unique}\nPrimary keys: {primary}")
-        # Get the list of foreign keys in the table:
-        foreign_keys = extract_foreign_keys(pg_sql)
-        print(f"Foreign keys: {foreign_keys}")
-        for d in foreign_keys:
-            foreign_table, foreign_cols = d['foreign_table'], d['foreign_columns']
-            for foreign_col in foreign_cols:
-                # Check if the referenced column is NOT solely unique/primary
-                if foreign_col not in sole_unique_and_primary_keys_columns.get(foreign_table, []):
-                    print(f"Foreign key {d} in table {table_name} is invalid, removing it.")
-                    # Make a basic pattern to find the reference
-                    reference_pattern = rf'REFERENCES\s+{foreign_table}\s*\(\s*{foreign_col}\s*\)'
-                    # Remove any line containing that reference
-                    pg_sql = "\n".join(
-                        line for line in pg_sql.splitlines()
-                        if not re.search(reference_pattern, line, flags=re.IGNORECASE)
-                    ).replace(",\n);", "\n);")  # Remove the comma before the closing parenthesis if it exists
-                    
-        first_stage_processed_postgres_sql[table_name] = pg_sql
-
-
-    return first_stage_processed_postgres_sql
+_CONSTRAINT_PREFIXES = ("PRIMARY KEY", "UNIQUE", "CONSTRAINT", "FOREIGN KEY", "CHECK")
+_INTEGER_PG_TYPES = ("SMALLINT", "INTEGER", "BIGINT", "SMALLSERIAL", "SERIAL", "BIGSERIAL")
 
 
-def _translate_table(mysql_sql: str) -> str:
-    mysql_sql = mysql_sql.strip().rstrip(";")
-
-    match = re.match(r"CREATE TABLE `?(\w+)`?\s*\((.*)\)\s*(.*)", mysql_sql, flags=re.DOTALL | re.IGNORECASE)
-    if not match:
-        raise ValueError("Invalid CREATE TABLE syntax.")
-
-    table_name, body, suffix = match.groups()
-    lines = _split_sql_lines(body)
-
-    pg_lines = []
-    for line in lines:
-        line = line.strip().rstrip(",")
-        if not line:
-            continue
+def extract_column_definitions(pg_sql: str) -> dict[str, str]:
+    """
+    Extracts the column definitions from a PostgreSQL CREATE TABLE statement.
 
-        if any(line.upper().startswith(x) for x in ("KEY ", "UNIQUE KEY ", "FULLTEXT KEY", "SPATIAL KEY", "PRIMARY KEY")):
-            constraint = _translate_constraint(line)
-            if constraint:
-                pg_lines.append(constraint)
-            continue
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
 
-        if _is_column_definition(line):
-            if "GENERATED ALWAYS AS" in line.upper():
-                line = _strip_generated_column(line)  # ✅ Preserve column, strip generated logic
-            pg_lines.append(_translate_column(line))
+    Returns:
+        dict[str, str]: Mapping of column names to the rest of their definition (e.g. "TEXT[] NOT NULL"), in column order.
+    """
+    match = re.search(r"\((.*)\)", pg_sql, flags=re.DOTALL)
+    if not match:
+        return {}
+    columns = {}
+    for line in _split_sql_lines(match.group(1)):
+        line = line.strip()
+        if not line or line.upper().startswith(_CONSTRAINT_PREFIXES):
             continue
+        parts = re.match(r"(\w+)\s+(\w.*)", line, flags=re.DOTALL)
+        if parts:
+            columns[parts.group(1)] = parts.group(2)
+    return columns
 
-    pg_sql = f"CREATE TABLE {table_name} (\n    " + ",\n    ".join(pg_lines) + "\n);\n"
-
-    return pg_sql
 
-
-def _strip_generated_column(line: str) -> str:
-    """
-    Removes the GENERATED ALWAYS AS (...) clause while keeping the column definition.
+def extract_column_types(pg_sql: str) -> dict[str, str]:
     """
-    # If it’s just the generated clause, preserve the column and type
-    match = re.match(
-        r"^\s*`?(?P<col>\w+)`?\s+(?P<type>\w+(?:\([^)]+\))?)\s+GENERATED\s+ALWAYS\s+AS\s*\(\(.*?\)\)\s*(STORED|VIRTUAL)?",
-        line,
-        flags=re.IGNORECASE | re.DOTALL
-    )
-    if match:
-        return f"{match.group('col')} {match.group('type')}"
-
-    # Otherwise strip normally
-    return re.sub(
-        r"GENERATED\s+ALWAYS\s+AS\s*\(\(.*?\)\)\s*(STORED|VIRTUAL)?",
-        "",
-        line,
-        flags=re.IGNORECASE | re.DOTALL
-    ).strip()
-
+    Extracts the column names and base types from a PostgreSQL CREATE TABLE statement.
 
-def _split_sql_lines(block: str) -> List[str]:
-    lines = []
-    current = ""
-    parens = 0
-    for char in block:
-        if char == "(":
-            parens += 1
-        elif char == ")":
-            parens -= 1
-        if char == "," and parens == 0:
-            lines.append(current)
-            current = ""
-        else:
-            current += char
-    if current.strip():
-        lines.append(current)
-    return lines
-
-
-def _is_column_definition(line: str) -> bool:
-    return bool(re.match(r"^\s*`?\w+`?\s+\w+", line.strip()))
-
-
-def _translate_column(line: str) -> str:
-    original = line.strip().rstrip(",")
-    if not original:
-        return ""
-
-    col_match = re.match(
-        r"^\s*`?(?P<col>\w+)`?\s+(?P<type>\w+)(?P<length>\([^)]+\))?(?P<extras>.*)$",
-        original,
-        flags=re.IGNORECASE
-    )
-
-    if not col_match:
-        return original  # fallback
-
-    col = col_match.group("col")
-    mysql_type = col_match.group("type").lower()
-    length = col_match.group("length") or ""
-    extras = col_match.group("extras") or ""
-
-    if "enum(" in original.lower():
-        return _convert_enum_full(col=original.split()[0], rest=original)
-
-    if "set(" in original.lower():
-        return _convert_set_full(col=original.split()[0], rest=original)
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
 
-    if "auto_increment" in extras.lower():
-        pg_type = get_serial_type(mysql_type)
-        if "primary key" in extras.lower():
-            extras = re.sub(r"\bPRIMARY KEY\b", "", extras, flags=re.IGNORECASE)
-            return f"{col} {pg_type} PRIMARY KEY".strip()
-        extras = re.sub(r"\bAUTO_INCREMENT\b", "", extras, flags=re.IGNORECASE)
-        return f"{col} {pg_type} {extras.strip()}"
+    Returns:
+        dict[str, str]: Mapping of column names to their upper-cased base type (e.g. "BIGINT", "VARCHAR"), in column order.
+    """
+    return {
+        column: re.match(r"\w+", definition).group().upper()
+        for column, definition in extract_column_definitions(pg_sql).items()
+    }
 
-    extras = _clean_extras(extras)
 
-    if mysql_type in ("tinyint", "smallint", "mediumint", "int", "integer", "bigint"):
-        pg_type = TYPE_MAP.get(mysql_type, "INTEGER")
-        return f"{col} {pg_type} {extras}".strip()
+def extract_primary_key_columns(pg_sql: str) -> List[str]:
+    """
+    Extracts the primary key columns of a PostgreSQL CREATE TABLE statement, whether declared as a table
+    constraint ("PRIMARY KEY (a, b)") or inline on a column ("id SERIAL PRIMARY KEY").
 
-    if mysql_type in ("decimal", "numeric"):
-        pg_type = "NUMERIC" + length
-        return f"{col} {pg_type} {extras}".strip()
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
 
-    if mysql_type in ("float", "double", "double precision"):
-        pg_type = TYPE_MAP.get(mysql_type, "DOUBLE PRECISION")
-        return f"{col} {pg_type} {extras}".strip()
+    Returns:
+        List[str]: The primary key columns, empty if the table has no primary key.
+    """
+    match = re.search(r'^\s*(?:CONSTRAINT\s+\w+\s+)?PRIMARY KEY\s*\(([^)]+)\)', pg_sql, re.MULTILINE)
+    if match:
+        return [col.strip() for col in match.group(1).split(',')]
+    columns = extract_column_types(pg_sql)
+    inline = re.findall(r"^\s*(\w+)\s+\w+[^,\n]*\bPRIMARY KEY\b", pg_sql, flags=re.MULTILINE | re.IGNORECASE)
+    return [col for col in inline if col in columns]
 
-    if mysql_type == "bit":
-        pg_type = "BIT" + length if length else "BIT"
-        return f"{col} {pg_type} {extras}".strip()
 
-    if mysql_type in ("char", "varchar"):
-        pg_type = mysql_type.upper() + length
-        return f"{col} {pg_type} {extras}".strip()
+def get_integer_primary_key(pg_sql: str) -> str | None:
+    """
+    Gets the primary key column of a table if it is a single integer column, which makes it usable for range chunking.
 
-    if mysql_type in ("text", "tinytext", "mediumtext", "longtext"):
-        return f"{col} TEXT {extras}".strip()
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
 
-    if mysql_type in ("binary", "varbinary", "blob", "tinyblob", "mediumblob", "longblob"):
-        return f"{col} BYTEA {extras}".strip()
+    Returns:
+        str | None: The primary key column, or None if the table has no single-column integer primary key.
+    """
+    primary = extract_primary_key_columns(pg_sql)
+    if len(primary) == 1 and extract_column_types(pg_sql).get(primary[0]) in _INTEGER_PG_TYPES:
+        return primary[0]
+    return None
 
-    if mysql_type == "json":
-        return f"{col} JSONB {extras}".strip()
 
-    if mysql_type in ("date", "time", "datetime", "timestamp", "year"):
-        pg_type = TYPE_MAP.get(mysql_type, "TIMESTAMP WITHOUT TIME ZONE")
-        return f"{col} {pg_type} {extras}".strip()
+def extract_secondary_indexes(mysql_sql: str) -> List[dict]:
+    """
+    Extracts the plain (non-unique) KEY / INDEX definitions of a MySQL CREATE TABLE statement.
+    The table translation drops these, so they have to be created separately after the table.
+    Functional index parts (e.g. "((lower(name)))") are not supported and the index is skipped.
 
-    if mysql_type in (
-        "geometry", "point", "linestring", "polygon",
-        "multipoint", "multilinestring", "multipolygon", "geometrycollection"
-    ):
-        return f"{col} BYTEA {extras}".strip()
+    Args:
+        mysql_sql (str): The MySQL CREATE TABLE statement.
 
-    return f"{col} TEXT {extras}".strip()
+    Returns:
+        List[dict]: One dict per index, with its MySQL name and columns (prefix lengths removed, ASC/DESC kept).
+    """
+    try:
+        table = parse_create_table(mysql_sql.strip().rstrip(";"))
+    except ValueError:
+        return []
+    indexes = []
+    for index in table.constraints:
+        if getattr(index, "kind", None) != "index" or index.functional:
+            continue
+        columns = [f"{part.column} {part.order}" if part.order else part.column for part in index.parts]
+        indexes.append({"name": index.name or "_".join(index.columns), "columns": columns})
+    return indexes
 
 
-def _clean_extras(extras: str) -> str:
-    extras = extras.strip()
-    extras = re.sub(r"CHARACTER SET\s+\w+", '', extras, flags=re.IGNORECASE)
-    extras = re.sub(r"COLLATE\s+\w+", '', extras, flags=re.IGNORECASE)
-    extras = re.sub(r"ON UPDATE CURRENT_TIMESTAMP", '', extras, flags=re.IGNORECASE)
-    extras = re.sub(r"_utf8mb4'([^']*)'", r"'\1'", extras, flags=re.IGNORECASE)
-    extras = extras.replace("\n", " ")
-    extras = re.sub(r"\s{2,}", ' ', extras)
-    return extras.strip()
+def split_deferred_constraints(pg_sql: str, mysql_sql: str) -> tuple[str, List[dict]]:
+    """
+    Splits a translated CREATE TABLE statement into the bare table and its key constraints, so that primary keys,
+    unique constraints and foreign keys can be built after the data is loaded. CHECK constraints stay on the table.
+    Both come from the parsed MySQL table, so a literal such as DEFAULT 'must be unique' is never taken for a key.
+    Foreign keys translate_schema dropped from pg_sql stay dropped. Without the MySQL statement, or if pg_sql wasn't
+    translated from it, the table is returned whole with no constraints to defer.
 
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
+        mysql_sql (str): The MySQL CREATE TABLE statement it was translated from.
 
-def _translate_constraint(line: str) -> str:
-    line = re.sub(r"`", "", line)
+    Returns:
+        tuple[str, List[dict]]: The CREATE TABLE statement without key constraints, and one dict per constraint with its
+        "type" ("primary", "unique" or "foreign"), "columns", constraint "name" (None if unnamed) and, for foreign
+        keys, the "definition" from FOREIGN KEY onwards.
+    """
+    try:
+        table = parse_create_table(mysql_sql.strip().rstrip(";")) if mysql_sql.strip() else None
+    except ValueError:
+        table = None
+    if table is not None:
+        lines = {line.strip().rstrip(",") for line in pg_sql.splitlines()}
+        table.constraints = [constraint for constraint in table.constraints
+                             if not isinstance(constraint, ForeignKeyDef) or _translate_constraint(constraint) in lines]
+    if table is None or _emit_table(table).strip() != pg_sql.strip():
+        log(f"Can't match the PostgreSQL table to its MySQL definition, creating it with its keys: {pg_sql.strip()[:80]}", level="warn")
+        return pg_sql, []
+
+    constraints = []
+    for column in table.columns:
+        # Generated columns are copied as plain columns, without their keys (see _translate_column)
+        if column.generated is not None:
+            continue
+        if column.primary_key:
+            constraints.append({"type": "primary", "name": None, "columns": [column.name]})
+        if column.unique:
+            constraints.append({"type": "unique", "name": None, "columns": [column.name]})
+    for constraint in table.constraints:
+        if isinstance(constraint, ForeignKeyDef):
+            constraints.append({"type": "foreign", "name": constraint.name, "columns": constraint.columns,
+                                "definition": _foreign_key_definition(constraint)})
+        elif _is_key(constraint):
+            constraints.append({"type": constraint.kind, "name": None, "columns": constraint.columns})
+    return _emit_table(table, keys=False), constraints
+
+
+def split_foreign_keys(pg_sql: str) -> tuple[str, List[str]]:
+    """
+    Splits the FOREIGN KEY constraints out of a CREATE TABLE statement, so they can be added once every table exists.
 
-    if any(x in line.upper() for x in ("FULLTEXT", "SPATIAL")):
-        return ""
+    Args:
+        pg_sql (str): The PostgreSQL CREATE TABLE statement.
 
-    # Normalize spacing and remove length from column names like bio(255)
-    def strip_lengths(columns: str) -> str:
-        return ", ".join(re.sub(r"\(\d+\)", "", col.strip()) for col in columns.split(","))
+    Returns:
+        tuple[str, List[str]]: The CREATE TABLE statement without foreign keys, and each foreign key constraint as
+        written in it (e.g. "CONSTRAINT fk_a FOREIGN KEY (a_id) REFERENCES a (id)"), ready for ALTER TABLE ... ADD.
+    """
+    match = re.match(r"(\s*CREATE\s+(?:UNLOGGED\s+)?TABLE\s+(?:IF NOT EXISTS\s+)?\w+\s*)\((.*)\)(.*)$", pg_sql, flags=re.DOTALL | re.IGNORECASE)
+    if not match:
+        return pg_sql, []
+    head, body, tail = match.groups()
+    lines, foreign_keys = [], []
+    for line in _split_sql_lines(body):
+        line = line.strip()
+        if not line:
+            continue
+        named = re.match(r"CONSTRAINT\s+\w+\s+(.*)", line, flags=re.IGNORECASE | re.DOTALL)
+        if (named.group(1) if named else line).upper().startswith("FOREIGN KEY"):
+            foreign_keys.append(line)
+        else:
+            lines.append(line)
+    if not foreign_keys:
+        return pg_sql, []
+    return f"{head}(\n    " + ",\n    ".join(lines) + f"\n){tail}", foreign_keys
 
-    # FOREIGN KEY with optional CONSTRAINT name
-    fk_match = re.match(
-        r"(CONSTRAINT\s+(\w+)\s+)?FOREIGN\s+KEY\s*\(([^)]+)\)\s+REFERENCES\s+(\w+)\s*\(([^)]+)\)",
-        line,
-        re.IGNORECASE
-    )
-    if fk_match:
-        constraint_name = fk_match.group(2)
-        cols = strip_lengths(fk_match.group(3))
-        ref_table = fk_match.group(4)
-        ref_cols = strip_lengths(fk_match.group(5))
-        if constraint_name:
-            return f"CONSTRAINT {constraint_name} FOREIGN KEY ({cols}) REFERENCES {ref_table} ({ref_cols})"
-        return f"FOREIGN KEY ({cols}) REFERENCES {ref_table} ({ref_cols})"
 
-    # UNIQUE KEY or unnamed UNIQUE constraint
-    if match := re.match(r"(UNIQUE\s+KEY\s+\w+\s*)?\((.+)\)", line, flags=re.IGNORECASE):
-        cols = strip_lengths(match.group(2))
-        return f"UNIQUE ({cols})"
+def translate_schema(tables: dict[str, str], cache=None, known_keys: dict[str, set[str]] = None) -> dict[str, str]:
+    """
+    Translates a MySQL schema to PostgreSQL, dropping foreign keys that PostgreSQL would reject.
+    Every table is parsed once, then the single-column primary / unique keys of the whole schema are indexed before
+    any foreign key is checked, so the result doesn't depend on the order the tables come in.
+    With a cache, tables whose DDL is unchanged aren't parsed at all: their cached keys go into the index, and their
+    cached translation is kept as long as the keys of every table it references are unchanged too.
 
-    if match := re.match(r"UNIQUE KEY \w+ \((.+)\)", line, re.IGNORECASE):
-        cols = strip_lengths(match.group(1))
-        return f"UNIQUE ({cols})"
+    Args:
+        tables (dict[str, str]): Mapping of table names to their MySQL CREATE TABLE statements.
+        cache (SchemaCache): Optional schema cache to reuse translations from and store new ones in.
+        known_keys (dict[str, set[str]]): Single-column keys of tables outside tables that foreign keys may
+            reference (see single_column_keys), when a schema is translated a part at a time.
 
-    # Skip KEY or INDEX — create separately after table
-    if match := re.match(r"(KEY|INDEX)\s+\w+\s*\((.+)\)", line, re.IGNORECASE):
-        return ""
+    Returns:
+        dict[str, str]: Mapping of table names to their PostgreSQL CREATE TABLE statements, in the same order.
+    """
+    cached = {}
+    if cache is not None:
+        cached = {name: entry for name, sql in tables.items() if (entry := cache.get_translation(name, sql))}
+    parsed = {name: parse_create_table(sql.strip().rstrip(";")) for name, sql in tables.items() if name not in cached}
+
+    # First pass: {table_name: columns that are individually unique or a single-column primary key}
+    key_index = dict(known_keys or {})
+    key_index.update((table.name, _single_column_keys(table)) for table in parsed.values())
+    key_index.update((name, set(entry["keys"])) for name, entry in cached.items())
+
+    # A cached translation only holds if the keys its foreign keys were checked against are the same
+    for name, entry in list(cached.items()):
+        if any(key_index.get(ref_table, set()) != set(keys) for ref_table, keys in entry["references"].items()):
+            del cached[name]
+            parsed[name] = parse_create_table(tables[name].strip().rstrip(";"))
+
+    # Second pass: a foreign key is only kept if every column it references is solely unique or primary
+    for name, table in parsed.items():
+        kept = []
+        for constraint in table.constraints:
+            if isinstance(constraint, ForeignKeyDef):
+                keys = key_index.get(constraint.ref_table, set())
+                if not all(column in keys for column in constraint.ref_columns):
+                    log(f"[{name}] Foreign key {_translate_constraint(constraint)} doesn't reference a single-column unique or primary key, removing it.", level="warn")
+                    continue
+            kept.append(constraint)
+        references = {constraint.ref_table: key_index.get(constraint.ref_table, set())
+                      for constraint in table.constraints if isinstance(constraint, ForeignKeyDef)}
+        table.constraints = kept
+        if cache is not None:
+            cache.put_translation(name, tables[name], _emit_table(table), key_index[table.name], references)
+
+    if cache is not None:
+        return {name: cache.get_translation(name, sql)["translated"] for name, sql in tables.items()}
+    return {name: _emit_table(table) for name, table in parsed.items()}
+
+
+def _single_column_keys(table: CreateTable) -> set[str]:
+    keys = {column.name for column in table.columns if column.primary_key or column.unique}
+    for constraint in table.constraints:
+        if isinstance(constraint, IndexDef) and constraint.kind in ("primary", "unique") and len(constraint.parts) == 1 \
+                and not constraint.functional:
+            keys.add(constraint.parts[0].column)
+    return keys
+
+
+def single_column_keys(mysql_sql: str) -> set[str]:
+    """
+    Returns the columns of a MySQL CREATE TABLE statement that are a primary or unique key on their own, i.e. the
+    columns translate_schema lets a foreign key reference.
+    """
+    return _single_column_keys(parse_create_table(mysql_sql.strip().rstrip(";")))
 
-    # PRIMARY KEY is valid in CREATE TABLE
-    if match := re.match(r"(PRIMARY\s+KEY)\s*\((.+)\)", line, re.IGNORECASE):
-        cols = strip_lengths(match.group(2))
-        return f"{match.group(1).upper()} ({cols})"
 
-    return line
+def _translate_table(mysql_sql: str) -> str:
+    return _emit_table(parse_create_table(mysql_sql.strip().rstrip(";")))
 
 
+def _is_key(constraint) -> bool:
+    return isinstance(constraint, IndexDef) and constraint.kind in ("primary", "unique") and not constraint.functional
 
-def _convert_enum_full(col: str, rest: str):
-    values = re.findall(r"\(([^)]+)\)", rest)
-    clean_rest = re.sub(r"ENUM\s*\([^)]+\)", "", rest, flags=re.IGNORECASE)
-    clean_rest = re.sub(r"COLLATE\s+\w+", "", clean_rest, flags=re.IGNORECASE)
-    clean_rest = re.sub(r"CHARACTER SET\s+\w+", "", clean_rest, flags=re.IGNORECASE)
-    clean_rest = re.sub(rf"^{col}\s+", "", clean_rest).strip()
 
-    if values:
-        return f"{col} TEXT {clean_rest} CHECK ({col} IN ({values[0]}))".strip()
-    return f"{col} TEXT {clean_rest}".strip()
+def _emit_table(table: CreateTable, keys: bool = True) -> str:
+    # Without keys: no PRIMARY KEY / UNIQUE on the columns, no key or foreign key constraints
+    columns = table.columns if keys else [replace(column, primary_key=False, unique=False) for column in table.columns]
+    pg_lines = [_translate_column(column) for column in columns]
+    for constraint in table.constraints:
+        if not keys and (isinstance(constraint, ForeignKeyDef) or _is_key(constraint)):
+            continue
+        line = _translate_constraint(constraint)
+        if line:
+            pg_lines.append(line)
+    return f"CREATE TABLE {table.name} (\n    " + ",\n    ".join(pg_lines) + "\n);\n"
 
 
-def _convert_set_full(col: str, rest: str):
-    values_match = re.search(r"\(([^)]+)\)", rest)
-    values = values_match.group(1).replace(" ", "") if values_match else ""
+def _split_sql_lines(block: str) -> List[str]:
+    """
+    Splits a table body on its top-level commas, ignoring commas inside parentheses and quotes.
+    """
+    lines = []
+    start = 0
+    parens = 0
+    quote = None
+    i = 0
+    while i < len(block):
+        char = block[i]
+        if quote:
+            if char == "\\":
+                i += 1
+            elif char == quote:
+                quote = None
+        elif char in "'\"`":
+            quote = char
+        elif char == "(":
+            parens += 1
+        elif char == ")":
+            parens -= 1
+        elif char == "," and parens == 0:
+            lines.append(block[start:i])
+            start = i + 1
+        i += 1
+    if block[start:].strip():
+        lines.append(block[start:])
+    return lines
 
-    clean_rest = re.sub(r"SET\s*\([^)]+\)", "", rest, flags=re.IGNORECASE)
-    clean_rest = re.sub(r"COLLATE\s+\w+", "", clean_rest, flags=re.IGNORECASE)
-    clean_rest = re.sub(r"CHARACTER SET\s+\w+", "", clean_rest, flags=re.IGNORECASE)
-    clean_rest = re.sub(rf"^{col}\s+", "", clean_rest).strip()
 
-    check_clause = f"CHECK ({col} <@ ARRAY[{values}])" if values else ""
-    return f"{col} TEXT[] {clean_rest} {check_clause}".strip()
+def _translate_type(column: ColumnDef) -> str:
+    data_type = column.type
+    if column.auto_increment:
+        # An unsigned INT can go past SERIAL's range
+        widened = data_type.unsigned and data_type.name in ("int", "integer")
+        return get_serial_type("bigint" if widened else data_type.name)
+    if data_type.unsigned and data_type.name in UNSIGNED_TYPE_MAP:
+        return UNSIGNED_TYPE_MAP[data_type.name]
+    pg_type = TYPE_MAP.get(data_type.name, "TEXT")
+    if pg_type in SIZED_TYPES and data_type.args:
+        pg_type += f"({', '.join(data_type.args)})"
+    return pg_type
+
+
+def _translate_column(column: ColumnDef) -> str:
+    parts = [column.name, _translate_type(column)]
+    if column.generated is not None:
+        # The values are copied over, so the column becomes a plain one
+        return " ".join(parts)
+
+    if column.auto_increment and column.primary_key:
+        return " ".join(parts + ["PRIMARY KEY"])
+    if column.nullable is not None:
+        parts.append("NULL" if column.nullable else "NOT NULL")
+    if column.default is not None and not column.auto_increment:
+        default = column.default
+        if column.type.name == "set" and default.startswith("'"):
+            # 'a,b' becomes the array literal '{a,b}'
+            default = "'{" + default[1:-1] + "}'" if default != "''" else "'{}'"
+        parts.append(f"DEFAULT {default}")
+    if column.primary_key:
+        parts.append("PRIMARY KEY")
+    if column.unique:
+        parts.append("UNIQUE")
+    parts.extend(column.extras)
+
+    # ON UPDATE, COMMENT, CHARACTER SET and COLLATE have no column-level equivalent and are dropped
+    if column.type.name == "enum" and column.type.args:
+        parts.append(f"CHECK ({column.name} IN ({', '.join(quote_string(value) for value in column.type.args)}))")
+    elif column.type.name == "set" and column.type.args:
+        parts.append(f"CHECK ({column.name} <@ ARRAY[{','.join(quote_string(value) for value in column.type.args)}])")
+    parts.extend(f"CHECK ({check})" for check in column.checks)
+    return " ".join(parts)
+
+
+def _foreign_key_definition(constraint: ForeignKeyDef) -> str:
+    actions = "".join(f" ON {event} {action}" for event, action in constraint.actions)
+    return f"FOREIGN KEY ({', '.join(constraint.columns)}) REFERENCES {constraint.ref_table} ({', '.join(constraint.ref_columns)}){actions}"
+
+
+def _translate_constraint(constraint) -> str:
+    if isinstance(constraint, ForeignKeyDef):
+        line = _foreign_key_definition(constraint)
+        return f"CONSTRAINT {constraint.name} {line}" if constraint.name else line
+
+    if isinstance(constraint, CheckDef):
+        # NOT ENFORCED checks were never applied by MySQL, so the data may not pass them
+        if not constraint.enforced:
+            return ""
+        return f"CONSTRAINT {constraint.name} CHECK ({constraint.expression})" if constraint.name else f"CHECK ({constraint.expression})"
+
+    # Plain, full-text and spatial indexes are created separately after the table, prefix lengths are dropped
+    if constraint.kind == "primary" and not constraint.functional:
+        return f"PRIMARY KEY ({', '.join(constraint.columns)})"
+    if constraint.kind == "unique" and not constraint.functional:
+        return f"UNIQUE ({', '.join(constraint.columns)})"
+    return ""
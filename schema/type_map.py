@@ -6,6 +6,7 @@ TYPE_MAP = {
     "int": "INTEGER",
     "integer": "INTEGER",
     "bigint": "BIGINT",
+    "bit": "BIT",
 
     # Floating/Decimal
     "float": "REAL",
@@ -13,6 +14,25 @@ TYPE_MAP = {
     "double precision": "DOUBLE PRECISION",
     "decimal": "NUMERIC",
     "numeric": "NUMERIC",
+    "real": "DOUBLE PRECISION",
+
+    # Strings
+    "char": "CHAR",
+    "varchar": "VARCHAR",
+    "tinytext": "TEXT",
+    "text": "TEXT",
+    "mediumtext": "TEXT",
+    "longtext": "TEXT",
+    "enum": "TEXT",
+    "set": "TEXT[]",
+
+    # Binary
+    "binary": "BYTEA",
+    "varbinary": "BYTEA",
+    "tinyblob": "BYTEA",
+    "blob": "BYTEA",
+    "mediumblob": "BYTEA",
+    "longblob": "BYTEA",
 
     # Dates
     "date": "DATE",
@@ -35,6 +55,19 @@ TYPE_MAP = {
     "geometrycollection": "BYTEA"
 }
 
+# Unsigned integers are widened so their whole range fits
+UNSIGNED_TYPE_MAP = {
+    "tinyint": "SMALLINT",
+    "smallint": "INTEGER",
+    "mediumint": "INTEGER",
+    "int": "BIGINT",
+    "integer": "BIGINT",
+    "bigint": "NUMERIC(20)",
+}
+
+# Postgres types that keep the MySQL length / precision arguments
+SIZED_TYPES = ("BIT", "CHAR", "VARCHAR", "NUMERIC")
+
 
 def get_serial_type(mysql_type: str) -> str:
     mysql_type = mysql_type.lower()
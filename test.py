@@ -1,9 +1,40 @@
 import unittest
-from config.config import MYSQL, POSTGRES
+import io
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from config.config import DatabaseConfig, MIGRATION, MYSQL, POSTGRES
 from schema.extractor import get_mysql_tables, _get_mysql_tables_raw
 from schema.translator import _translate_table, translate_schema
+from schema.ddl import parse_create_table
+from schema.catalog import ColumnInfo, ForeignKeyInfo, IndexInfo, TableInfo, render_create_table
+from schema.cache import SchemaCache
+from schema.sql_files import translate_sql_files
+from schema.creator import create_pg_tables, plan_creation_levels
+from schema.post_load import plan_post_load
+from schema.fast_load import find_emptied_tables, make_unlogged, restore_durability
 from data.exporter import export_table_data
-from data.importer import import_table_data
+from data.importer import import_table_data, import_table_batches
+from data.copy_encoder import encode_text_rows, encode_csv_rows, encode_raw_text_rows
+from data.converters import compile_converters, convert_batch
+from data.scheduler import build_dependency_graph, run_table_migrations
+from data.pipeline import migrate_table, migrate_table_data
+from data.async_engine import run_async_migrations
+from data.delta import detect_watermark, sync_table
+from data.journal import MigrationJournal
+from data.chunker import TableChunk
+from data.verify import row_hash_expressions
+from data.staging import StageManifest, export_to_stage, import_from_stage
+from data.dump import DumpRows, DumpTable, iter_dump_events, iter_dump_statements
+from data.work_queue import QUEUE_TABLE, LeaseLost, WorkQueue, enqueue_tables, run_worker
+from benchmarks.ddl_generator import SchemaShape, generate_schema
+from benchmarks.fake_dbapi import FakeMySQLConnection, FakePostgresConnection, FakePostgresCursor, RoundTrips, patched_connections
+from utils.metrics import METRICS, truncate
 import mysql.connector
 import psycopg2
 
@@ -13,6 +44,20 @@ def _normalize_sql(sql: str) -> str:
     lines = [line.strip() for line in sql.strip().splitlines()]
     return "\n".join(lines)
 
+def _test_postgres(test: unittest.TestCase) -> DatabaseConfig:
+    # Tests writing to Postgres only run against a throwaway database given explicitly, never the migration target
+    dsn = os.environ.get("TOPOSTGRES_TEST_DSN")
+    if not dsn:
+        test.skipTest("Set TOPOSTGRES_TEST_DSN to a throwaway PostgreSQL database to run this test")
+    params = psycopg2.extensions.parse_dsn(dsn)
+    return DatabaseConfig(
+        host=params.get("host", "localhost"),
+        user=params.get("user", ""),
+        password=params.get("password", ""),
+        port=int(params.get("port", 5432)),
+        dbname=params.get("dbname"),
+    )
+
 class TestMigration(unittest.TestCase):
     # Test Parameters:
     def __init__(self, *args, **kwargs):
@@ -81,5 +126,557 @@ class TestMigration(unittest.TestCase):
         # Compare the actual output with the expected output:
         # print(f"Actual SQL:\n[{_normalize_sql(actual_sql_out)}]")
         self.assertEqual(_normalize_sql(actual_sql_out), _normalize_sql(sql_out), f"Foriegn keys must have references to solely unique keys. Composite Unique or Primary keys refrenced do not count.")
+
+    def test_copy_text_and_csv_encoding(self):
+        rows = [(1, "a\tb\\c\n", None, b"\x01\xff", True), (2, "", "x\"y", None, False)]
+        text_buffer, csv_buffer = io.StringIO(), io.StringIO()
+        encode_text_rows(rows, text_buffer)
+        encode_csv_rows(rows, csv_buffer)
+        self.assertEqual(text_buffer.getvalue(), '1\ta\\tb\\\\c\\n\t\\N\t\\\\x01ff\tt\n2\t\tx"y\t\\N\tf\n')
+        # NULL is an unquoted empty field, an empty string is quoted
+        self.assertEqual(csv_buffer.getvalue(), '1,"a\tb\\c\n",,"\\x01ff","t"\n2,"","x""y",,"f"\n')
+
+    def test_table_scheduling_order(self):
+        translated = {
+            "orders": "CREATE TABLE orders (\n    customer_id INTEGER,\n    FOREIGN KEY (customer_id) REFERENCES customers (id)\n);",
+            "customers": "CREATE TABLE customers (\n    id INTEGER,\n    PRIMARY KEY (id)\n);",
+            "logs": "CREATE TABLE logs (\n    id INTEGER\n);",
+            "a": "CREATE TABLE a (\n    b_id INTEGER,\n    FOREIGN KEY (b_id) REFERENCES b (id)\n);",
+            "b": "CREATE TABLE b (\n    a_id INTEGER,\n    FOREIGN KEY (a_id) REFERENCES a (id)\n);",
+        }
+        sizes = {"orders": (1000, 10**9), "customers": (10, 10**3), "logs": (100, 10**6), "a": (1, 1), "b": (2, 2)}
+        order = []
+        results = run_table_migrations(list(translated), order.append, build_dependency_graph(translated), sizes, workers=1, worker_mode="thread")
+        self.assertEqual(set(results), set(translated))
+        # Ready tables go largest first, orders waits for customers, and the a <-> b cycle is broken at the larger table
+        self.assertEqual(order, ["logs", "customers", "orders", "b", "a"])
+
+    def test_post_load_plan(self):
+        mysql_tables = {
+            "users": "CREATE TABLE users (\n  id int NOT NULL AUTO_INCREMENT,\n  PRIMARY KEY (id)\n) ENGINE=InnoDB",
+            "posts": "CREATE TABLE posts (\n  id int NOT NULL AUTO_INCREMENT,\n  user_id int NOT NULL,\n  slug varchar(40) NOT NULL,\n"
+                     "  PRIMARY KEY (id),\n  UNIQUE KEY slug_UNIQUE (slug),\n  KEY user_idx (user_id),\n"
+                     "  CONSTRAINT posts_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE\n) ENGINE=InnoDB",
+        }
+        bare_tables, steps = plan_post_load(translate_schema(mysql_tables), mysql_tables)
+        self.assertEqual(_normalize_sql(bare_tables["posts"]), _normalize_sql("CREATE TABLE posts (\n    id SERIAL NOT NULL,\n    user_id INTEGER NOT NULL,\n    slug VARCHAR(40) NOT NULL\n);"))
+        self.assertEqual(
+            [(step.table, step.kind, step.name) for step in steps],
+            [("users", "primary", "users_pkey"), ("posts", "primary", "posts_pkey"), ("posts", "unique", "posts_slug_key"),
+             ("posts", "foreign", "posts_ibfk_1"), ("posts", "index", "posts_user_idx")]
+        )
+        self.assertEqual(steps[3].statements, ["ALTER TABLE posts ADD CONSTRAINT posts_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE NOT VALID"])
+
+    def test_post_load_plan_ignores_literals(self):
+        mysql_tables = {"notes": "CREATE TABLE notes (\n  id int NOT NULL AUTO_INCREMENT PRIMARY KEY,\n  note varchar(40) DEFAULT 'must be unique',\n"
+                                 "  kind enum('unique','primary key') NOT NULL COMMENT 'not a PRIMARY KEY',\n  code varchar(8) UNIQUE\n) ENGINE=InnoDB"}
+        bare_tables, steps = plan_post_load(translate_schema(mysql_tables), mysql_tables)
+        self.assertEqual(_normalize_sql(bare_tables["notes"]), _normalize_sql(
+            "CREATE TABLE notes (\n    id SERIAL NOT NULL,\n    note VARCHAR(40) DEFAULT 'must be unique',\n"
+            "    kind TEXT NOT NULL CHECK (kind IN ('unique', 'primary key')),\n    code VARCHAR(8)\n);"))
+        self.assertEqual([(step.kind, step.name) for step in steps], [("primary", "notes_pkey"), ("unique", "notes_code_key")])
+
+    def test_catalog_rendering(self):
+        table = TableInfo("posts", collation="utf8mb4_0900_ai_ci", columns=[
+            ColumnInfo("id", "int", "int", False, extra="auto_increment"),
+            ColumnInfo("user_id", "int", "int", True),
+            ColumnInfo("title", "varchar(60)", "varchar", False, default="untitled"),
+            ColumnInfo("created", "timestamp", "timestamp", True, default="CURRENT_TIMESTAMP", extra="DEFAULT_GENERATED"),
+        ], indexes=[
+            IndexInfo("PRIMARY", True, "BTREE", ["id"]),
+            IndexInfo("user_idx", False, "BTREE", ["user_id"]),
+        ], foreign_keys=[
+            ForeignKeyInfo("posts_ibfk_1", ["user_id"], "users", ["id"], "RESTRICT", "CASCADE"),
+        ])
+        show_create = (
+            "CREATE TABLE posts (\n  id int NOT NULL AUTO_INCREMENT,\n  user_id int DEFAULT NULL,\n"
+            "  title varchar(60) NOT NULL DEFAULT 'untitled',\n  created timestamp NULL DEFAULT CURRENT_TIMESTAMP,\n"
+            "  PRIMARY KEY (id),\n  KEY user_idx (user_id),\n"
+            "  CONSTRAINT posts_ibfk_1 FOREIGN KEY (user_id) REFERENCES users (id) ON DELETE CASCADE\n"
+            ") ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci"
+        )
+        self.assertEqual(render_create_table(table), show_create)
+
+    def test_ddl_parser(self):
+        sql = (
+            "CREATE TABLE `orders` (\n  `id` int unsigned NOT NULL AUTO_INCREMENT,\n"
+            "  `status` enum('new','it''s') COLLATE utf8mb4_bin NOT NULL DEFAULT 'new',\n"
+            "  `tags` set('a','b') DEFAULT 'a,b',\n"
+            "  `note` varchar(200) DEFAULT _utf8mb4'hi, there' COMMENT 'a note',\n"
+            "  `updated` datetime(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6) ON UPDATE CURRENT_TIMESTAMP(6),\n"
+            "  PRIMARY KEY (`id`),\n  KEY `note_idx` (`note`(50) DESC)\n) ENGINE=InnoDB COMMENT='x'"
+        )
+        table = parse_create_table(sql)
+        self.assertEqual([column.name for column in table.columns], ["id", "status", "tags", "note", "updated"])
+        self.assertEqual(table.columns[1].type.args, ["new", "it's"])
+        self.assertEqual(table.columns[4].on_update, "CURRENT_TIMESTAMP(6)")
+        self.assertEqual((table.constraints[1].columns, table.constraints[1].parts[0].length), (["note"], 50))
+        self.assertEqual(table.options, {"ENGINE": "InnoDB", "COMMENT": "x"})
+        # MySQL also takes the options separated by commas
+        self.assertEqual(parse_create_table(sql.replace("InnoDB COMMENT", "InnoDB, DEFAULT CHARSET=utf8mb4, COMMENT")).options,
+                         {"ENGINE": "InnoDB", "CHARSET": "utf8mb4", "COMMENT": "x"})
+        self.assertEqual(_normalize_sql(_translate_table(sql)), _normalize_sql(
+            "CREATE TABLE orders (\n    id BIGSERIAL NOT NULL,\n"
+            "    status TEXT NOT NULL DEFAULT 'new' CHECK (status IN ('new', 'it''s')),\n"
+            "    tags TEXT[] DEFAULT '{a,b}' CHECK (tags <@ ARRAY['a','b']),\n"
+            "    note VARCHAR(200) DEFAULT 'hi, there',\n"
+            "    updated TIMESTAMP WITHOUT TIME ZONE NOT NULL DEFAULT CURRENT_TIMESTAMP(6),\n"
+            "    PRIMARY KEY (id)\n);"
+        ))
+
+    def test_foreign_keys_independent_of_table_order(self):
+        mysql_tables = {
+            "posts": "CREATE TABLE posts (\n  id int NOT NULL,\n  user_id int NOT NULL,\n  team_id int NOT NULL,\n  PRIMARY KEY (id),\n"
+                     "  CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users (id),\n"
+                     "  CONSTRAINT fk_team FOREIGN KEY (team_id) REFERENCES users (team_id)\n) ENGINE=InnoDB",
+            "users": "CREATE TABLE users (\n  id int AUTO_INCREMENT PRIMARY KEY,\n  team_id int NOT NULL,\n  UNIQUE KEY team (team_id,id)\n) ENGINE=InnoDB",
+        }
+        forward = translate_schema(mysql_tables)
+        backward = translate_schema(dict(reversed(mysql_tables.items())))
+        self.assertEqual(forward, backward)
+        # users.id is an inline primary key, users.team_id is only part of a composite unique key
+        self.assertIn("CONSTRAINT fk_user FOREIGN KEY (user_id) REFERENCES users (id)", forward["posts"])
+        self.assertNotIn("fk_team", forward["posts"])
+
+    def test_value_conversion(self):
+        pg_sql = translate_schema({"t": (
+            "CREATE TABLE t (\n  id int NOT NULL,\n  tags set('a','b') DEFAULT NULL,\n  flags bit(4) NOT NULL,\n"
+            "  created datetime NOT NULL,\n  seen date DEFAULT NULL,\n  at time NOT NULL,\n  PRIMARY KEY (id)\n) ENGINE=InnoDB"
+        )})["t"]
+        converters = compile_converters(pg_sql)
+        self.assertEqual([index for index, _ in converters], [1, 2, 3, 4, 5])
+        rows = [
+            (1, {"b", "a"}, 5, None, "0000-00-00", timedelta(hours=13, minutes=5)),
+            (2, None, b"\x01", datetime(2024, 1, 2, 3, 4, 5), date(2024, 1, 2), timedelta(hours=30)),
+        ]
+        self.assertEqual(convert_batch(rows, converters), [
+            (1, '{"a","b"}', "0101", datetime.min, None, time(13, 5)),
+            (2, None, "0001", datetime(2024, 1, 2, 3, 4, 5), date(2024, 1, 2), timedelta(hours=30)),
+        ])
+        self.assertIs(convert_batch(rows, []), rows)
+
+    def test_generated_schema_translates(self):
+        mysql_tables = generate_schema(SchemaShape(tables=30, columns=12, fk_density=1.0, generated_ratio=0.1, backticks=True))
+        self.assertEqual(mysql_tables, generate_schema(SchemaShape(tables=30, columns=12, fk_density=1.0, generated_ratio=0.1, backticks=True)))
+        translated = translate_schema(mysql_tables)
+        self.assertEqual(list(translated), list(mysql_tables))
+        # Every generated foreign key references a primary key, so none may be dropped
+        self.assertEqual(
+            sum(sql.count("FOREIGN KEY") for sql in translated.values()),
+            sum(sql.count("FOREIGN KEY") for sql in mysql_tables.values()),
+        )
+        self.assertNotIn("GENERATED", "".join(translated.values()))
+
+    def test_data_path_with_stand_in_connections(self):
+        mysql_trips, pg_trips = RoundTrips(), RoundTrips()
+        with patched_connections(
+            mysql_factory=lambda: FakeMySQLConnection(2500, lambda i: (i, f"name {i}"), mysql_trips),
+            postgres_factory=lambda: FakePostgresConnection(["integer", "text"], pg_trips),
+        ):
+            imported = migrate_table_data("t", MYSQL, POSTGRES, batch_size=1000, queue_depth=2, where="`id` BETWEEN %s AND %s", params=(1, 2000))
+        self.assertEqual(imported, 2000)
+        self.assertEqual(mysql_trips.counts, {"mysql_query": 1, "mysql_fetch": 2})
+        self.assertEqual((pg_trips.counts["pg_copy"], pg_trips.counts["pg_commit"]), (2, 3))
+
+    def test_async_engine(self):
+        pg_sql = "CREATE TABLE {} (\n    id INTEGER NOT NULL,\n    name TEXT,\n    PRIMARY KEY (id)\n);"
+        translated = {table: pg_sql.format(table) for table in ("a", "b", "c")}
+        mysql_trips = RoundTrips()
+        saved, MIGRATION.chunk_rows = MIGRATION.chunk_rows, 1000
+        try:
+            with patched_connections(
+                mysql_factory=lambda: FakeMySQLConnection(2500, lambda i: (i, f"name {i}"), mysql_trips),
+                postgres_factory=lambda: FakePostgresConnection(["integer", "text"], RoundTrips()),
+            ):
+                # One stream per side, with more chunks than streams, must not deadlock
+                results = run_async_migrations(list(translated), translated, MYSQL, POSTGRES, sizes={table: (2500, 0) for table in translated},
+                                               mysql_streams=1, pg_streams=1, batch_size=500, queue_depth=1)
+        finally:
+            MIGRATION.chunk_rows = saved
+        self.assertEqual(results, {"a": 2500, "b": 2500, "c": 2500})
+        # Per table: the MIN / MAX query, then one export query per chunk
+        self.assertEqual(mysql_trips.counts["mysql_query"], 3 * (1 + 3))
+
+    def test_dump_reader(self):
+        dump = (
+            "-- MySQL dump\n/*!40101 SET NAMES utf8mb4 */;\n"
+            "CREATE TABLE `t` (\n  `id` int NOT NULL,\n  `name` varchar(20) DEFAULT 'a;b',\n  `data` blob,\n  PRIMARY KEY (`id`)\n);\n"
+            "INSERT INTO `t` VALUES (1,'O\\'Brien; -- x','\\0\\n'),(2,NULL,0xCAFE),(3,'it''s',_binary 'ab');\n"
+            "DELIMITER ;;\nCREATE TRIGGER tr BEFORE INSERT ON t FOR EACH ROW BEGIN SET NEW.id = 1; END ;;\nDELIMITER ;\n"
+            "INSERT INTO `t` (`id`) VALUES (-4);\n"
+        )
+        # Statements must come out the same however the file is split into reads
+        expected = list(iter_dump_statements(io.StringIO(dump)))
+        self.assertEqual(len(expected), 5)
+        for chunk_size in (1, 5, 64):
+            self.assertEqual(list(iter_dump_statements(io.StringIO(dump), chunk_size=chunk_size)), expected)
+        events = list(iter_dump_events(io.StringIO(dump), batch_size=2))
+        self.assertEqual([type(event) for event in events], [DumpTable, DumpRows, DumpRows, DumpRows])
+        self.assertEqual(events[1].rows, [("1", "O'Brien; -- x", "\x00\n"), ("2", None, b"\xca\xfe")])
+        self.assertEqual(events[2].rows, [("3", "it's", b"ab")])
+        self.assertEqual((events[3].columns, events[3].rows), (["id"], [("-4",)]))
+
+    def test_dump_keyword_columns(self):
+        # mysqldump quotes every identifier, which is what lets a column be named after a keyword
+        dump = (
+            "CREATE TABLE `t` (\n  `id` int NOT NULL,\n  `key` varchar(20) DEFAULT 'a`b' COMMENT 'the `key` col',\n"
+            "  PRIMARY KEY (`id`),\n  KEY `idx_key` (`key`)\n) ENGINE=InnoDB;\n"
+        )
+        events = list(iter_dump_events(io.StringIO(dump)))
+        self.assertEqual(events[0].sql, dump.strip().rstrip(";"))
+        self.assertEqual(_normalize_sql(_translate_table(events[0].sql)), _normalize_sql(
+            "CREATE TABLE t (\n    id INTEGER NOT NULL,\n    key VARCHAR(20) DEFAULT 'a`b',\n    PRIMARY KEY (id)\n);"))
+
+    def test_create_order(self):
+        schema = {
+            "c": "CREATE TABLE c (\n    id INTEGER,\n    b_id INTEGER,\n    FOREIGN KEY (b_id) REFERENCES b (id)\n);",
+            "b": "CREATE TABLE b (\n    id INTEGER,\n    a_id INTEGER,\n    FOREIGN KEY (a_id) REFERENCES a (id)\n);",
+            "a": "CREATE TABLE a (\n    id INTEGER\n);",
+            "x": "CREATE TABLE x (\n    id INTEGER,\n    y_id INTEGER,\n    CONSTRAINT fk_y FOREIGN KEY (y_id) REFERENCES y (id)\n);",
+            "y": "CREATE TABLE y (\n    id INTEGER,\n    x_id INTEGER,\n    FOREIGN KEY (x_id) REFERENCES x (id)\n);",
+        }
+        levels, statements, deferred = plan_creation_levels(schema)
+        self.assertEqual(levels, [["a"], ["b"], ["c"], ["x", "y"]])
+        self.assertNotIn("FOREIGN KEY", statements["x"] + statements["y"])
+        self.assertEqual(deferred, [("x", "ALTER TABLE x ADD CONSTRAINT fk_y FOREIGN KEY (y_id) REFERENCES y (id)"),
+                                    ("y", "ALTER TABLE y ADD FOREIGN KEY (x_id) REFERENCES x (id)")])
+
+        trips = RoundTrips()
+        with patched_connections(postgres_factory=lambda: FakePostgresConnection([], trips)):
+            self.assertEqual(create_pg_tables(schema, POSTGRES, batch_size=100), [])
+        # One batched round trip and commit per level, plus one for the deferred foreign keys
+        self.assertEqual(trips.counts, {"pg_execute": 5, "pg_commit": 5})
+
+    def test_fast_load(self):
+        self.assertEqual(make_unlogged({"t": "CREATE TABLE t (\n    id INTEGER\n);"}), {"t": "CREATE UNLOGGED TABLE t (\n    id INTEGER\n);"})
+
+        class Journal(MigrationJournal):
+            done = {"logged:a"}
+
+            def is_done(self, unit):
+                return unit in self.done
+
+            def mark_done(self, unit):
+                self.done.add(unit)
+
+            def mark_done_with(self, cur, unit):
+                self.done.add(unit)
+
+        trips = RoundTrips()
+        with patched_connections(postgres_factory=lambda: FakePostgresConnection([], trips)):
+            self.assertEqual(restore_durability(["a", "b", "c"], POSTGRES, Journal(POSTGRES)), [])
+            # Everything is recorded as logged, so running it again does nothing
+            restore_durability(["a", "b", "c"], POSTGRES, Journal(POSTGRES))
+        # Only the tables the journal didn't have, each in its own transaction
+        self.assertEqual(trips.counts, {"pg_execute": 2, "pg_commit": 2})
+        self.assertEqual(Journal.done, {"logged:a", "logged:b", "logged:c", "phase:logged"})
+
+    def test_raw_passthrough(self):
+        pg_sql = ("CREATE TABLE t (\n    id INTEGER NOT NULL,\n    name TEXT,\n    amount NUMERIC(10,2),\n    created TIMESTAMP WITHOUT TIME ZONE NOT NULL,\n"
+                  "    born DATE,\n    data BYTEA,\n    tags TEXT[] CHECK (tags <@ ARRAY['b','a']),\n    flags BIT(3),\n    took TIME WITHOUT TIME ZONE,\n    PRIMARY KEY (id)\n);")
+        # What the connector returns, and what a raw cursor returns, for the same rows
+        typed = [
+            (1, "tab\there \\ ünï", Decimal("1.50"), datetime(2024, 1, 2, 3, 4, 5, 600), date(2024, 1, 2), b"\x00\t\xff", {"b", "a"}, 5, timedelta(hours=1)),
+            (2, None, None, None, None, None, None, None, None),
+        ]
+        raw = [
+            (b"1", "tab\there \\ ünï".encode(), b"1.50", b"2024-01-02 03:04:05.000600", b"2024-01-02", b"\x00\t\xff", b"b,a", b"\x05", b"01:00:00"),
+            (b"2", None, None, b"0000-00-00 00:00:00", b"2024-00-00", None, None, None, None),
+        ]
+        expected = io.StringIO()
+        encode_text_rows(convert_batch(typed, compile_converters(pg_sql)), expected)
+        encoded = io.BytesIO()
+        converters = compile_converters(pg_sql, raw=True)
+        encode_raw_text_rows(convert_batch(raw, converters), encoded)
+        self.assertEqual(encoded.getvalue(), expected.getvalue().encode())
+        # Only the columns whose MySQL text differs are converted: BYTEA, TEXT[], BIT and the zero dates
+        self.assertEqual([index for index, _ in converters], [3, 4, 5, 6, 7])
+
+        trips = RoundTrips()
+        with patched_connections(
+            mysql_factory=lambda: FakeMySQLConnection(2500, lambda i: (i, f"name\t{i}", None, datetime(2024, 1, 1), None, b"\\", None, None, None), trips),
+            postgres_factory=lambda: FakePostgresConnection([], trips),
+        ):
+            imported = migrate_table_data("t", MYSQL, POSTGRES, batch_size=1000, converters=converters, raw=True)
+        self.assertEqual(imported, 2500)
+        self.assertEqual(trips.counts["pg_copy"], 3)
+        self.assertNotIn("pg_insert", trips.counts)
+        # Key-range progress is journaled from the raw key too
+        cur = FakePostgresCursor(FakePostgresConnection([], trips))
+        executed = []
+        cur.execute = lambda query, params=None: executed.append(params)
+        MigrationJournal(POSTGRES).checkpoint(cur, raw, TableChunk("t", 0, column="id", key_index=0, lo=1, hi=2))
+        self.assertEqual(executed[0][0], 2)
+
+    def test_reject_bisection(self):
+        class RejectingCursor(FakePostgresCursor):
+            # Rejects any COPY or INSERT holding a "bad" value, like Postgres failing on a constraint
+            def copy_expert(self, query, file, size: int = 8192):
+                if "bad" in file.getvalue():
+                    raise psycopg2.errors.CheckViolation("bad value")
+                super().copy_expert(query, file, size)
+
+            def execute(self, query, params=None):
+                if params and "bad" in params:
+                    raise psycopg2.errors.CheckViolation("bad value")
+                super().execute(query, params)
+
+        class RejectingConnection(FakePostgresConnection):
+            def cursor(self):
+                return RejectingCursor(self)
+
+        trips = RoundTrips()
+        rows = [(i, "bad" if i in (17, 63) else f"name {i}") for i in range(1, 101)]
+        saved, MIGRATION.reject_dir = MIGRATION.reject_dir, tempfile.mkdtemp()
+        try:
+            with patched_connections(postgres_factory=lambda: RejectingConnection(["integer", "text"], trips)):
+                imported = import_table_batches("reject_t", [rows[:50], rows[50:]], POSTGRES)
+            with open(os.path.join(MIGRATION.reject_dir, "reject_t.rejects.jsonl")) as f:
+                rejected = [json.loads(line) for line in f]
+        finally:
+            MIGRATION.reject_dir = saved
+        self.assertEqual(imported, 98)
+        self.assertEqual([reject["row"] for reject in rejected], [[17, "bad"], [63, "bad"]])
+        # Both batches commit, and COPY stays on for the table
+        self.assertEqual(trips.counts["pg_commit"], 3)
+        self.assertLess(trips.counts["pg_copy"], 20)
+
+    def test_row_hash_expressions(self):
+        pg_sql = "CREATE TABLE t (\n    id INTEGER NOT NULL,\n    born DATE,\n    data BYTEA,\n    tags TEXT[],\n    score DOUBLE PRECISION,\n    PRIMARY KEY (id)\n);"
+        mysql_hash, pg_hash, unhashed = row_hash_expressions(pg_sql)
+        self.assertEqual(unhashed, ["score"])
+        self.assertEqual(mysql_hash, (
+            "MD5(CONCAT_WS(CHAR(31 USING utf8mb4), COALESCE(CONVERT(CAST(`id` AS CHAR) USING utf8mb4), CHAR(30 USING utf8mb4)), "
+            "COALESCE(CONVERT(IF(YEAR(`born`) = 0 OR MONTH(`born`) = 0 OR DAYOFMONTH(`born`) = 0, NULL, DATE_FORMAT(`born`, '%Y-%m-%d')) USING utf8mb4), CHAR(30 USING utf8mb4)), "
+            "COALESCE(CONVERT(LOWER(HEX(`data`)) USING utf8mb4), CHAR(30 USING utf8mb4)), "
+            "COALESCE(CONVERT(`tags` USING utf8mb4), CHAR(30 USING utf8mb4))))"
+        ))
+        self.assertEqual(pg_hash, (
+            "md5(concat_ws(chr(31), COALESCE(\"id\"::text, chr(30)), COALESCE(to_char(\"born\", 'YYYY-MM-DD'), chr(30)), "
+            "COALESCE(encode(\"data\", 'hex'), chr(30)), COALESCE(array_to_string(\"tags\", ','), chr(30))))"
+        ))
+
+    def test_row_hash_matches_conversion(self):
+        pg_sql = translate_schema({"t": "CREATE TABLE t (\n  id int NOT NULL,\n  perms set('write','read') NOT NULL,\n  born date NOT NULL,\n  PRIMARY KEY (id)\n)"})["t"]
+        # MySQL prints a SET in definition order, so the array keeps that order and array_to_string reads it back the same
+        typed, raw = compile_converters(pg_sql), compile_converters(pg_sql, raw=True)
+        self.assertEqual(convert_batch([(1, {"read", "write"}, None)], typed), [(1, '{"write","read"}', date.min)])
+        self.assertEqual(convert_batch([(b"1", b"write,read", b"0000-00-00")], raw), [(b"1", b'{"write","read"}', b"0001-01-01")])
+        # A zero date is hashed on the MySQL side as the earliest date the NOT NULL column was loaded with
+        mysql_hash, pg_hash, _ = row_hash_expressions(pg_sql)
+        self.assertIn("COALESCE(CONVERT(`perms` USING utf8mb4)", mysql_hash)
+        self.assertIn("IF(YEAR(`born`) = 0 OR MONTH(`born`) = 0 OR DAYOFMONTH(`born`) = 0, '0001-01-01', DATE_FORMAT(`born`, '%Y-%m-%d'))", mysql_hash)
+        self.assertIn("to_char(\"born\", 'YYYY-MM-DD')", pg_hash)
+
+    def test_delta_sync(self):
+        pg_sql = "CREATE TABLE t (\n    id INTEGER NOT NULL,\n    name TEXT,\n    PRIMARY KEY (id)\n);"
+        mysql_sql = "CREATE TABLE `t` (\n  `id` int NOT NULL,\n  `name` text,\n  `changed` timestamp NULL DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,\n  PRIMARY KEY (`id`)\n)"
+        self.assertEqual(detect_watermark(pg_sql, mysql_sql), ("id", "key"))
+        self.assertEqual(detect_watermark(pg_sql.replace("name TEXT,", "name TEXT,\n    changed TIMESTAMP,"), mysql_sql), ("changed", "timestamp"))
+
+        class Journal(MigrationJournal):
+            recorded = []
+
+            def get_sync_state(self, table):
+                return {"column": "id", "kind": "key", "watermark": 2000}
+
+            def record_sync_state(self, cur, table, state, rows=0):
+                self.recorded.append((state["watermark"], rows))
+
+        pg_trips = RoundTrips()
+        with patched_connections(
+            mysql_factory=lambda: FakeMySQLConnection(2500, lambda i: (i, f"name {i}"), RoundTrips()),
+            postgres_factory=lambda: FakePostgresConnection(["integer", "text"], pg_trips),
+        ):
+            synced = sync_table("t", pg_sql, "", MYSQL, POSTGRES, Journal(POSTGRES))
+        # Only the rows after the watermark, with the watermark moved on in the same commit
+        self.assertEqual(synced, 500)
+        self.assertEqual(Journal.recorded, [(2500, 500)])
+        self.assertEqual(pg_trips.counts["pg_commit"], 1)
+
+        # A DATE column named in sync_columns: its watermark is stored as a plain date and read back
+        dated_sql = "CREATE TABLE t (\n    id INTEGER NOT NULL,\n    day DATE,\n    PRIMARY KEY (id)\n);"
+        Journal.recorded = []
+        saved, MIGRATION.sync_columns = MIGRATION.sync_columns, {"t": "day"}
+        try:
+            with patched_connections(
+                mysql_factory=lambda: FakeMySQLConnection(3, lambda i: (i, date(2024, 1, i)), RoundTrips()),
+                postgres_factory=lambda: FakePostgresConnection(["integer", "date"], RoundTrips()),
+            ):
+                self.assertEqual(sync_table("t", dated_sql, "", MYSQL, POSTGRES, Journal(POSTGRES)), 3)
+        finally:
+            MIGRATION.sync_columns = saved
+        self.assertEqual(Journal.recorded, [("2024-01-03", 3)])
+
+    def test_stage_round_trip(self):
+        pg_sql = "CREATE TABLE t (\n    id INTEGER NOT NULL,\n    name TEXT,\n    PRIMARY KEY (id)\n);"
+        expected = io.StringIO()
+        encode_text_rows([(i, f"name\t{i}") for i in range(1, 2501)], expected)
+        saved, MIGRATION.chunk_rows = MIGRATION.chunk_rows, 1000
+        try:
+            for compression in ("gzip", "none"):
+                directory = tempfile.mkdtemp()
+                mysql_trips, pg_trips = RoundTrips(), RoundTrips()
+                with patched_connections(
+                    mysql_factory=lambda: FakeMySQLConnection(2500, lambda i: (i, f"name\t{i}"), mysql_trips),
+                    postgres_factory=lambda: FakePostgresConnection(["integer", "text"], pg_trips),
+                ):
+                    export_to_stage(directory, {"t": ""}, {"t": pg_sql}, MYSQL, sizes={"t": (2500, 0)}, compression=compression)
+                    queries = mysql_trips.counts["mysql_query"]
+                    # A second export finds every chunk staged and doesn't read MySQL again
+                    export_to_stage(directory, {"t": ""}, {"t": pg_sql}, MYSQL, sizes={"t": (2500, 0)}, compression=compression)
+                    self.assertEqual(mysql_trips.counts["mysql_query"], queries)
+                    results = import_from_stage(directory, POSTGRES, create=False, post_load=False)
+                manifest = StageManifest.load(directory)
+                self.assertEqual(len(manifest.tables["t"]["files"]), 3)
+                self.assertEqual(results, {"t": 2500})
+                self.assertEqual(pg_trips.counts["pg_copy"], 3)
+                # The files hold exactly the COPY text of the rows
+                self.assertEqual(pg_trips.bytes, len(expected.getvalue()))
+        finally:
+            MIGRATION.chunk_rows = saved
+
+    def test_translate_sql_files(self):
+        source, output = tempfile.mkdtemp(), tempfile.mkdtemp()
+        os.makedirs(os.path.join(source, "orders"))
+        with open(os.path.join(source, "users.sql"), "w") as f:
+            f.write("SET NAMES utf8mb4;\nCREATE TABLE `users` (\n  `id` int NOT NULL,\n  `email` varchar(255),\n  PRIMARY KEY (`id`),\n  KEY `email_idx` (`email`)\n);\n")
+        with open(os.path.join(source, "orders", "orders.sql"), "w") as f:
+            f.write("CREATE TABLE `orders` (\n  `id` int NOT NULL,\n  `user_id` int,\n  PRIMARY KEY (`id`),\n  CONSTRAINT `orders_user` FOREIGN KEY (`user_id`) REFERENCES `users` (`id`)\n);\n")
+        results = translate_sql_files([source], output, workers=2)
+        self.assertEqual(list(results.values()), [1, 1])
+        with open(os.path.join(output, "users.sql")) as f:
+            self.assertIn("CREATE INDEX IF NOT EXISTS users_email_idx ON users (email);", f.read())
+        with open(os.path.join(output, "orders", "orders.sql")) as f:
+            # The foreign key to a table of another file is kept, and is created valid
+            self.assertIn("ADD CONSTRAINT orders_user FOREIGN KEY (user_id) REFERENCES users (id);", f.read())
+        # Statements run together without a ';' fail the file instead of dropping every table after the first
+        broken = os.path.join(tempfile.mkdtemp(), "broken.sql")
+        with open(broken, "w") as f:
+            f.write("CREATE TABLE `a` (\n  `id` int NOT NULL\n) ENGINE=InnoDB\nCREATE TABLE `b` (\n  `id` int NOT NULL\n);\n")
+        self.assertEqual(translate_sql_files([broken], tempfile.mkdtemp(), workers=1), {broken: None})
+        # Translating loads neither the data package, the database drivers nor any connection details
+        loaded = subprocess.run(
+            [sys.executable, "-c", "import sys, cli, schema.sql_files; print(sorted({'psycopg2', 'mysql.connector', 'data.dump'} & set(sys.modules)), 'MYSQL' in vars(sys.modules['config.config']))"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True, check=True,
+        ).stdout
+        self.assertEqual(loaded.strip(), "[] False")
+
+    def test_schema_cache(self):
+        tables = generate_schema(SchemaShape(tables=40, fk_density=1.0))
+        expected = translate_schema(tables)
+        path = os.path.join(tempfile.mkdtemp(), "schema.json")
+        cache = SchemaCache(path)
+        self.assertEqual(translate_schema(tables, cache=cache), expected)
+        cache.save()
+        # Dropping a referenced primary key must also drop the foreign keys of unchanged tables pointing at it
+        changed = dict(tables, table_00000=tables["table_00000"].replace(",\n  PRIMARY KEY (id)", ""))
+        self.assertEqual(translate_schema(changed, cache=SchemaCache(path)), translate_schema(changed))
+        self.assertEqual(translate_schema(tables, cache=SchemaCache(path)), expected)
+
+    def test_phase_metrics(self):
+        METRICS.reset()
+        with patched_connections(
+            mysql_factory=lambda: FakeMySQLConnection(1500, lambda i: (i, f"name {i}"), RoundTrips()),
+            postgres_factory=lambda: FakePostgresConnection(["integer", "text"], RoundTrips()),
+        ):
+            migrate_table_data("metrics_t", MYSQL, POSTGRES, batch_size=1000)
+        snapshot = METRICS.snapshot()
+        self.assertEqual(snapshot[("metrics_t", "export")].rows, 1500)
+        load = snapshot[("metrics_t", "load")]
+        self.assertEqual(load.rows, 1500)
+        self.assertGreater(load.bytes, 0)
+        self.assertIn("postgres", load.waits)
+        self.assertIn("mysql", snapshot[("metrics_t", "export")].waits)
+        self.assertEqual(json.loads(METRICS.to_json())["phases"]["load"]["rows"], 1500)
+        self.assertIn('topostgres_rows_total{table="metrics_t",phase="load"} 1500', METRICS.to_prometheus())
+        self.assertLess(len(truncate(("x" * 10000,))), 300)
+
+    def test_work_queue(self):
+        pg = _test_postgres(self)
+        conn = psycopg2.connect(**pg.unpack_postgres())
+        conn.autocommit = True
+        cur = conn.cursor()
+        tables = ("queue_a", "queue_b")
+        translated = {table: f"CREATE TABLE {table} (\n    id INTEGER NOT NULL,\n    name TEXT,\n    PRIMARY KEY (id)\n);" for table in tables}
+        for table in tables:
+            cur.execute(f"DROP TABLE IF EXISTS {table}; CREATE TABLE {table} (id INTEGER NOT NULL PRIMARY KEY, name TEXT)")
+        journal, queue = MigrationJournal(pg), WorkQueue(pg)
+        journal.setup()
+        queue.setup(reset=True)
+        saved = MIGRATION.chunk_rows, MIGRATION.lease_seconds
+        MIGRATION.chunk_rows, MIGRATION.lease_seconds = 1000, 1.0
+        try:
+            with patched_connections(mysql_factory=lambda: FakeMySQLConnection(5000, lambda i: (i, f"name {i}"), RoundTrips())):
+                self.assertEqual(enqueue_tables(["queue_a"], translated, MYSQL, queue, journal, sizes={"queue_a": (5000, 0)}), 5)
+                # A worker that dies right after claiming: its unit goes to another worker once the lease runs out
+                dead, _, attempt = queue.claim("dead:0")
+                imported = []
+                workers = [threading.Thread(target=lambda name=name: imported.append(run_worker(MYSQL, pg, slots=2, name=name))) for name in ("a", "b")]
+                for worker in workers:
+                    worker.start()
+                # The first table drains before the queue is sealed: the workers wait for the rest instead of leaving
+                for _ in range(300):
+                    if queue.status()["done"] == 5:
+                        break
+                    workers[0].join(0.1)
+                workers[0].join(MIGRATION.lease_seconds)
+                self.assertTrue(all(worker.is_alive() for worker in workers))
+                enqueue_tables(["queue_b"], translated, MYSQL, queue, journal, sizes={"queue_b": (5000, 0)})
+                queue.seal()
+                for worker in workers:
+                    worker.join(60)
+            self.assertEqual(sum(imported), 10000)
+            for table in tables:
+                cur.execute(f"SELECT count(DISTINCT id) FROM {table}")
+                self.assertEqual(cur.fetchone()[0], 5000)
+            cur.execute(f"SELECT state, count(*), sum(rows) FROM {QUEUE_TABLE} GROUP BY state")
+            self.assertEqual(cur.fetchall(), [("done", 10, 10000)])
+            cur.execute(f"SELECT attempts FROM {QUEUE_TABLE} WHERE unit = %s", (dead.label,))
+            self.assertEqual(cur.fetchone()[0], 2)
+            # The dead worker's attempt is fenced off
+            with self.assertRaises(LeaseLost):
+                queue.fence(cur, dead.label, "dead:0", attempt)
+        finally:
+            MIGRATION.chunk_rows, MIGRATION.lease_seconds = saved
+            cur.execute(f"DROP TABLE IF EXISTS {', '.join(tables)}")
+            conn.close()
+
+    def test_resume_reloads_emptied_unlogged_tables(self):
+        pg = _test_postgres(self)
+        conn = psycopg2.connect(**pg.unpack_postgres())
+        conn.autocommit = True
+        cur = conn.cursor()
+        tables = ("crash_a", "crash_b", "crash_c")
+        pg_sql = "CREATE TABLE crash_a (\n    id INTEGER NOT NULL,\n    name TEXT,\n    PRIMARY KEY (id)\n);"
+        # crash_a was emptied by a crash after its load committed, crash_b kept its rows, crash_c is logged again
+        cur.execute(
+            "DROP TABLE IF EXISTS crash_a, crash_b, crash_c; "
+            "CREATE UNLOGGED TABLE crash_a (id INTEGER NOT NULL PRIMARY KEY, name TEXT); "
+            "CREATE UNLOGGED TABLE crash_b (id INTEGER NOT NULL PRIMARY KEY, name TEXT); "
+            "CREATE TABLE crash_c (id INTEGER NOT NULL PRIMARY KEY, name TEXT); "
+            "INSERT INTO crash_b VALUES (1, 'kept')"
+        )
+        journal = MigrationJournal(pg)
+        journal.setup()
+        chunks = [TableChunk(table, 0) for table in tables]
+        journal.register_chunks(chunks)
+        for chunk in chunks:
+            journal.checkpoint(cur, None, chunk)
+        try:
+            emptied = find_emptied_tables(list(tables), pg)
+            self.assertEqual(emptied, ["crash_a"])
+            journal.forget_tables(emptied)
+            self.assertEqual(journal.get_chunks("crash_a"), [])
+            self.assertTrue(all(chunk.completed for table in ("crash_b", "crash_c") for chunk in journal.get_chunks(table)))
+            with patched_connections(mysql_factory=lambda: FakeMySQLConnection(100, lambda i: (i, f"name {i}"), RoundTrips())):
+                self.assertEqual(migrate_table("crash_a", pg_sql, 100, MYSQL, pg, journal), 100)
+            cur.execute("SELECT count(*) FROM crash_a")
+            self.assertEqual(cur.fetchone()[0], 100)
+            self.assertEqual(find_emptied_tables(list(tables), pg), [])
+        finally:
+            cur.execute("DROP TABLE IF EXISTS crash_a, crash_b, crash_c")
+            conn.close()
+
 if __name__ == "__main__":
     unittest.main()
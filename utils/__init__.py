@@ -1,5 +1,9 @@
 from .logger import log
+from .metrics import METRICS, Metrics, ProgressReporter
 
 __all__ = [
     "log",
+    "METRICS",
+    "Metrics",
+    "ProgressReporter",
 ]
@@ -0,0 +1,254 @@
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+
+from .logger import log
+
+PHASES = ("extract", "translate", "create", "export", "convert", "load", "index")
+
+
+@dataclass
+class PhaseStats:
+    rows: int = 0
+    bytes: int = 0
+    busy: float = 0.0                           # Seconds spent inside the phase, summed over threads
+    waits: dict = field(default_factory=dict)   # Seconds spent waiting on each database ("mysql" / "postgres")
+    started: float = None                       # time.time() of the first and last activity, for the wall time
+    ended: float = None
+
+    @property
+    def wall(self) -> float:
+        return (self.ended - self.started) if self.started is not None else 0.0
+
+    def to_dict(self) -> dict:
+        wall = self.wall
+        return {
+            "rows": self.rows,
+            "bytes": self.bytes,
+            "wall_seconds": round(wall, 4),
+            "busy_seconds": round(self.busy, 4),
+            "wait_seconds": {database: round(seconds, 4) for database, seconds in self.waits.items()},
+            "rows_per_sec": round(self.rows / wall, 1) if wall > 0 else 0,
+            "bytes_per_sec": round(self.bytes / wall, 1) if wall > 0 else 0,
+        }
+
+
+class Metrics:
+    """
+    Per table, per phase counters: rows, bytes, time spent in the phase and time spent waiting on each database.
+    Recording only takes a short lock to add a few numbers, so it is cheap enough to call once per batch from any
+    thread; reporting and file output work from a snapshot, outside the lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[tuple[str, str], PhaseStats] = {}
+
+    def record(self, table: str, phase: str, rows: int = 0, bytes: int = 0, seconds: float = 0.0, wait: dict = None):
+        """
+        Adds to a table's phase counters. The phase is taken to have ended now, after running for seconds.
+
+        Args:
+            table (str): The table, or "*" for whole schema phases.
+            phase (str): One of PHASES.
+            rows (int): Rows processed.
+            bytes (int): Bytes processed.
+            seconds (float): Time spent in the phase.
+            wait (dict): Seconds spent waiting, per database.
+        """
+        now = time.time()
+        with self._lock:
+            stats = self._stats.get((table, phase))
+            if stats is None:
+                stats = self._stats[(table, phase)] = PhaseStats()
+            stats.rows += rows
+            stats.bytes += bytes
+            stats.busy += seconds
+            for database, waited in (wait or {}).items():
+                stats.waits[database] = stats.waits.get(database, 0.0) + waited
+            started = now - seconds
+            if stats.started is None or started < stats.started:
+                stats.started = started
+            stats.ended = now if stats.ended is None else max(stats.ended, now)
+
+    @contextmanager
+    def phase(self, table: str, phase: str, database: str = None):
+        """
+        Times the block as part of a phase. With a database, the whole block counts as waiting on it.
+        Yields a dict the block can set "rows" and "bytes" in.
+        """
+        counts = {"rows": 0, "bytes": 0}
+        start = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            seconds = time.perf_counter() - start
+            self.record(table, phase, counts["rows"], counts["bytes"], seconds, {database: seconds} if database else None)
+
+    def snapshot(self) -> dict[tuple[str, str], PhaseStats]:
+        with self._lock:
+            return {key: PhaseStats(s.rows, s.bytes, s.busy, dict(s.waits), s.started, s.ended) for key, s in self._stats.items()}
+
+    def reset(self):
+        with self._lock:
+            self._stats.clear()
+
+    def totals(self, snapshot: dict[tuple[str, str], PhaseStats] = None) -> dict[str, PhaseStats]:
+        """
+        Sums a snapshot over tables, per phase. The wall time of a phase runs from its first to its last activity on any table.
+        """
+        totals = {}
+        for (_, phase), stats in (snapshot if snapshot is not None else self.snapshot()).items():
+            total = totals.setdefault(phase, PhaseStats())
+            total.rows += stats.rows
+            total.bytes += stats.bytes
+            total.busy += stats.busy
+            for database, waited in stats.waits.items():
+                total.waits[database] = total.waits.get(database, 0.0) + waited
+            total.started = stats.started if total.started is None else min(total.started, stats.started)
+            total.ended = stats.ended if total.ended is None else max(total.ended, stats.ended)
+        return totals
+
+    def to_json(self) -> str:
+        snapshot = self.snapshot()
+        return json.dumps({
+            "generated_at": time.time(),
+            "phases": {phase: stats.to_dict() for phase, stats in _in_phase_order(self.totals(snapshot))},
+            "tables": [
+                {"table": table, "phase": phase, **stats.to_dict()}
+                for (table, phase), stats in sorted(snapshot.items(), key=lambda item: (item[0][0], _phase_rank(item[0][1])))
+            ],
+        }, indent=2)
+
+    def to_prometheus(self) -> str:
+        """
+        Renders the counters in the Prometheus text exposition format, for node_exporter's textfile collector.
+        """
+        metrics = [
+            ("topostgres_rows_total", "counter", "Rows processed.", lambda s: [({}, s.rows)]),
+            ("topostgres_bytes_total", "counter", "Bytes processed.", lambda s: [({}, s.bytes)]),
+            ("topostgres_wall_seconds", "gauge", "Time from first to last activity.", lambda s: [({}, s.wall)]),
+            ("topostgres_busy_seconds_total", "counter", "Time spent in the phase, summed over threads.", lambda s: [({}, s.busy)]),
+            ("topostgres_wait_seconds_total", "counter", "Time spent waiting on a database.",
+             lambda s: [({"database": database}, seconds) for database, seconds in sorted(s.waits.items())]),
+        ]
+        snapshot = sorted(self.snapshot().items(), key=lambda item: (item[0][0], _phase_rank(item[0][1])))
+        lines = []
+        for name, kind, help_text, samples in metrics:
+            lines += [f"# HELP {name} {help_text}", f"# TYPE {name} {kind}"]
+            for (table, phase), stats in snapshot:
+                for labels, value in samples(stats):
+                    label_text = ",".join(f'{key}="{_escape_label(label)}"' for key, label in {"table": table, "phase": phase, **labels}.items())
+                    lines.append(f"{name}{{{label_text}}} {round(value, 6)}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, json_path: str = None, prometheus_path: str = None):
+        """
+        Writes the JSON and / or Prometheus outputs. Files are replaced atomically, so a collector never reads half a file.
+        """
+        if json_path:
+            _write_atomic(json_path, self.to_json())
+        if prometheus_path:
+            _write_atomic(prometheus_path, self.to_prometheus())
+
+
+METRICS = Metrics()
+
+
+class ProgressReporter:
+    """
+    Logs one progress line per interval, summing the metrics over tables, and refreshes the metrics files.
+    Runs on its own daemon thread and only reads snapshots, so the data path never waits on logging or file writes.
+    """
+
+    def __init__(self, metrics: Metrics = METRICS, interval: float = 5.0, json_path: str = None, prometheus_path: str = None):
+        self.metrics = metrics
+        self.interval = interval
+        self.json_path = json_path
+        self.prometheus_path = prometheus_path
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="progress-reporter", daemon=True)
+        self._last = {}
+
+    def start(self) -> "ProgressReporter":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stops the reporter, logging a last line and writing the final metrics files.
+        """
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+        self.report()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.report()
+
+    def report(self):
+        try:
+            totals = self.metrics.totals()
+            line = self.format_line(totals)
+            if line:
+                log(f"Progress: {line}", level="info")
+            self.metrics.write(self.json_path, self.prometheus_path)
+        except Exception as e:
+            # Reporting must never take the migration down with it
+            log(f"Progress reporting failed: {e}", level="warn")
+
+    def format_line(self, totals: dict[str, PhaseStats]) -> str:
+        """
+        One summary of the phases that moved since the last line: rows, the current rate and the database waits.
+        """
+        now = time.time()
+        parts = []
+        for phase, stats in _in_phase_order(totals):
+            last_rows, last_time = self._last.get(phase, (0, None))
+            if stats.rows == last_rows and last_time is not None:
+                continue
+            rate = (stats.rows - last_rows) / (now - last_time) if last_time and now > last_time else stats.rows / stats.wall if stats.wall > 0 else 0
+            waits = ", ".join(f"{database} {seconds:.1f}s" for database, seconds in sorted(stats.waits.items()))
+            rows = f"{stats.rows} rows at {rate:.0f} rows/s" if stats.rows else f"{stats.busy:.1f}s"
+            parts.append(f"{phase} {rows}" + (f" (waiting {waits})" if waits else ""))
+            self._last[phase] = (stats.rows, now)
+        return "; ".join(parts)
+
+
+def _phase_rank(phase: str) -> int:
+    return PHASES.index(phase) if phase in PHASES else len(PHASES)
+
+
+def _in_phase_order(totals: dict[str, PhaseStats]):
+    return sorted(totals.items(), key=lambda item: _phase_rank(item[0]))
+
+
+def _escape_label(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _write_atomic(path: str, text: str):
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    os.replace(temp_path, path)
+
+
+def truncate(value, limit: int = 200) -> str:
+    """
+    Shortens a string, or the repr of anything else, for log lines, e.g. a failing row that may hold megabytes of BLOB data.
+    """
+    text = value if isinstance(value, str) else repr(value)
+    return text if len(text) <= limit else f"{text[:limit]}... ({len(text) - limit} more characters)"